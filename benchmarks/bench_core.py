@@ -0,0 +1,258 @@
+# Benchmark suite for Method Precision Calculator core
+
+"""Time the core loading, formula and calculation paths.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_core --output bench.json
+    python -m benchmarks.bench_core --output new.json --compare bench.json
+
+Every case is timed with :mod:`timeit` (auto-ranged so each sample lasts at
+least ``--min-time`` seconds) and reported as seconds per call and items per
+second. Results, together with the git commit and interpreter, are written as
+JSON; ``--compare`` flags cases slower than ``--threshold`` relative to a
+previous run and exits non-zero if any regressed.
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import core  # noqa: E402
+from core import calc_tolerance, load_methods, safe_eval  # noqa: E402
+
+ENRICHED_CSV = ROOT / "methods_enriched.csv"
+LEGACY_CSV = ROOT / "methods.csv"
+
+
+@dataclass
+class Case:
+    """One benchmark: *func* is timed; *items* is the work done per call."""
+
+    name: str
+    func: Callable[[], Any]
+    items: int = 1
+    group: str = ""
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+def write_synthetic_catalog(path: Path, rows: int) -> None:
+    """Write *rows* method variants derived from ``methods_enriched.csv``."""
+    with ENRICHED_CSV.open(encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        base = list(reader)
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for i in range(rows):
+            row = list(base[i % len(base)])
+            row[0] = f"{row[0]} lab{i}"
+            writer.writerow(row)
+
+
+def formula_shape(formula: str) -> str:
+    """Replace numeric literals so ``(0.029 * avg)`` and ``(0.071 * avg)`` match."""
+    return re.sub(r"\d+(\.\d+)?", "k", formula.replace(" ", ""))
+
+
+def random_pairs(n: int, seed: int = 0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    v1 = rng.uniform(1.0, 390.0, size=n)
+    return v1, v1 + rng.normal(0.0, 1.0, size=n)
+
+
+# ---------------------------------------------------------------------------
+# Cases
+# ---------------------------------------------------------------------------
+def collect(tmp: Path, quick: bool) -> Iterator[Case]:
+    methods = load_methods(ENRICHED_CSV)
+
+    # -- startup ------------------------------------------------------------
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    cold = [sys.executable, "-c", "import core"]
+    yield Case("startup[python -c 'import core']",
+               lambda: subprocess.run(cold, cwd=ROOT, env=env, check=True), group="startup")
+
+    # -- loading ------------------------------------------------------------
+    yield Case("load_methods[methods.csv]", lambda: load_methods(LEGACY_CSV), group="load")
+    yield Case("load_methods[methods_enriched.csv]", lambda: load_methods(ENRICHED_CSV), group="load")
+
+    big_rows = 10_000 if quick else 100_000
+    big = tmp / f"synthetic_{big_rows}.csv"
+    write_synthetic_catalog(big, big_rows)
+    yield Case(f"load_methods[synthetic {big_rows}]", lambda: load_methods(big), items=big_rows, group="load")
+
+    from core.snapshot import load_methods_cached
+
+    load_methods_cached(big)  # warm the snapshot
+    yield Case(f"load_methods_cached[synthetic {big_rows}, warm]", lambda: load_methods_cached(big),
+               items=big_rows, group="load")
+
+    # -- formulas: one representative per shape (k*avg, k*(avg+c), k*avg**p) --
+    shapes: Dict[str, str] = {}
+    for m in methods.values():
+        for formula in (m.formula_r, m.formula_R):
+            if formula:
+                shapes.setdefault(formula_shape(formula), formula)
+    for shape, formula in sorted(shapes.items()):
+        yield Case(f"safe_eval[{shape}]", lambda f=formula: safe_eval(f, 123.4), group="formula")
+
+    # -- single pair ------------------------------------------------------------
+    for name in ("D56-22 HT", "D93-20 A", "D5453-23 (< 400 mg/kg S)"):
+        method = methods[name]
+        yield Case(f"calc_tolerance[{name}]", lambda m=method: calc_tolerance(m, 10.1, 10.3), group="pair")
+
+    from core.lookup import tabulate_method
+
+    tabulated = tabulate_method(methods["D5453-23 (< 400 mg/kg S)"])
+    yield Case("calc_tolerance[D5453-23 (< 400 mg/kg S), tabulated]",
+               lambda: calc_tolerance(tabulated, 10.1, 10.3), group="pair")
+
+    # -- bulk throughput ------------------------------------------------------
+    import numpy as np
+
+    n = 100_000 if quick else 1_000_000
+    v1, v2 = random_pairs(n)
+    method = methods["D5453-23 (< 400 mg/kg S)"]
+    yield Case(f"calc_tolerance_batch[{n}]", lambda: core.calc_tolerance_batch(method, v1, v2),
+               items=n, group="bulk")
+
+    names = list(methods)
+    mixed = [names[i % len(names)] for i in range(n)]
+    yield Case(f"calc_tolerance_bulk[{n}, {len(names)} methods]",
+               lambda: core.calc_tolerance_bulk(methods, mixed, v1, v2), items=n, group="bulk")
+
+    sizes = np.random.default_rng(1).integers(2, 7, n)
+    replicates = np.repeat(v1, sizes)
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    yield Case(f"calc_replicates[{n} groups of 2-6]",
+               lambda: core.calc_replicates(methods, mixed, replicates, offsets), items=n, group="bulk")
+
+    loop_n = 10_000
+    pairs = list(zip(mixed[:loop_n], v1[:loop_n].tolist(), v2[:loop_n].tolist()))
+
+    def scalar_loop():
+        for name, a, b in pairs:
+            try:
+                calc_tolerance(methods[name], a, b)
+            except ValueError:
+                pass
+
+    yield Case(f"calc_tolerance loop[{loop_n}]", scalar_loop, items=loop_n, group="bulk")
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+def measure(case: Case, repeat: int, min_time: float) -> Dict[str, Any]:
+    timer = timeit.Timer(case.func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    samples = [timer.timeit(number) / number for _ in range(repeat)]
+    best = min(samples)
+    return {
+        "name": case.name,
+        "group": case.group,
+        "items": case.items,
+        "number": number,
+        "min_s": best,
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "stdev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "items_per_s": case.items / best if best > 0 else None,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(quick: bool = False, repeat: int = 5, min_time: float = 0.2, pattern: str = "") -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for case in collect(Path(tmp), quick):
+            if pattern and pattern not in case.name:
+                continue
+            result = measure(case, repeat, min_time)
+            results.append(result)
+            rate = f"{result['items_per_s']:>14,.0f} items/s" if case.items > 1 else ""
+            print(f"{case.name:<60} {result['min_s'] * 1e6:>12.2f} µs {rate}", flush=True)
+    return {
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "quick": quick,
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Return descriptions of cases slower than *baseline* by more than *threshold*."""
+    old = {r["name"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for r in current["results"]:
+        prev = old.get(r["name"])
+        if prev is None or not prev["min_s"]:
+            continue
+        ratio = r["min_s"] / prev["min_s"]
+        if ratio > 1.0 + threshold:
+            regressions.append(f"{r['name']}: {prev['min_s'] * 1e6:.2f} µs -> {r['min_s'] * 1e6:.2f} µs (x{ratio:.2f})")
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark core loading, formula and calculation paths.")
+    parser.add_argument("--output", default="bench.json", help="JSON file for the results")
+    parser.add_argument("--compare", help="previous results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown ratio (default 0.2 = 20%%)")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs for CI smoke runs")
+    parser.add_argument("--repeat", type=int, default=5, help="samples per case")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per sample")
+    parser.add_argument("-k", dest="pattern", default="", help="only run cases whose name contains this")
+    args = parser.parse_args(argv)
+
+    report = run(quick=args.quick, repeat=args.repeat, min_time=args.min_time, pattern=args.pattern)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+# Rerun latency benchmark for the Streamlit app of Method Precision Calculator
+
+"""Time reruns of ``tolerance_calculator_web.py`` with ``streamlit.testing``.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_web
+    python -m benchmarks.bench_web --output web.json
+
+Every widget interaction in a Streamlit app triggers a rerun. ``AppTest``
+always reruns the whole script, so two kinds of runs are timed:
+
+* ``full rerun[...]`` – the whole script after an interaction (what every
+  interaction cost before the tabs became fragments, and what a page load or
+  ``st.rerun()`` still costs);
+* ``fragment rerun[...]`` – one tab's fragment function on its own, which is
+  what Streamlit executes when a widget inside that tab changes.
+
+The app runs in a temporary directory, so its history database and control
+chart state do not touch the working tree.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = ROOT / "tolerance_calculator_web.py"
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _timed(run: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - start)
+    return {"median_ms": statistics.median(samples) * 1e3, "min_ms": min(samples) * 1e3}
+
+
+def _check(at: Any) -> Any:
+    if at.exception:
+        raise RuntimeError(f"app raised: {at.exception[0].message}")
+    return at
+
+
+def _button(at: Any, label: str) -> Any:
+    return next(b for b in at.button if b.label == label)
+
+
+def measure(repeat: int) -> List[Dict[str, Any]]:
+    from streamlit.testing.v1 import AppTest
+
+    results: List[Dict[str, Any]] = []
+
+    def record(name: str, run: Callable[[], Any]) -> None:
+        stats = _timed(run, repeat)
+        results.append({"name": name, **stats})
+        print(f"{name:<48} median {stats['median_ms']:8.1f} ms   min {stats['min_ms']:8.1f} ms")
+
+    at = _check(AppTest.from_file(str(APP), default_timeout=60).run())
+    record("full rerun[initial page]", lambda: _check(AppTest.from_file(str(APP), default_timeout=60).run()))
+
+    readings = iter(range(10**6))
+    record("full rerun[thermometer reading changed]",
+           lambda: _check(at.number_input(key="t1r").set_value(20 + next(readings) % 50 / 100).run()))
+    record("full rerun[thermometer check clicked]",
+           lambda: _check(_button(at, "Check Agreement").click().run()))
+    at.number_input(key="v1").set_value(60.0)
+    at.number_input(key="v2").set_value(61.0)
+    record("full rerun[calculator calculate clicked]",
+           lambda: _check(_button(at, "Calculate").click().run()))
+    record("full rerun[history page changed]",
+           lambda: _check(at.number_input(key="history_page").set_value(1).run()))
+
+    import tolerance_calculator_web as web
+
+    for tab, render in web.TABS:
+        script = (f"import sys\nsys.path.insert(0, {str(ROOT)!r})\n"
+                  f"import tolerance_calculator_web as web\nweb.{render.__name__}()\n")
+        fragment = _check(AppTest.from_string(script, default_timeout=60).run())
+        record(f"fragment rerun[{tab}]", lambda f=fragment: _check(f.run()))
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_web", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=10, help="runs per case (default: 10)")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    work = Path(tempfile.mkdtemp(prefix="mpc-bench-web-"))
+    # Registered first so it runs last, after the app's control-chart state
+    # is flushed at exit.
+    atexit.register(shutil.rmtree, work, ignore_errors=True)
+    shutil.copy(ROOT / "methods_enriched.csv", work)
+    cwd = os.getcwd()
+    os.chdir(work)
+    try:
+        results = measure(args.repeat)
+    finally:
+        os.chdir(cwd)
+    if args.output:
+        Path(args.output).write_text(json.dumps({"results": results}, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+# Core utilities for Method Precision Calculator
+
+"""Utility module shared between the Tkinter GUI and Streamlit web UI.
+
+It provides:
+* A dataclass representation of a **Method** (ASTM repeatability/reproducibility
+  specifications).
+* A robust CSV loader that gracefully handles UTF‑8 and ISO‑8859‑1 encodings.
+* A safe evaluator for formulas that may reference ``avg`` and common math
+  functions. Formulas are compiled once (see :mod:`core.formula`) and each
+  ``Method`` carries ready-to-call evaluators for ``r`` and ``R``.
+* ``calc_tolerance`` – the pure‑logic function that performs the calculation
+  and returns a result dictionary.
+* The package ``logger`` and ``configure_logging`` for the UI / CLI entry
+  points (importing ``core`` leaves global logging alone).
+
+Everything else lives in submodules – :mod:`core.formula` (the compiler),
+:mod:`core.batch` for vectorised evaluation, :mod:`core.stream` for streaming
+CSV files, :mod:`core.parallel` for multi-core runs, … – that are imported on
+first use. ``import core`` therefore takes a few milliseconds, does no I/O,
+creates no windows and imports neither NumPy nor the formula compiler
+(``tests/test_startup.py`` guards this).
+"""
+
+import logging
+import sys
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Callable, Dict, Any, Optional, Tuple
+
+# ---------------------------------------------------------------------------
+# Constants & logging
+# ---------------------------------------------------------------------------
+TOLERANCE_FACTOR = 0.75
+
+# r = 2.8 σr and R = 2.8 σR (ASTM E177 / ISO 5725-6); shared by the replicate
+# critical ranges and the control charts.
+PRECISION_FACTOR = 2.8
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s – %(message)s"
+
+# Library logger: silent unless the application configures logging.
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+# Active core.instrument.Instrumentation, or None. The hot paths test this one
+# global, so disabled instrumentation costs a load and a comparison.
+_probe: Any = None
+
+
+def configure_logging(level: int = logging.INFO) -> None:
+    """Set up root logging for an application entry point (UIs, CLI).
+
+    ``import core`` never touches the global logging configuration; entry
+    points call this instead.
+    """
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+
+
+# ---------------------------------------------------------------------------
+# Data structures
+# ---------------------------------------------------------------------------
+@dataclass(frozen=True, slots=True)
+class Method:
+    """Represent a single ASTM method.
+
+    Attributes correspond to the columns in ``methods.csv`` / ``methods_enriched.csv``.
+    ``display_label`` is a convenience string used by the UI for the dropdown.
+    Instances are immutable and slotted (no per-instance ``__dict__``); large
+    catalogs should be held in a :class:`core.table.MethodTable`.
+    """
+
+    name: str
+    r: float | None
+    R: float | None
+    unit: str
+    formula_r: str
+    formula_R: str
+    decimals: int
+    lower: float | None
+    upper: float | None
+    notes: str = ""
+    year: str = ""
+    matrix: str = ""
+    conc_range: str = ""
+    scope: str = ""
+    display_label: str = ""
+    eval_r: Optional[Callable[[float], float]] = field(default=None, init=False, repr=False, compare=False)
+    eval_R: Optional[Callable[[float], float]] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Populate the display label after initialisation (frozen, hence
+        # object.__setattr__).
+        object.__setattr__(self, "display_label", f"{self.name} ({self.year})" if self.year else self.name)
+        # Compile formulas once so calc_tolerance never touches compile().
+        object.__setattr__(self, "eval_r", _compile_or_none(self.formula_r))
+        object.__setattr__(self, "eval_R", _compile_or_none(self.formula_R))
+
+    def __reduce__(self) -> Tuple[type, tuple]:
+        # The compiled evaluators are closures and cannot be pickled; rebuild
+        # from the constructor fields instead, which recompiles them.
+        return type(self), tuple(getattr(self, f.name) for f in fields(self) if f.init)
+
+
+def _compile_or_none(formula: str) -> Optional[Callable[[float], float]]:
+    """Return a compiled evaluator, or ``None`` for empty/invalid formulas.
+
+    Invalid formulas are not fatal at load time – ``safe_eval`` will raise (and
+    log) when the method is actually used, exactly as before.
+    """
+    if not formula:
+        return None
+    from core.formula import FormulaError, make_evaluator
+
+    try:
+        return make_evaluator(formula)
+    except (SyntaxError, FormulaError) as exc:
+        logger.warning("Formula %r does not compile: %s", formula, exc)
+        return None
+
+# ---------------------------------------------------------------------------
+# CSV loader
+# ---------------------------------------------------------------------------
+# Bump whenever load_methods turns the same CSV into different Method values;
+# cached registries (core.snapshot) built by an older parser are then rebuilt.
+PARSER_VERSION = 1
+
+
+def _intern(value: str | None) -> str:
+    """Strip and intern a low-cardinality string column (unit, matrix, …)."""
+    return sys.intern((value or "").strip())
+
+
+def load_methods(csv_path: str | Path) -> Dict[str, Method]:
+    """Load method specifications from a CSV file.
+
+    The function attempts UTF‑8 first, falling back to ISO‑8859‑1. It returns a
+    dictionary keyed by the raw ``Method`` name (as appears in the CSV). Any
+    parsing errors are logged and re‑raised as ``IOError``.
+    """
+
+    probe = _probe
+    if probe is not None:
+        start = probe.clock()
+    path = Path(csv_path)
+    if not path.is_file():
+        if probe is not None:
+            probe.record_error("load_methods")
+        raise IOError(f"CSV file not found: {path}")
+
+    import csv
+
+    rows = []
+    for enc in ("utf-8", "iso-8859-1"):
+        try:
+            with path.open("r", encoding=enc, newline="") as f:
+                rows = list(csv.DictReader(f))
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise IOError(f"Unable to decode CSV {path} with supported encodings")
+
+    methods: Dict[str, Method] = {}
+    for row in rows:
+        try:
+            name = row["Method"].strip()
+            method = Method(
+                name=name,
+                r=float(row["r"]) if row.get("r", "").strip() else None,
+                R=float(row["R"]) if row.get("R", "").strip() else None,
+                unit=_intern(row.get("Unit", "")),
+                formula_r=_intern(row.get("Formula_r", "")),
+                formula_R=_intern(row.get("Formula_R", "")),
+                decimals=int(row["Number_of_Decimals"]) if row.get("Number_of_Decimals", "").strip() else 4,
+                lower=float(row["Lower_Limit"]) if row.get("Lower_Limit", "").strip() else None,
+                upper=float(row["Upper_Limit"]) if row.get("Upper_Upper", "").strip() else None,
+                notes=row.get("Notes", "").strip(),
+                year=_intern(row.get("Revision_Year", "")),
+                matrix=_intern(row.get("Sample_Matrix", "")),
+                conc_range=_intern(row.get("Conc_Range", "")),
+                scope=_intern(row.get("Scope", "")),
+            )
+            methods[name] = method
+        except Exception as exc:
+            logger.error("Failed to parse method row %s: %s", row, exc)
+            continue
+    if probe is not None:
+        probe.record("load_methods", probe.clock() - start)
+    return methods
+
+# ---------------------------------------------------------------------------
+# Safe formula evaluator
+# ---------------------------------------------------------------------------
+def safe_eval(formula: str, avg: float) -> float:
+    """Evaluate a formula string safely.
+
+    Only arithmetic on numbers and ``avg`` plus a whitelisted set of functions
+    (``abs`` and a few from the ``math`` module) is accepted – anything else
+    raises :class:`core.formula.FormulaError`. Formulas are compiled by
+    :mod:`core.formula` (no ``eval``) and cached, so repeats are compiled once.
+    """
+
+    from core.formula import compile_formula
+
+    probe = _probe
+    if probe is not None:
+        start = probe.clock()
+    try:
+        value = compile_formula(formula)(avg)
+    except Exception as exc:
+        logger.error("Formula evaluation error for %s with avg=%s: %s", formula, avg, exc)
+        if probe is not None:
+            probe.record_error("safe_eval")
+        raise
+    if probe is not None:
+        probe.record("safe_eval", probe.clock() - start)
+    return value
+
+# ---------------------------------------------------------------------------
+# Core calculation
+# ---------------------------------------------------------------------------
+def _resolve(
+    formula: str,
+    evaluator: Optional[Callable[[float], float]],
+    static: float | None,
+    avg: float,
+) -> float:
+    """Return r or R for *avg* using the precompiled evaluator when present."""
+    if not formula:
+        return static if static is not None else 0.0
+    if evaluator is None:
+        # Formula failed to compile at load time – let safe_eval raise/log.
+        return safe_eval(formula, avg)
+    try:
+        return evaluator(avg)
+    except Exception as exc:
+        logger.error("Formula evaluation error for %s with avg=%s: %s", formula, avg, exc)
+        raise
+
+
+def calc_tolerance(method: Method, v1: float, v2: float) -> Dict[str, Any]:
+    """Return calculation results for a pair of measurements.
+
+    The returned dictionary contains all values needed by the UI layers:
+    ``avg``, ``diff``, ``r``, ``R``, ``r_pass``, ``R_pass``, ``tolerance_075R``
+    and the formatted strings for display.
+    """
+
+    probe = _probe
+    if probe is not None:
+        start = probe.clock()
+
+    # Validate limits early – UI may already have done this, but the core keeps
+    # the invariant. Out-of-range calls count as failed calls (not formula
+    # errors) in the instrumentation.
+    error = None
+    if method.lower is not None and (v1 < method.lower or v2 < method.lower):
+        error = f"Values must be >= {method.lower} {method.unit}"
+    elif method.upper is not None and (v1 > method.upper or v2 > method.upper):
+        error = f"Values must be <= {method.upper} {method.unit}"
+    if error is not None:
+        if probe is not None:
+            probe.record_error("calc_tolerance")
+        raise ValueError(error)
+
+    avg = (v1 + v2) / 2.0
+    diff = abs(v1 - v2)
+
+    # Resolve r and R – either static values or evaluated formulas.
+    try:
+        r = _resolve(method.formula_r, method.eval_r, method.r, avg)
+        R = _resolve(method.formula_R, method.eval_R, method.R, avg)
+    except Exception:
+        if probe is not None:
+            probe.record_error("calc_tolerance", method.name)
+        raise
+
+    r_pass = diff <= r
+    R_pass = diff <= R
+    tolerance_075R = TOLERANCE_FACTOR * R
+    tolerance_pass = diff <= tolerance_075R
+
+    result: Dict[str, Any] = {
+        "method_name": method.name,
+        "unit": method.unit,
+        "avg": avg,
+        "diff": diff,
+        "r": r,
+        "R": R,
+        "r_pass": r_pass,
+        "R_pass": R_pass,
+        "tolerance_075R": tolerance_075R,
+        "tolerance_pass": tolerance_pass,
+        "decimals": method.decimals,
+    }
+    if probe is not None:
+        probe.record("calc_tolerance", probe.clock() - start, method.name)
+    return result
+
+# ---------------------------------------------------------------------------
+# Helper for display label mapping (useful for UI dropdowns)
+# ---------------------------------------------------------------------------
+def build_label_map(methods: Dict[str, Method]) -> Dict[str, str]:
+    """Create a ``display_label → method_name`` mapping for the UI.
+    """
+    return {m.display_label: m.name for m in methods.values()}
+
+# ---------------------------------------------------------------------------
+# Lazily imported submodule exports
+# ---------------------------------------------------------------------------
+_LAZY_EXPORTS = {
+    "CacheStats": "core.formula",
+    "CompiledFormula": "core.formula",
+    "FormulaCache": "core.formula",
+    "FormulaError": "core.formula",
+    "SAFE_FUNCTIONS": "core.formula",
+    "compile_formula": "core.formula",
+    "make_evaluator": "core.formula",
+    "formula_cache_stats": ("core.formula", "cache_stats"),
+    "clear_formula_cache": ("core.formula", "clear_cache"),
+    "BatchResult": "core.batch",
+    "BulkResult": "core.batch",
+    "calc_tolerance_batch": "core.batch",
+    "calc_tolerance_bulk": "core.batch",
+    "StreamStats": "core.stream",
+    "evaluate_csv_file": "core.stream",
+    "evaluate_csv_parallel": "core.parallel",
+    "load_methods_cached": "core.snapshot",
+    "MethodTable": "core.table",
+    "MethodIndex": "core.index",
+    "FormulaLookup": "core.lookup",
+    "precompute_methods": "core.lookup",
+    "HistoryStore": "core.history",
+    "get_history_store": "core.history",
+    "ControlCharts": "core.control",
+    "PrecisionService": "core.service",
+    "Ingestor": "core.ingest",
+    "ResultStore": "core.results",
+    "ReplicateResult": "core.replicate",
+    "calc_replicates": "core.replicate",
+    "calc_replicates_long": "core.replicate",
+    "SqlEvaluator": "core.pushdown",
+    "CorrectionTable": "core.thermometer",
+    "check_agreement": "core.thermometer",
+    "load_correction_tables": "core.thermometer",
+    "Instrumentation": "core.instrument",
+    "profile": "core.instrument",
+    "MethodRegistry": "core.registry",
+    "get_registry": "core.registry",
+}
+
+
+def __getattr__(name: str) -> Any:
+    target = _LAZY_EXPORTS.get(name)
+    if target is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = target if isinstance(target, tuple) else (target, name)
+    import importlib
+
+    value = getattr(importlib.import_module(module_name), attr)
+    globals()[name] = value
+    return value
+
+# End of core/__init__.py
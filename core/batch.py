@@ -0,0 +1,337 @@
+# Vectorised batch evaluation for Method Precision Calculator
+
+"""NumPy implementation of :func:`core.calc_tolerance` for many pairs at once.
+
+It provides:
+* ``BatchResult`` – a columnar result (one array per field) instead of a list
+  of per-pair dictionaries.
+* ``make_array_evaluator`` – evaluates a ``Formula_r`` / ``Formula_R`` string
+  element-wise, mapping the whitelisted functions to NumPy ufuncs.
+* ``calc_tolerance_batch`` – the vectorised counterpart of ``calc_tolerance``.
+* ``calc_tolerance_bulk`` – evaluates a table mixing many methods by grouping
+  rows per method and running one batch per group.
+* ``factorize`` – integer codes for a column, shared by the grouping
+  evaluators (:mod:`core.replicate`, :mod:`core.thermometer`).
+
+Unlike the scalar path, limit violations do not raise: ``in_range`` flags each
+row and the pass flags of out-of-range rows are ``False``. The bulk evaluator
+reports problems through per-row ``STATUS_*`` codes.
+"""
+
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, Mapping, Tuple
+
+import numpy as np
+
+import core
+from core import Method, TOLERANCE_FACTOR, logger
+from core.formula import compile_formula
+
+# Element-wise replacements for core.formula.SAFE_FUNCTIONS.
+ARRAY_FUNCTIONS: Dict[str, Any] = {
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "log": np.log,
+    "exp": np.exp,
+    "pow": np.power,
+}
+
+
+# Per-row status codes of calc_tolerance_bulk.
+STATUS_OK = 0
+STATUS_UNKNOWN_METHOD = 1
+STATUS_OUT_OF_RANGE = 2
+STATUS_FORMULA_ERROR = 3
+STATUS_INVALID_VALUE = 4
+STATUS_GROUP_SIZE = 5
+
+STATUS_LABELS = {
+    STATUS_OK: "ok",
+    STATUS_UNKNOWN_METHOD: "unknown method",
+    STATUS_OUT_OF_RANGE: "out of range",
+    STATUS_FORMULA_ERROR: "formula error",
+    STATUS_INVALID_VALUE: "invalid value",
+    STATUS_GROUP_SIZE: "unsupported group size",
+}
+
+
+# ---------------------------------------------------------------------------
+# Result containers
+# ---------------------------------------------------------------------------
+@dataclass
+class BatchResult:
+    """Columnar result of :func:`calc_tolerance_batch`.
+
+    Every array has one entry per input pair. ``in_range`` is ``False`` for rows
+    violating ``Method.lower`` / ``Method.upper``; their pass flags are ``False``.
+    """
+
+    method_name: str
+    unit: str
+    decimals: int
+    avg: np.ndarray
+    diff: np.ndarray
+    r: np.ndarray
+    R: np.ndarray
+    r_pass: np.ndarray
+    R_pass: np.ndarray
+    tolerance_075R: np.ndarray
+    tolerance_pass: np.ndarray
+    in_range: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.avg)
+
+    @property
+    def tolerance_low(self) -> np.ndarray:
+        """Lower edge of the 0.75R acceptance band."""
+        return self.avg - self.tolerance_075R
+
+    @property
+    def tolerance_high(self) -> np.ndarray:
+        """Upper edge of the 0.75R acceptance band."""
+        return self.avg + self.tolerance_075R
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """Return row *index* in the dictionary shape of ``calc_tolerance``."""
+        result: Dict[str, Any] = {
+            "method_name": self.method_name,
+            "unit": self.unit,
+        }
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if isinstance(value, np.ndarray):
+                result[f.name] = value[index].item()
+        result["decimals"] = self.decimals
+        return result
+
+
+# ---------------------------------------------------------------------------
+# Formula evaluation
+# ---------------------------------------------------------------------------
+def make_array_evaluator(formula: str) -> Callable[[np.ndarray], np.ndarray]:
+    """Return ``f(avg_array) -> array`` for *formula* using NumPy ufuncs.
+
+    Shares the compiled-formula cache with the scalar evaluator.
+    """
+
+    compiled = compile_formula(formula)
+
+    def evaluate(avg: np.ndarray) -> np.ndarray:
+        out = compiled.evaluate_array(avg)
+        # Constant formulas yield a scalar – broadcast to the batch shape.
+        return np.broadcast_to(np.asarray(out, dtype=np.float64), avg.shape)
+
+    return evaluate
+
+
+def _resolve_array(
+    formula: str,
+    static: float | None,
+    avg: np.ndarray,
+    evaluator: Any = None,
+) -> np.ndarray:
+    if not formula:
+        return np.full(avg.shape, static if static is not None else 0.0)
+    try:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # Methods tabulated by core.lookup carry their own array path.
+            evaluate_array = getattr(evaluator, "evaluate_array", None)
+            if evaluate_array is not None:
+                return evaluate_array(avg)
+            return make_array_evaluator(formula)(avg)
+    except Exception as exc:
+        logger.error("Formula evaluation error for %s on %d values: %s", formula, avg.size, exc)
+        raise
+
+
+# ---------------------------------------------------------------------------
+# Batch calculation
+# ---------------------------------------------------------------------------
+def calc_tolerance_batch(method: Method, v1_array: Any, v2_array: Any) -> BatchResult:
+    """Evaluate many ``(v1, v2)`` pairs for a single method.
+
+    ``v1_array`` and ``v2_array`` are any 1-D array-likes of equal length.
+    Returns a :class:`BatchResult`; no exception is raised for out-of-range
+    values.
+    """
+
+    v1 = np.asarray(v1_array, dtype=np.float64)
+    v2 = np.asarray(v2_array, dtype=np.float64)
+    if v1.ndim != 1 or v1.shape != v2.shape:
+        raise ValueError(f"v1 and v2 must be 1-D arrays of equal length, got {v1.shape} and {v2.shape}")
+
+    in_range = np.ones(v1.shape, dtype=bool)
+    if method.lower is not None:
+        in_range &= (v1 >= method.lower) & (v2 >= method.lower)
+    if method.upper is not None:
+        in_range &= (v1 <= method.upper) & (v2 <= method.upper)
+
+    avg = (v1 + v2) / 2.0
+    diff = np.abs(v1 - v2)
+
+    r = _resolve_array(method.formula_r, method.r, avg, method.eval_r)
+    R = _resolve_array(method.formula_R, method.R, avg, method.eval_R)
+    tolerance_075R = TOLERANCE_FACTOR * R
+
+    return BatchResult(
+        method_name=method.name,
+        unit=method.unit,
+        decimals=method.decimals,
+        avg=avg,
+        diff=diff,
+        r=r,
+        R=R,
+        r_pass=(diff <= r) & in_range,
+        R_pass=(diff <= R) & in_range,
+        tolerance_075R=tolerance_075R,
+        tolerance_pass=(diff <= tolerance_075R) & in_range,
+        in_range=in_range,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Mixed-method bulk calculation
+# ---------------------------------------------------------------------------
+@dataclass
+class BulkResult:
+    """Columnar result of :func:`calc_tolerance_bulk`, in input row order.
+
+    Rows whose ``status`` is ``STATUS_UNKNOWN_METHOD`` or ``STATUS_FORMULA_ERROR``
+    have ``NaN`` numbers and ``False`` pass flags (as do ``STATUS_INVALID_VALUE``
+    rows, whose inputs were ``NaN``). A formula that fails only for some rows
+    (a domain error such as ``log`` of a negative average, where
+    :func:`core.calc_tolerance` raises) keeps ``avg`` and ``diff`` of those rows. ``unit`` holds ``""`` and
+    ``decimals`` ``-1`` for unknown methods.
+    """
+
+    method_name: np.ndarray
+    unit: np.ndarray
+    decimals: np.ndarray
+    avg: np.ndarray
+    diff: np.ndarray
+    r: np.ndarray
+    R: np.ndarray
+    r_pass: np.ndarray
+    R_pass: np.ndarray
+    tolerance_075R: np.ndarray
+    tolerance_pass: np.ndarray
+    status: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """Return row *index* as a plain dictionary."""
+        result = {f.name: getattr(self, f.name)[index] for f in fields(self)}
+        return {k: (v.item() if isinstance(v, np.generic) else v) for k, v in result.items()}
+
+
+def calc_tolerance_bulk(
+    methods: Mapping[str, Method],
+    method_names: Any,
+    v1_array: Any,
+    v2_array: Any,
+) -> BulkResult:
+    """Evaluate a table of ``(method_name, v1, v2)`` rows mixing many methods.
+
+    Rows are grouped by method name, each group is evaluated with a single
+    :func:`calc_tolerance_batch` call and the results are scattered back into
+    the original row order. Unknown methods, out-of-range values, failing
+    formulas and ``NaN`` inputs are reported in ``status`` instead of raising.
+    """
+
+    names = np.asarray(method_names, dtype=object)
+    v1 = np.asarray(v1_array, dtype=np.float64)
+    v2 = np.asarray(v2_array, dtype=np.float64)
+    n = len(names)
+    if names.ndim != 1 or v1.shape != (n,) or v2.shape != (n,):
+        raise ValueError("method_names, v1 and v2 must be 1-D columns of equal length")
+
+    out = BulkResult(
+        method_name=names,
+        unit=np.full(n, "", dtype=object),
+        decimals=np.full(n, -1, dtype=np.int16),
+        avg=np.full(n, np.nan),
+        diff=np.full(n, np.nan),
+        r=np.full(n, np.nan),
+        R=np.full(n, np.nan),
+        r_pass=np.zeros(n, dtype=bool),
+        R_pass=np.zeros(n, dtype=bool),
+        tolerance_075R=np.full(n, np.nan),
+        tolerance_pass=np.zeros(n, dtype=bool),
+        status=np.full(n, STATUS_UNKNOWN_METHOD, dtype=np.int8),
+    )
+    if n == 0:
+        return out
+    probe = core._probe
+    if probe is not None:
+        start = probe.clock()
+
+    # Factorise names with a dict (sorting an object array is far slower),
+    # then one stable integer sort groups identical names into contiguous runs.
+    codes: Dict[Any, int] = {}
+    inverse = np.fromiter((codes.setdefault(name, len(codes)) for name in names), dtype=np.intp, count=n)
+    unique_names = list(codes)
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(inverse, minlength=len(unique_names)))))
+
+    for g, name in enumerate(unique_names):
+        method = methods.get(name)
+        if method is None:
+            continue
+        idx = order[bounds[g]:bounds[g + 1]]
+        out.unit[idx] = method.unit
+        out.decimals[idx] = method.decimals
+        try:
+            batch = calc_tolerance_batch(method, v1[idx], v2[idx])
+        except Exception:
+            out.status[idx] = STATUS_FORMULA_ERROR
+            if probe is not None:
+                probe.count_method(name, len(idx), errors=len(idx))
+            continue
+        if probe is not None:
+            probe.count_method(name, len(idx))
+        for column in ("avg", "diff", "r", "R", "r_pass", "R_pass", "tolerance_075R", "tolerance_pass"):
+            getattr(out, column)[idx] = getattr(batch, column)
+        out.status[idx] = np.where(batch.in_range, STATUS_OK, STATUS_OUT_OF_RANGE)
+        # Domain errors (log/sqrt/pow of a negative average, log(0) …) come
+        # back as NaN or ±inf under errstate; the scalar path raises for them.
+        failed = ~(np.isfinite(batch.r) & np.isfinite(batch.R))
+        if failed.any():
+            rows = idx[failed]
+            out.status[rows] = STATUS_FORMULA_ERROR
+            for column in ("r", "R", "tolerance_075R"):
+                getattr(out, column)[rows] = np.nan
+            for column in ("r_pass", "R_pass", "tolerance_pass"):
+                getattr(out, column)[rows] = False
+
+    invalid = np.isnan(v1) | np.isnan(v2)
+    if invalid.any():
+        out.status[invalid & (out.status != STATUS_UNKNOWN_METHOD)] = STATUS_INVALID_VALUE
+    if probe is not None:
+        probe.record("calc_tolerance_bulk", probe.clock() - start)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Grouping
+# ---------------------------------------------------------------------------
+def factorize(column: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(codes, uniques)`` with ``uniques[codes] == column``.
+
+    Numeric columns are factorised with :func:`numpy.unique` (sorted
+    uniques), anything else with a dict (uniques in order of first
+    appearance).
+    """
+    if column.dtype.kind in "biuf":
+        uniques, codes = np.unique(column, return_inverse=True)
+        return codes.astype(np.int64), uniques
+    values = column.tolist()
+    # dict.fromkeys and map() keep the per-row work in C.
+    distinct = list(dict.fromkeys(values))
+    lookup = {value: code for code, value in enumerate(distinct)}
+    codes = np.fromiter(map(lookup.__getitem__, values), dtype=np.int64, count=len(values))
+    uniques = np.empty(len(distinct), dtype=object)
+    uniques[:] = distinct
+    return codes, uniques
@@ -0,0 +1,314 @@
+# Command-line batch evaluation for Method Precision Calculator
+
+"""Evaluate duplicate pairs from files or stdin without a UI.
+
+Usage::
+
+    python -m core pairs.csv                       # CSV in, CSV out
+    cat pairs.jsonl | python -m core --format jsonl
+    python -m core --method "D93-20 A" readings.csv --workers 4
+
+Input is CSV (with ``Method``, ``V1``, ``V2`` columns, case-insensitive) or
+JSON Lines (objects with ``method``, ``v1``, ``v2`` keys). The input format
+is taken from the file extension, or sniffed from the first line for stdin.
+With ``--method`` the method column/key may be omitted and applies to every
+row.
+
+Results are written to stdout chunk by chunk as soon as they are evaluated,
+in input order, with the columns of :data:`core.stream.OUTPUT_COLUMNS`. With
+``--workers N`` chunks are evaluated by a process pool while the next ones
+are read; at most ``2 × N`` chunks are in flight.
+
+With ``--store DIR`` the unrounded results are also appended to a
+:class:`core.results.ResultStore` for later memory-mapped queries.
+
+Only ``core`` and NumPy are imported – never Streamlit, Tkinter or pandas.
+"""
+
+import argparse
+import collections
+import csv
+import itertools
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from core import configure_logging, logger
+from core.stream import DEFAULT_CHUNK_SIZE, OUTPUT_COLUMNS, _column_indices, evaluate_rows, format_rows, json_row
+
+Row = Tuple[str, str, str]
+
+INPUT_FORMATS = ("auto", "csv", "jsonl")
+OUTPUT_FORMATS = ("csv", "jsonl")
+
+_JSONL_SUFFIXES = {".jsonl", ".ndjson", ".json"}
+
+
+# ---------------------------------------------------------------------------
+# Input
+# ---------------------------------------------------------------------------
+def _open_input(name: str, encoding: str) -> IO[str]:
+    if name == "-":
+        return sys.stdin
+    return open(name, "r", encoding=encoding, newline="")
+
+
+def _detect_format(name: str, lines: Iterator[str]) -> Tuple[str, Iterator[str]]:
+    """Return the input format of *name* and the (re-chained) line iterator."""
+    if name != "-":
+        return ("jsonl" if Path(name).suffix.lower() in _JSONL_SUFFIXES else "csv"), lines
+    for first in lines:
+        if first.strip():
+            fmt = "jsonl" if first.lstrip().startswith("{") else "csv"
+            return fmt, itertools.chain([first], lines)
+    return "csv", iter(())
+
+
+def iter_csv_rows(lines: Iterable[str], method: Optional[str] = None) -> Iterator[Row]:
+    """Yield ``(method, v1, v2)`` from CSV lines with a header row."""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    if method is None:
+        i_name, i_v1, i_v2 = _column_indices(header, ("Method", "V1", "V2"))
+    else:
+        i_v1, i_v2 = _column_indices(header, ("V1", "V2"))
+        i_name = None
+    width = max(i for i in (i_name, i_v1, i_v2) if i is not None) + 1
+    for r in reader:
+        if len(r) < width:
+            # Blank lines are skipped; short rows keep their missing cells
+            # empty and come out as invalid values.
+            if not any(cell.strip() for cell in r):
+                continue
+            r += [""] * (width - len(r))
+        yield (method if i_name is None else r[i_name]), r[i_v1], r[i_v2]
+
+
+def _json_text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def iter_jsonl_rows(lines: Iterable[str], method: Optional[str] = None) -> Iterator[Row]:
+    """Yield ``(method, v1, v2)`` from JSON Lines (keys are case-insensitive)."""
+    for lineno, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Invalid JSON on line {lineno}: {exc}") from None
+        if not isinstance(obj, dict):
+            raise ValueError(f"Line {lineno} is not a JSON object")
+        obj = {str(k).lower(): v for k, v in obj.items()}
+        name = method if method is not None else _json_text(obj.get("method"))
+        yield name, _json_text(obj.get("v1")), _json_text(obj.get("v2"))
+
+
+def iter_input_rows(
+    names: Sequence[str],
+    input_format: str = "auto",
+    method: Optional[str] = None,
+    encoding: str = "utf-8",
+) -> Iterator[Row]:
+    """Yield ``(method, v1, v2)`` rows from every input in turn."""
+    for name in names:
+        f = _open_input(name, encoding)
+        try:
+            lines: Iterator[str] = iter(f)
+            fmt = input_format
+            if fmt == "auto":
+                fmt, lines = _detect_format(name, lines)
+            reader = iter_jsonl_rows if fmt == "jsonl" else iter_csv_rows
+            yield from reader(lines, method)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+def chunked(rows: Iterable[Row], chunk_size: int) -> Iterator[List[Row]]:
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+class _CsvWriter:
+    def __init__(self, out: TextIO) -> None:
+        self._writer = csv.writer(out, lineterminator="\n")
+        self._writer.writerow(OUTPUT_COLUMNS)
+
+    def write(self, rows: List[List[str]]) -> None:
+        self._writer.writerows(rows)
+
+
+class _JsonlWriter:
+    def __init__(self, out: TextIO) -> None:
+        self._out = out
+
+    def write(self, rows: List[List[str]]) -> None:
+        self._out.write("".join(
+            json.dumps(json_row(row), ensure_ascii=False) + "\n"
+            for row in rows
+        ))
+
+
+# ---------------------------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------------------------
+def _evaluate(methods: Any, chunk: List[Row], keep: bool) -> Tuple[List[List[str]], Optional[tuple]]:
+    """Formatted rows of *chunk*, plus the raw columns when *keep* (for ``--store``)."""
+    names, v1, v2, res = evaluate_rows(methods, chunk)
+    return format_rows(chunk, names, res), ((names, v1, v2, res) if keep else None)
+
+
+def _run_chunk(chunk: List[Row], keep: bool = False) -> Tuple[List[List[str]], Optional[tuple]]:
+    """Pool task: evaluate one chunk with the worker's registry."""
+    from core import parallel
+
+    return _evaluate(parallel._worker_methods, chunk, keep)
+
+
+def _evaluate_parallel(
+    chunks: Iterable[List[Row]],
+    methods_file: str,
+    workers: int,
+    keep: bool,
+    write: Callable[[Tuple[List[List[str]], Optional[tuple]]], None],
+) -> None:
+    from concurrent.futures import ProcessPoolExecutor
+
+    from core.parallel import _init_worker
+
+    window = 2 * workers
+    pending: "collections.deque" = collections.deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(methods_file,)) as pool:
+        for chunk in chunks:
+            pending.append(pool.submit(_run_chunk, chunk, keep))
+            if len(pending) >= window:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+
+
+def run(
+    inputs: Sequence[str],
+    out: TextIO,
+    methods_file: str,
+    method: Optional[str] = None,
+    input_format: str = "auto",
+    output_format: str = "csv",
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    encoding: str = "utf-8",
+    store: Optional[str] = None,
+) -> int:
+    """Evaluate *inputs* and stream results to *out*; return the row count.
+
+    With *store*, results are also appended to that
+    :class:`core.results.ResultStore` directory.
+    """
+    from core.snapshot import load_methods_cached
+
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+    methods: Dict[str, Any] = load_methods_cached(methods_file)
+    if method is not None and method not in methods:
+        raise ValueError(f"Unknown method {method!r} (not in {methods_file})")
+
+    writer = _JsonlWriter(out) if output_format == "jsonl" else _CsvWriter(out)
+    result_store = None
+    if store is not None:
+        from core.results import ResultStore
+
+        result_store = ResultStore(store, mode="a")
+    rows = 0
+
+    def write(result: Tuple[List[List[str]], Optional[tuple]]) -> None:
+        nonlocal rows
+        formatted, raw = result
+        writer.write(formatted)
+        out.flush()
+        if result_store is not None:
+            result_store.append(*raw)
+        rows += len(formatted)
+
+    chunks = chunked(iter_input_rows(inputs, input_format, method, encoding), chunk_size)
+    keep = result_store is not None
+    try:
+        if workers > 1:
+            _evaluate_parallel(chunks, methods_file, workers, keep, write)
+        else:
+            for chunk in chunks:
+                write(_evaluate(methods, chunk, keep))
+    finally:
+        if result_store is not None:
+            result_store.close()
+    return rows
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m core",
+        description="Evaluate duplicate result pairs against method r / R / 0.75R.",
+    )
+    parser.add_argument("inputs", nargs="*", default=["-"], help="CSV / JSONL files ('-' or none: stdin)")
+    parser.add_argument("--method", help="method applied to every row (no Method column needed)")
+    parser.add_argument("--methods-file", default="methods_enriched.csv", help="method registry CSV")
+    parser.add_argument("--format", dest="output_format", choices=OUTPUT_FORMATS, default="csv",
+                        help="output format (default: csv)")
+    parser.add_argument("--input-format", choices=INPUT_FORMATS, default="auto",
+                        help="input format (default: from extension, sniffed for stdin)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default: 1)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per chunk")
+    parser.add_argument("--encoding", default="utf-8", help="input file encoding")
+    parser.add_argument("--store", metavar="DIR", help="also append results to a binary result store")
+    parser.add_argument("--profile", action="store_true",
+                        help="print call timings and per-method counts to stderr (with --workers 1)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress to stderr")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be >= 1")
+    configure_logging(logging.INFO if args.verbose else logging.WARNING)
+    if args.profile:
+        from core.instrument import enable
+
+        instrumentation = enable()
+    try:
+        rows = run(
+            args.inputs, sys.stdout, args.methods_file,
+            method=args.method,
+            input_format=args.input_format,
+            output_format=args.output_format,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            encoding=args.encoding,
+            store=args.store,
+        )
+    except BrokenPipeError:
+        # Downstream closed early (e.g. `| head`); silence the flush at exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except (OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    logger.info("Evaluated %d rows", rows)
+    if args.profile:
+        print(instrumentation.summary(), file=sys.stderr)
+    return 0
@@ -0,0 +1,322 @@
+# Incremental control-chart statistics for Method Precision Calculator
+
+"""Track precision drift per method without rescanning history.
+
+Every :func:`core.calc_tolerance` result updates a small fixed-size state for
+its method in O(1):
+
+* running mean and standard deviation of ``|diff|`` (Welford);
+* observed-vs-published precision ratios for r and R. The duplicate
+  difference ``d`` of a method with repeatability ``r`` has
+  ``E[d²] = 2·(r / 2.8)²``, so ``2.8 · sqrt(mean(d² / r²) / 2)`` is 1.0 when
+  the lab performs exactly as published and grows as precision degrades;
+* Shewhart, EWMA and CUSUM signals on the standardised range
+  ``u = |d| / σr`` with ``σr = r / 2.8`` taken at each result's average (so
+  formula methods are charted on one scale). For in-control duplicates ``u``
+  has mean ``d2 = 1.128`` and standard deviation ``d3 = 0.853``.
+
+``ControlCharts`` holds the state of all methods; ``snapshot`` / ``restore``
+(and ``save`` / ``load`` as JSON) carry it across restarts.
+
+It provides:
+* ``ChartParams`` – chart constants (EWMA λ and L, CUSUM k and h, Shewhart).
+* ``MethodStats`` – the per-method state and derived statistics.
+* ``Signals`` – which charts signalled for one update.
+* ``ControlCharts`` – the engine; ``get_control_charts`` shares one per file.
+"""
+
+import atexit
+import json
+import math
+import os
+import tempfile
+import threading
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional
+
+from core import PRECISION_FACTOR, logger
+
+STATE_VERSION = 1
+
+# Mean and standard deviation of the range of two normal results, in σ units.
+D2 = 1.128
+D3 = 0.853
+
+
+@dataclass(frozen=True)
+class ChartParams:
+    """Chart constants; the defaults are the usual textbook choices."""
+
+    ewma_lambda: float = 0.2
+    ewma_L: float = 3.0
+    cusum_k: float = 0.5
+    cusum_h: float = 5.0
+    # Upper limit of a duplicate-range chart: D4·d2 = 3.267 · 1.128.
+    shewhart_ucl: float = 3.686
+
+    @property
+    def ewma_ucl(self) -> float:
+        lam = self.ewma_lambda
+        return D2 + self.ewma_L * D3 * math.sqrt(lam / (2.0 - lam))
+
+
+class Signals(NamedTuple):
+    """Which charts signalled on one update."""
+
+    shewhart: bool = False
+    ewma: bool = False
+    cusum: bool = False
+
+    def __bool__(self) -> bool:
+        return self.shewhart or self.ewma or self.cusum
+
+
+@dataclass
+class MethodStats:
+    """Running statistics of one method (all O(1) in size)."""
+
+    n: int = 0
+    mean_diff: float = 0.0
+    m2_diff: float = 0.0
+    # Results whose r / R was positive, and their sums of (d / r)² and (d / R)².
+    n_r: int = 0
+    sum_sq_r: float = 0.0
+    n_R: int = 0
+    sum_sq_R: float = 0.0
+    r_failures: int = 0
+    R_failures: int = 0
+    ewma: float = D2
+    cusum: float = 0.0
+    shewhart_signals: int = 0
+    ewma_signals: int = 0
+    cusum_signals: int = 0
+    last_timestamp: Optional[float] = None
+
+    # -- derived --------------------------------------------------------------
+    @property
+    def std_diff(self) -> float:
+        """Sample standard deviation of ``|diff|`` (0 below two results)."""
+        return math.sqrt(self.m2_diff / (self.n - 1)) if self.n > 1 else 0.0
+
+    @property
+    def r_ratio(self) -> Optional[float]:
+        """Observed / published repeatability (``None`` before any result)."""
+        if not self.n_r:
+            return None
+        return PRECISION_FACTOR * math.sqrt(self.sum_sq_r / self.n_r / 2.0)
+
+    @property
+    def R_ratio(self) -> Optional[float]:
+        """Observed / published reproducibility (``None`` before any result)."""
+        if not self.n_R:
+            return None
+        return PRECISION_FACTOR * math.sqrt(self.sum_sq_R / self.n_R / 2.0)
+
+    # -- update ---------------------------------------------------------------
+    def update(
+        self,
+        diff: float,
+        r: float,
+        R: float,
+        params: ChartParams,
+        timestamp: Optional[float] = None,
+    ) -> Signals:
+        """Fold one result into the state and return the chart signals."""
+        self.n += 1
+        delta = diff - self.mean_diff
+        self.mean_diff += delta / self.n
+        self.m2_diff += delta * (diff - self.mean_diff)
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+
+        if R > 0:
+            self.n_R += 1
+            self.sum_sq_R += (diff / R) ** 2
+            self.R_failures += diff > R
+        if r <= 0:
+            return Signals()
+        self.n_r += 1
+        self.sum_sq_r += (diff / r) ** 2
+        self.r_failures += diff > r
+
+        u = diff * PRECISION_FACTOR / r
+        lam = params.ewma_lambda
+        self.ewma = lam * u + (1.0 - lam) * self.ewma
+        self.cusum = max(0.0, self.cusum + (u - D2) / D3 - params.cusum_k)
+
+        signals = Signals(
+            shewhart=u > params.shewhart_ucl,
+            ewma=self.ewma > params.ewma_ucl,
+            cusum=self.cusum > params.cusum_h,
+        )
+        self.shewhart_signals += signals.shewhart
+        self.ewma_signals += signals.ewma
+        if signals.cusum:
+            self.cusum_signals += 1
+            self.cusum = 0.0  # restart after a signal
+        return signals
+
+    def summary(self, params: ChartParams) -> Dict[str, Any]:
+        """Flat dictionary for tables and reports."""
+        return {
+            "n": self.n,
+            "mean_diff": self.mean_diff,
+            "std_diff": self.std_diff,
+            "r_ratio": self.r_ratio,
+            "R_ratio": self.R_ratio,
+            "r_failures": self.r_failures,
+            "R_failures": self.R_failures,
+            "ewma": self.ewma,
+            "ewma_ucl": params.ewma_ucl,
+            "cusum": self.cusum,
+            "shewhart_signals": self.shewhart_signals,
+            "ewma_signals": self.ewma_signals,
+            "cusum_signals": self.cusum_signals,
+        }
+
+
+_STAT_FIELDS = [f.name for f in fields(MethodStats)]
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+class ControlCharts:
+    """Per-method control-chart state, safe to share between threads."""
+
+    def __init__(self, params: Optional[ChartParams] = None) -> None:
+        self.params = params or ChartParams()
+        self._stats: Dict[str, MethodStats] = {}
+        self._lock = threading.Lock()
+
+    def update(
+        self,
+        method_name: str,
+        diff: float,
+        r: float,
+        R: float,
+        timestamp: Optional[float] = None,
+    ) -> Signals:
+        """Add one result for *method_name*; return the chart signals."""
+        with self._lock:
+            stats = self._stats.get(method_name)
+            if stats is None:
+                stats = self._stats[method_name] = MethodStats()
+            return stats.update(diff, r, R, self.params, timestamp)
+
+    def update_result(self, result: Mapping[str, Any], timestamp: Optional[float] = None) -> Signals:
+        """Add a :func:`core.calc_tolerance` result."""
+        return self.update(result["method_name"], result["diff"], result["r"], result["R"], timestamp)
+
+    def stats(self, method_name: str) -> Optional[MethodStats]:
+        with self._lock:
+            stats = self._stats.get(method_name)
+            return MethodStats(**asdict(stats)) if stats is not None else None
+
+    def methods(self) -> List[str]:
+        with self._lock:
+            return sorted(self._stats)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """One row per method (sorted by name) for display."""
+        with self._lock:
+            return [
+                {"method": name, **self._stats[name].summary(self.params)}
+                for name in sorted(self._stats)
+            ]
+
+    def reset(self, method_name: Optional[str] = None) -> None:
+        """Forget one method's state (or all)."""
+        with self._lock:
+            if method_name is None:
+                self._stats.clear()
+            else:
+                self._stats.pop(method_name, None)
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    # -- persistence ----------------------------------------------------------
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the complete state as JSON-serialisable data."""
+        with self._lock:
+            return {
+                "version": STATE_VERSION,
+                "params": asdict(self.params),
+                "fields": _STAT_FIELDS,
+                "methods": {
+                    name: [getattr(s, f) for f in _STAT_FIELDS] for name, s in self._stats.items()
+                },
+            }
+
+    @classmethod
+    def restore(cls, data: Mapping[str, Any]) -> "ControlCharts":
+        """Rebuild an engine from :meth:`snapshot` output."""
+        if data.get("version") != STATE_VERSION:
+            raise ValueError(f"Unsupported control-chart state version {data.get('version')!r}")
+        charts = cls(ChartParams(**data["params"]))
+        names = data["fields"]
+        for method_name, values in data["methods"].items():
+            charts._stats[method_name] = MethodStats(**dict(zip(names, values)))
+        return charts
+
+    def save(self, path: str | Path) -> None:
+        """Write :meth:`snapshot` to *path* as JSON, atomically."""
+        path = Path(path)
+        data = self.snapshot()
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path: str | Path, params: Optional[ChartParams] = None) -> "ControlCharts":
+        """Load state saved with :meth:`save`; a missing or unreadable file starts fresh.
+
+        *params*, when given, replace the chart constants stored in the file
+        (the accumulated statistics are kept); ``None`` keeps the stored ones.
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                charts = cls.restore(json.load(f))
+        except FileNotFoundError:
+            return cls(params)
+        except (ValueError, KeyError, TypeError) as exc:
+            logger.warning("Ignoring unreadable control-chart state %s: %s", path, exc)
+            return cls(params)
+        if params is not None:
+            charts.params = params
+        return charts
+
+
+# ---------------------------------------------------------------------------
+# Process-wide instances
+# ---------------------------------------------------------------------------
+_engines: Dict[Path, ControlCharts] = {}
+_engines_lock = threading.Lock()
+
+
+def _save_quietly(charts: ControlCharts, path: Path) -> None:
+    try:
+        charts.save(path)
+    except OSError as exc:
+        logger.warning("Could not save control-chart state %s: %s", path, exc)
+
+
+def get_control_charts(state_path: str | Path) -> ControlCharts:
+    """Return the shared engine persisted at *state_path*, loading it once.
+
+    The state is saved again when the interpreter exits.
+    """
+    key = Path(state_path).resolve()
+    with _engines_lock:
+        charts = _engines.get(key)
+        if charts is None:
+            charts = _engines[key] = ControlCharts.load(key)
+            atexit.register(_save_quietly, charts, key)
+        return charts
@@ -0,0 +1,339 @@
+# Formula compilation layer for Method Precision Calculator
+
+"""Compile ``Formula_r`` / ``Formula_R`` strings once and reuse them.
+
+Formulas in ``methods_enriched.csv`` are short arithmetic expressions of
+``avg`` (``0.029 * avg``, ``12 * avg**0.5`` …). Each formula is parsed with
+:mod:`ast`, checked against a strict arithmetic whitelist and turned into a
+:class:`CompiledFormula` – no ``eval`` is involved. The common shapes
+
+* ``k * avg`` / ``k * (avg + c)`` → ``kind="linear"``, ``coefficients=(k, c)``
+* ``k * avg ** p``                → ``kind="power"``,  ``coefficients=(k, p)``
+* a bare number                   → ``kind="constant"``, ``coefficients=(k,)``
+
+are reduced to coefficient tuples and evaluated with a single multiply (and
+add or power); everything else becomes a tree of small closures. The same
+compiled form drives scalar and NumPy evaluation.
+
+It provides:
+* ``FormulaCache`` – a thread-safe LRU of compiled formulas with
+  hit/miss/eviction counters.
+* ``compile_formula`` – cached compilation through the module-level cache.
+* ``make_evaluator`` – a callable ``f(avg) -> float`` for a formula.
+* ``FormulaError`` – raised for syntactically valid but disallowed formulas.
+"""
+
+import ast
+import math
+import operator
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# ---------------------------------------------------------------------------
+# Whitelisted namespace
+# ---------------------------------------------------------------------------
+SAFE_FUNCTIONS: Dict[str, Any] = {
+    "abs": abs,
+    "sqrt": math.sqrt,
+    "log": math.log,
+    "exp": math.exp,
+    "pow": pow,
+}
+
+VARIABLE = "avg"
+
+_BINARY_OPS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.Mod: operator.mod,
+}
+
+_UNARY_OPS: Dict[type, Callable[[Any], Any]] = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+DEFAULT_CACHE_SIZE = 256
+
+
+class FormulaError(ValueError):
+    """A formula uses syntax outside the arithmetic whitelist."""
+
+
+# ---------------------------------------------------------------------------
+# AST validation and compilation
+# ---------------------------------------------------------------------------
+def parse_formula(formula: str) -> ast.expr:
+    """Parse *formula* and return its validated expression node.
+
+    ``SyntaxError`` propagates for unparsable text; :class:`FormulaError` is
+    raised for any node outside numbers, ``avg``, ``+ - * / ** %``, unary
+    ``+``/``-`` and positional calls to :data:`SAFE_FUNCTIONS`.
+    """
+
+    tree = ast.parse(formula.strip(), mode="eval")
+    _validate(tree.body, formula)
+    return tree.body
+
+
+def _validate(node: ast.AST, formula: str) -> None:
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise FormulaError(f"Only numeric constants are allowed in {formula!r}")
+    elif isinstance(node, ast.Name):
+        if node.id != VARIABLE:
+            raise FormulaError(f"Unknown name {node.id!r} in {formula!r}; only {VARIABLE!r} is allowed")
+    elif isinstance(node, ast.BinOp):
+        if type(node.op) not in _BINARY_OPS:
+            raise FormulaError(f"Operator {type(node.op).__name__} is not allowed in {formula!r}")
+        _validate(node.left, formula)
+        _validate(node.right, formula)
+    elif isinstance(node, ast.UnaryOp):
+        if type(node.op) not in _UNARY_OPS:
+            raise FormulaError(f"Operator {type(node.op).__name__} is not allowed in {formula!r}")
+        _validate(node.operand, formula)
+    elif isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in SAFE_FUNCTIONS:
+            raise FormulaError(f"Only {sorted(SAFE_FUNCTIONS)} may be called in {formula!r}")
+        if node.keywords:
+            raise FormulaError(f"Keyword arguments are not allowed in {formula!r}")
+        for arg in node.args:
+            if isinstance(arg, ast.Starred):
+                raise FormulaError(f"Starred arguments are not allowed in {formula!r}")
+            _validate(arg, formula)
+    else:
+        raise FormulaError(f"{type(node).__name__} is not allowed in {formula!r}")
+
+
+def _number(node: ast.expr) -> Optional[float]:
+    """Return the value of a (possibly negated) numeric literal, else ``None``."""
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.operand, ast.Constant):
+        return _UNARY_OPS[type(node.op)](node.operand.value)
+    return None
+
+
+def _is_avg(node: ast.expr) -> bool:
+    return isinstance(node, ast.Name) and node.id == VARIABLE
+
+
+def _shift(node: ast.expr) -> Optional[float]:
+    """Return ``c`` if *node* is ``avg``, ``avg + c`` or ``avg - c``."""
+    if _is_avg(node):
+        return 0
+    if isinstance(node, ast.BinOp) and _is_avg(node.left) and isinstance(node.op, (ast.Add, ast.Sub)):
+        c = _number(node.right)
+        if c is not None:
+            return c if isinstance(node.op, ast.Add) else -c
+    return None
+
+
+def _exponent(node: ast.expr) -> Optional[float]:
+    """Return ``p`` if *node* is ``avg ** p``."""
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow) and _is_avg(node.left):
+        return _number(node.right)
+    return None
+
+
+def classify(node: ast.expr) -> Tuple[str, Tuple[float, ...]]:
+    """Recognise the common formula shapes; ``("generic", ())`` otherwise."""
+    k = _number(node)
+    if k is not None:
+        return "constant", (k,)
+    c = _shift(node)
+    if c is not None:
+        return "linear", (1, c)
+    p = _exponent(node)
+    if p is not None:
+        return "power", (1, p)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mult):
+        for coef, term in ((node.left, node.right), (node.right, node.left)):
+            k = _number(coef)
+            if k is None:
+                continue
+            c = _shift(term)
+            if c is not None:
+                return "linear", (k, c)
+            p = _exponent(term)
+            if p is not None:
+                return "power", (k, p)
+    return "generic", ()
+
+
+def _build(node: ast.expr, functions: Dict[str, Any]) -> Callable[[Any], Any]:
+    """Turn a validated node into a closure ``f(avg)`` using *functions*."""
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda avg: value
+    if isinstance(node, ast.Name):
+        return lambda avg: avg
+    if isinstance(node, ast.UnaryOp):
+        op = _UNARY_OPS[type(node.op)]
+        operand = _build(node.operand, functions)
+        return lambda avg: op(operand(avg))
+    if isinstance(node, ast.BinOp):
+        op = _BINARY_OPS[type(node.op)]
+        left = _build(node.left, functions)
+        right = _build(node.right, functions)
+        return lambda avg: op(left(avg), right(avg))
+    # ast.Call – guaranteed whitelisted by _validate
+    func = functions[node.func.id]
+    args = [_build(a, functions) for a in node.args]
+    return lambda avg: func(*(a(avg) for a in args))
+
+
+def _specialise(kind: str, coefficients: Tuple[float, ...]) -> Callable[[Any], Any]:
+    """Return a closure for a recognised shape (works for floats and arrays)."""
+    if kind == "constant":
+        (k,) = coefficients
+        return lambda avg: k
+    k, x = coefficients
+    if kind == "linear":
+        if x == 0:
+            return (lambda avg: avg) if k == 1 else (lambda avg: k * avg)
+        return (lambda avg: avg + x) if k == 1 else (lambda avg: k * (avg + x))
+    return (lambda avg: avg ** x) if k == 1 else (lambda avg: k * avg ** x)
+
+
+@dataclass(frozen=True)
+class CompiledFormula:
+    """A validated, compiled formula.
+
+    Calling the object evaluates it for a scalar ``avg``; :meth:`evaluate_array`
+    evaluates it element-wise with NumPy ufuncs.
+    """
+
+    formula: str
+    kind: str
+    coefficients: Tuple[float, ...]
+    node: ast.expr = field(repr=False, compare=False)
+    scalar: Callable[[float], float] = field(repr=False, compare=False)
+    _array: list = field(default_factory=list, repr=False, compare=False)
+
+    def __call__(self, avg: float) -> float:
+        return self.scalar(avg)
+
+    def evaluate_array(self, avg: Any) -> Any:
+        """Evaluate for a NumPy array ``avg`` (whitelisted calls map to ufuncs)."""
+        if not self._array:
+            if self.kind == "generic":
+                from core.batch import ARRAY_FUNCTIONS
+
+                self._array.append(_build(self.node, ARRAY_FUNCTIONS))
+            else:
+                # Specialised shapes use plain operators, valid for arrays too.
+                self._array.append(self.scalar)
+        return self._array[0](avg)
+
+
+def compile_expression(formula: str) -> CompiledFormula:
+    """Parse, validate and compile *formula* (uncached)."""
+    node = parse_formula(formula)
+    kind, coefficients = classify(node)
+    scalar = _build(node, SAFE_FUNCTIONS) if kind == "generic" else _specialise(kind, coefficients)
+    return CompiledFormula(formula, kind, coefficients, node, scalar)
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """Snapshot of the counters of a :class:`FormulaCache`."""
+
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+
+# ---------------------------------------------------------------------------
+# LRU cache of compiled formulas
+# ---------------------------------------------------------------------------
+class FormulaCache:
+    """Bounded LRU cache mapping formula strings to :class:`CompiledFormula`."""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, CompiledFormula]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, formula: str) -> CompiledFormula:
+        """Return the compiled form of *formula*, compiling it on a miss.
+
+        ``SyntaxError`` / :class:`FormulaError` propagate and nothing is cached.
+        """
+        with self._lock:
+            compiled = self._entries.get(formula)
+            if compiled is not None:
+                self._entries.move_to_end(formula)
+                self._hits += 1
+                return compiled
+            self._misses += 1
+
+        # Compile outside the lock – concurrent misses on the same string are
+        # harmless, the last writer wins.
+        compiled = compile_expression(formula)
+
+        with self._lock:
+            self._entries[formula] = compiled
+            self._entries.move_to_end(formula)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return compiled
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._entries),
+                maxsize=self.maxsize,
+            )
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = 0
+
+
+_cache = FormulaCache()
+
+
+def compile_formula(formula: str) -> CompiledFormula:
+    """Compile *formula* through the process-wide cache."""
+    return _cache.get(formula)
+
+
+def cache_stats() -> CacheStats:
+    """Return hit/miss/eviction counters of the process-wide cache."""
+    return _cache.stats()
+
+
+def clear_cache() -> None:
+    """Reset the process-wide cache (mainly for tests and benchmarks)."""
+    _cache.clear()
+
+
+# ---------------------------------------------------------------------------
+# Evaluators
+# ---------------------------------------------------------------------------
+def make_evaluator(formula: str) -> Callable[[float], float]:
+    """Return ``f(avg)`` for *formula*.
+
+    The returned function is shared by every method using the same formula
+    string (while it stays in the cache).
+    """
+    return compile_formula(formula).scalar
@@ -0,0 +1,361 @@
+# Persistent calculation history for Method Precision Calculator
+
+"""Store calculation history in SQLite instead of an in-memory list.
+
+The database runs in WAL mode so the web app can read while another session
+writes. Records are buffered and written in batches (one transaction per
+``batch_size`` records, or whenever the history is read). Queries page with
+``LIMIT`` / ``OFFSET`` over indexes on time, method and pass/fail, and the CSV
+export is streamed from a cursor, so neither grows with the size of the
+history.
+
+It provides:
+* ``HistoryRecord`` – one stored calculation.
+* ``HistoryStore`` – the SQLite store (``add``, ``flush``, ``count``,
+  ``page``, ``iter_csv``, ``write_csv``, ``clear``).
+* ``display_row`` – the History tab's formatting of a record.
+* ``get_history_store`` – the shared store for a database path.
+"""
+
+import atexit
+import csv
+import io
+import sqlite3
+import threading
+import time
+from dataclasses import astuple, dataclass, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from core import logger
+
+DEFAULT_BATCH_SIZE = 100
+
+# Rows fetched per round trip while exporting.
+EXPORT_FETCH_SIZE = 5_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id              INTEGER PRIMARY KEY,
+    timestamp       REAL    NOT NULL,
+    session         TEXT    NOT NULL DEFAULT '',
+    method          TEXT    NOT NULL,
+    unit            TEXT    NOT NULL DEFAULT '',
+    decimals        INTEGER NOT NULL DEFAULT 4,
+    v1              REAL    NOT NULL,
+    v2              REAL    NOT NULL,
+    avg             REAL    NOT NULL,
+    diff            REAL    NOT NULL,
+    repeatability   REAL    NOT NULL,
+    reproducibility REAL    NOT NULL,
+    tolerance_075R  REAL    NOT NULL,
+    repeatability_pass   INTEGER NOT NULL,
+    reproducibility_pass INTEGER NOT NULL,
+    tolerance_pass  INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_timestamp ON history (timestamp);
+CREATE INDEX IF NOT EXISTS history_method ON history (method, timestamp);
+CREATE INDEX IF NOT EXISTS history_pass
+    ON history (repeatability_pass, reproducibility_pass, tolerance_pass, timestamp);
+CREATE INDEX IF NOT EXISTS history_session ON history (session, timestamp);
+"""
+
+# Columns shown in the History tab and written by the CSV export.
+DISPLAY_COLUMNS = ["Time", "Method", "V1", "V2", "Avg", "|Diff|", "r", "R", "0.75R", "r ✓", "0.75R ✓", "R ✓"]
+
+
+@dataclass(frozen=True)
+class HistoryRecord:
+    """One calculation as stored in the ``history`` table."""
+
+    timestamp: float
+    session: str
+    method: str
+    unit: str
+    decimals: int
+    v1: float
+    v2: float
+    avg: float
+    diff: float
+    r: float
+    R: float
+    tolerance_075R: float
+    r_pass: bool
+    R_pass: bool
+    tolerance_pass: bool
+
+    @classmethod
+    def from_result(
+        cls,
+        result: Dict[str, Any],
+        v1: float,
+        v2: float,
+        decimals: int,
+        session: str = "",
+        timestamp: Optional[float] = None,
+    ) -> "HistoryRecord":
+        """Build a record from a :func:`core.calc_tolerance` result."""
+        return cls(
+            timestamp=time.time() if timestamp is None else timestamp,
+            session=session,
+            method=result["method_name"],
+            unit=result["unit"],
+            decimals=decimals,
+            v1=v1,
+            v2=v2,
+            avg=result["avg"],
+            diff=result["diff"],
+            r=result["r"],
+            R=result["R"],
+            tolerance_075R=result["tolerance_075R"],
+            r_pass=bool(result["r_pass"]),
+            R_pass=bool(result["R_pass"]),
+            tolerance_pass=bool(result["tolerance_pass"]),
+        )
+
+
+# SQLite column names are case-insensitive, so r / R get distinct names.
+_COLUMN_NAMES = {
+    "r": "repeatability",
+    "R": "reproducibility",
+    "r_pass": "repeatability_pass",
+    "R_pass": "reproducibility_pass",
+}
+_COLUMNS = [_COLUMN_NAMES.get(f.name, f.name) for f in fields(HistoryRecord)]
+_INSERT = f"INSERT INTO history ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+_SELECT = f"SELECT {', '.join(_COLUMNS)} FROM history"
+_ALL_PASS = "repeatability_pass = 1 AND reproducibility_pass = 1 AND tolerance_pass = 1"
+
+
+def _record(row: Sequence[Any]) -> HistoryRecord:
+    values = list(row)
+    for i in (-3, -2, -1):
+        values[i] = bool(values[i])
+    return HistoryRecord(*values)
+
+
+def _mark(passed: bool) -> str:
+    return "✅" if passed else "❌"
+
+
+def display_row(record: HistoryRecord) -> Dict[str, Any]:
+    """Format *record* with the History tab's column names."""
+    d = record.decimals
+    return {
+        "Time": datetime.fromtimestamp(record.timestamp).strftime("%Y-%m-%d %H:%M:%S"),
+        "Method": record.method,
+        "V1": round(record.v1, d),
+        "V2": round(record.v2, d),
+        "Avg": round(record.avg, d),
+        "|Diff|": round(record.diff, d),
+        "r": round(record.r, d),
+        "R": round(record.R, d),
+        "0.75R": round(record.tolerance_075R, d),
+        "r ✓": _mark(record.r_pass),
+        "0.75R ✓": _mark(record.tolerance_pass),
+        "R ✓": _mark(record.R_pass),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+class HistoryStore:
+    """SQLite-backed calculation history, safe to share between threads."""
+
+    def __init__(self, db_path: str | Path, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.path = Path(db_path)
+        self.batch_size = batch_size
+        self._lock = threading.RLock()
+        self._pending: List[Tuple[Any, ...]] = []
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # -- writing ------------------------------------------------------------
+    def add(self, record: HistoryRecord) -> None:
+        """Queue *record*; it is written with the next batch."""
+        with self._lock:
+            self._pending.append(astuple(record))
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def add_many(self, records: Iterable[HistoryRecord]) -> None:
+        for record in records:
+            self.add(record)
+
+    def flush(self) -> int:
+        """Write queued records in one transaction; return how many."""
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> int:
+        pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        try:
+            with self._conn:
+                self._conn.executemany(_INSERT, pending)
+        except sqlite3.Error:
+            self._pending = pending + self._pending
+            logger.exception("Writing %d history records to %s failed", len(pending), self.path)
+            raise
+        return len(pending)
+
+    def clear(self, session: Optional[str] = None) -> int:
+        """Delete the history of *session* (or everything); return rows deleted."""
+        with self._lock:
+            self._flush_locked()
+            with self._conn:
+                if session is None:
+                    cur = self._conn.execute("DELETE FROM history")
+                else:
+                    cur = self._conn.execute("DELETE FROM history WHERE session = ?", (session,))
+            return cur.rowcount
+
+    # -- reading --------------------------------------------------------------
+    @staticmethod
+    def _where(
+        session: Optional[str],
+        method: Optional[str],
+        passed: Optional[bool],
+        since: Optional[float],
+    ) -> Tuple[str, List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if session is not None:
+            clauses.append("session = ?")
+            params.append(session)
+        if method is not None:
+            clauses.append("method = ?")
+            params.append(method)
+        if passed is True:
+            clauses.append(_ALL_PASS)
+        elif passed is False:
+            clauses.append(f"NOT ({_ALL_PASS})")
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def count(
+        self,
+        session: Optional[str] = None,
+        method: Optional[str] = None,
+        passed: Optional[bool] = None,
+        since: Optional[float] = None,
+    ) -> int:
+        """Number of records matching the filters."""
+        where, params = self._where(session, method, passed, since)
+        with self._lock:
+            self._flush_locked()
+            return self._conn.execute(f"SELECT COUNT(*) FROM history{where}", params).fetchone()[0]
+
+    def page(
+        self,
+        limit: int,
+        offset: int = 0,
+        session: Optional[str] = None,
+        method: Optional[str] = None,
+        passed: Optional[bool] = None,
+        since: Optional[float] = None,
+    ) -> List[HistoryRecord]:
+        """Return up to *limit* records, newest first, skipping *offset*.
+
+        *passed* selects records passing (``True``) or failing (``False``)
+        any of the r / R / 0.75R checks.
+        """
+        where, params = self._where(session, method, passed, since)
+        sql = f"{_SELECT}{where} ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(sql, [*params, limit, offset]).fetchall()
+        return [_record(row) for row in rows]
+
+    def iter_records(
+        self,
+        session: Optional[str] = None,
+        method: Optional[str] = None,
+        passed: Optional[bool] = None,
+        since: Optional[float] = None,
+    ) -> Iterator[HistoryRecord]:
+        """Yield matching records oldest first, fetching in blocks.
+
+        A separate read connection is used, so the export sees a consistent
+        WAL snapshot and does not block writers.
+        """
+        self.flush()
+        where, params = self._where(session, method, passed, since)
+        conn = sqlite3.connect(str(self.path))
+        try:
+            cur = conn.execute(f"{_SELECT}{where} ORDER BY timestamp, id", params)
+            while True:
+                rows = cur.fetchmany(EXPORT_FETCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    yield _record(row)
+        finally:
+            conn.close()
+
+    def iter_csv(self, **filters: Any) -> Iterator[str]:
+        """Yield the CSV export (header first) in text chunks."""
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=DISPLAY_COLUMNS, lineterminator="\n")
+        writer.writeheader()
+        n = 0
+        for record in self.iter_records(**filters):
+            writer.writerow(display_row(record))
+            n += 1
+            if n % EXPORT_FETCH_SIZE == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    def write_csv(self, out_file: TextIO, **filters: Any) -> None:
+        """Stream the CSV export into *out_file*."""
+        for chunk in self.iter_csv(**filters):
+            out_file.write(chunk)
+
+    # -- lifecycle ----------------------------------------------------------
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._flush_locked()
+            finally:
+                self._conn.close()
+
+    def __enter__(self) -> "HistoryStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count()
+
+
+# ---------------------------------------------------------------------------
+# Process-wide instances
+# ---------------------------------------------------------------------------
+_stores: Dict[Path, HistoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_history_store(db_path: str | Path, batch_size: int = DEFAULT_BATCH_SIZE) -> HistoryStore:
+    """Return the shared :class:`HistoryStore` for *db_path*, opening it once.
+
+    Queued records are flushed when the interpreter exits.
+    """
+    key = Path(db_path).resolve()
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = HistoryStore(key, batch_size=batch_size)
+            atexit.register(store.flush)
+        return store
@@ -0,0 +1,173 @@
+# Prebuilt method search index for Method Precision Calculator
+
+"""Answer method lookups from prebuilt indexes instead of scanning the catalog.
+
+``MethodIndex`` is built once per catalog (the registry rebuilds it on reload)
+and holds:
+
+* exact-value indexes for the standard prefix (``D56``, ``D445``, ``EPA`` …),
+  revision year, sample matrix and unit;
+* a token inverted index over name, notes, scope, matrix and concentration
+  range, with a sorted vocabulary so query tokens also match as prefixes
+  (``sulf`` → ``sulfur``).
+
+Postings are sets of row numbers; a query intersects the smallest sets first
+and returns names in catalog order, so lookups stay well under a millisecond
+for catalogs of tens of thousands of methods.
+"""
+
+import bisect
+import re
+from typing import Dict, Iterable, List, Mapping, Optional, Set
+
+from core import Method
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STANDARD_RE = re.compile(r"[A-Za-z]+\d+")
+
+# Query words that carry no meaning for method lookup.
+STOPWORDS = frozenset({
+    "a", "all", "an", "and", "by", "for", "in", "method", "methods", "of", "on", "the", "to", "with",
+})
+
+# Fields feeding the full-text index.
+TEXT_FIELDS = ("name", "notes", "scope", "matrix", "conc_range")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case alphanumeric tokens of *text*."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def standard_prefix(name: str) -> str:
+    """Return the base standard of a method name (``D445-24 (…)`` → ``D445``).
+
+    Names without a letter+digit designation fall back to their first word
+    (``EPA 40 CFR 80 …`` → ``EPA``).
+    """
+    match = _STANDARD_RE.match(name.strip())
+    if match:
+        return match.group(0).upper()
+    words = name.split()
+    return words[0].upper() if words else ""
+
+
+def _string_columns(methods: Mapping[str, Method], names: List[str]) -> Dict[str, List[str]]:
+    """Return the indexed string fields column-wise.
+
+    A :class:`core.table.MethodTable` is read straight from its columns so
+    building the index does not materialise every ``Method``.
+    """
+    wanted = {"year", "unit", "matrix", *TEXT_FIELDS} - {"name"}
+    string_column = getattr(methods, "string_column", None)
+    if string_column is not None:
+        columns = {f: string_column(f) for f in wanted}
+    else:
+        rows = [methods[n] for n in names]
+        columns = {f: [getattr(m, f) for m in rows] for f in wanted}
+    columns["name"] = names
+    return columns
+
+
+class MethodIndex:
+    """Read-only search index over a ``name → Method`` mapping."""
+
+    def __init__(self, methods: Mapping[str, Method]) -> None:
+        self.names: List[str] = list(methods)
+        self.standard: Dict[str, Set[int]] = {}
+        self.year: Dict[str, Set[int]] = {}
+        self.matrix: Dict[str, Set[int]] = {}
+        self.unit: Dict[str, Set[int]] = {}
+        self.tokens: Dict[str, Set[int]] = {}
+
+        columns = _string_columns(methods, self.names)
+        for i, name in enumerate(self.names):
+            self.standard.setdefault(standard_prefix(name), set()).add(i)
+        for column, index in (("year", self.year), ("unit", self.unit)):
+            for i, value in enumerate(columns[column]):
+                index.setdefault(value, set()).add(i)
+        for i, value in enumerate(columns["matrix"]):
+            self.matrix.setdefault(value.lower(), set()).add(i)
+        # Text fields repeat heavily across variants: tokenize each distinct
+        # value once and add the row to every posting of that value.
+        token_cache: Dict[str, List[Set[int]]] = {}
+        tokens = self.tokens
+        for field in TEXT_FIELDS:
+            for i, value in enumerate(columns[field]):
+                postings = token_cache.get(value)
+                if postings is None:
+                    postings = token_cache[value] = [
+                        tokens.setdefault(tok, set()) for tok in dict.fromkeys(tokenize(value))
+                    ]
+                for rows in postings:
+                    rows.add(i)
+
+        self._vocabulary: List[str] = sorted(self.tokens)
+
+    # -- facets ---------------------------------------------------------------
+    def standards(self) -> List[str]:
+        """All standard prefixes, sorted."""
+        return sorted(self.standard)
+
+    def group_by_standard(self) -> Dict[str, List[str]]:
+        """``prefix → [names]`` in catalog order (replaces UI-side grouping)."""
+        return {p: [self.names[i] for i in sorted(rows)] for p, rows in sorted(self.standard.items())}
+
+    # -- text search ------------------------------------------------------------
+    def _token_rows(self, token: str) -> Set[int]:
+        """Rows containing *token* or any vocabulary word starting with it."""
+        lo = bisect.bisect_left(self._vocabulary, token)
+        hi = bisect.bisect_left(self._vocabulary, token + "\uffff", lo)
+        if hi - lo == 1:
+            return self.tokens[self._vocabulary[lo]]
+        rows: Set[int] = set()
+        for word in self._vocabulary[lo:hi]:
+            rows |= self.tokens[word]
+        return rows
+
+    def search(
+        self,
+        text: str = "",
+        standard: Optional[str] = None,
+        year: Optional[str] = None,
+        matrix: Optional[str] = None,
+        unit: Optional[str] = None,
+    ) -> List[str]:
+        """Return names matching every given criterion, in catalog order.
+
+        *text* is split into tokens that must all match (stopwords ignored).
+        An empty query returns every method.
+        """
+
+        candidates: List[Set[int]] = []
+        if standard:
+            candidates.append(self.standard.get(standard_prefix(standard), set()))
+        if year:
+            candidates.append(self.year.get(year, set()))
+        if matrix:
+            candidates.append(self.matrix.get(matrix.lower(), set()))
+        if unit:
+            candidates.append(self.unit.get(unit, set()))
+        for tok in tokenize(text):
+            if tok not in STOPWORDS:
+                candidates.append(self._token_rows(tok))
+
+        if not candidates:
+            return list(self.names)
+        candidates.sort(key=len)
+        rows = set(candidates[0])
+        for other in candidates[1:]:
+            if not rows:
+                break
+            rows &= other
+        return [self.names[i] for i in sorted(rows)]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+def build_index(methods: Mapping[str, Method] | Iterable[Method]) -> MethodIndex:
+    """Convenience constructor accepting a mapping or an iterable of methods."""
+    if not isinstance(methods, Mapping):
+        methods = {m.name: m for m in methods}
+    return MethodIndex(methods)
@@ -0,0 +1,538 @@
+# Instrument-feed ingestion for Method Precision Calculator
+
+"""Collect duplicate results from analyzers and evaluate them in micro-batches.
+
+Analyzers push one reading per line over TCP connections, pipes or files::
+
+    D93-20 A,S-1042,60.5                                   # method,sample,value
+    {"method": "D93-20 A", "sample": "S-1042", "value": 61.0}
+    {"method": "D93-20 A", "sample": "S-1043", "v1": 60.2, "v2": 60.9}
+
+The first two forms are single readings: two readings with the same method
+and sample – from any source – form a duplicate pair. The third form is a
+complete pair. Blank lines and lines starting with ``#`` are ignored; a TCP
+connection may name itself with a first line ``#source NAME``.
+
+The pipeline is::
+
+    sources ──► readings queue ──► pairing + batching ──► batch queue ──► evaluation ──► sink
+
+Both queues are bounded. When evaluation or the sink falls behind, the batch
+queue fills, pairing stops taking readings, the readings queue fills and
+every source stops reading – for TCP that pushes back on the analyzer through
+flow control. A batch is flushed when it holds ``batch_size`` pairs or
+``flush_interval`` seconds after its first pair, whichever comes first, and
+evaluated with :func:`core.batch.calc_tolerance_bulk` in a worker thread.
+
+Readings whose duplicate does not arrive within ``pair_timeout`` seconds (or
+beyond ``max_pending`` waiting readings) are dropped and counted.
+
+It provides:
+* ``Ingestor`` – the pipeline (``add_lines``, ``add_stream``, ``add_file``,
+  ``serve_tcp``, ``wait_sources``, ``close``, ``metrics``).
+* ``Pair`` / ``IngestBatch`` – what the sink receives.
+* ``SourceMetrics`` – per-source counters, queue depth and latency.
+* ``parse_line`` – the line format above.
+* ``main`` – ``python -m core.ingest``: listen / tail files, print JSON Lines.
+"""
+
+import argparse
+import asyncio
+import collections
+import csv
+import inspect
+import json
+import math
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Callable, Deque, Dict, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple,
+)
+
+import numpy as np
+
+from core import Method, configure_logging, logger
+from core.batch import STATUS_LABELS, BulkResult, calc_tolerance_bulk
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 0.05  # seconds
+DEFAULT_QUEUE_SIZE = 10_000
+DEFAULT_BATCHES_IN_FLIGHT = 2
+DEFAULT_PAIR_TIMEOUT = 3600.0  # seconds
+DEFAULT_MAX_PENDING = 100_000
+
+# Latencies kept per source for the percentiles in SourceMetrics.summary().
+LATENCY_WINDOW = 1024
+
+# (method, sample, value_or_v1, v2) – v2 is None for a single reading.
+Parsed = Tuple[str, str, float, Optional[float]]
+
+_STOP = object()
+
+
+# ---------------------------------------------------------------------------
+# Records
+# ---------------------------------------------------------------------------
+class Pair(NamedTuple):
+    """A duplicate pair ready for evaluation."""
+
+    source: str
+    method: str
+    sample: str
+    v1: float
+    v2: float
+    received: float  # loop time the completing reading was read
+
+
+@dataclass
+class IngestBatch:
+    """One evaluated micro-batch; ``result`` rows follow ``pairs``."""
+
+    pairs: List[Pair]
+    result: BulkResult
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Plain dictionaries with source, sample and the result columns."""
+        out = []
+        for i, pair in enumerate(self.pairs):
+            row = self.result.row(i)
+            row["status"] = STATUS_LABELS[row["status"]]
+            out.append({"source": pair.source, "sample": pair.sample, "v1": pair.v1, "v2": pair.v2, **row})
+        return out
+
+
+@dataclass
+class SourceMetrics:
+    """Counters of one source.
+
+    ``queued`` is the number of this source's readings read but not yet
+    paired – those in the readings queue plus at most one being taken off it
+    (``max_queued`` is its high-water mark). Latency runs from
+    reading the line that completes a pair to handing its result to the sink.
+    """
+
+    readings: int = 0
+    pairs: int = 0
+    errors: int = 0
+    unpaired: int = 0
+    queued: int = 0
+    max_queued: int = 0
+    latencies: Deque[float] = field(default_factory=lambda: collections.deque(maxlen=LATENCY_WINDOW))
+
+    def summary(self) -> Dict[str, Any]:
+        lat = sorted(self.latencies)
+
+        def pct(q: float) -> Optional[float]:
+            return 1000.0 * lat[min(len(lat) - 1, int(q * len(lat)))] if lat else None
+
+        return {
+            "readings": self.readings,
+            "pairs": self.pairs,
+            "errors": self.errors,
+            "unpaired": self.unpaired,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "latency_ms_mean": 1000.0 * sum(lat) / len(lat) if lat else None,
+            "latency_ms_p50": pct(0.50),
+            "latency_ms_p95": pct(0.95),
+            "latency_ms_max": 1000.0 * lat[-1] if lat else None,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+def parse_line(line: str) -> Optional[Parsed]:
+    """Parse one feed line; ``None`` for blank / comment lines.
+
+    Raises ``ValueError`` for malformed lines.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if line.startswith("{"):
+        try:
+            obj = {str(k).lower(): v for k, v in json.loads(line).items()}
+            method = str(obj["method"]).strip()
+            sample = "" if obj.get("sample") is None else str(obj["sample"])
+            if "v1" in obj or "v2" in obj:
+                return method, sample, float(obj["v1"]), float(obj["v2"])
+            return method, sample, float(obj["value"]), None
+        except (AttributeError, KeyError, TypeError) as exc:
+            raise ValueError(f"Bad reading {line!r}: {exc}") from None
+    fields_ = next(csv.reader([line]))
+    if len(fields_) != 3:
+        raise ValueError(f"Expected method,sample,value: {line!r}")
+    method, sample, value = (f.strip() for f in fields_)
+    return method, sample, float(value), None
+
+
+# ---------------------------------------------------------------------------
+# Line sources
+# ---------------------------------------------------------------------------
+async def _stream_lines(reader: asyncio.StreamReader) -> AsyncIterator[str]:
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        yield line.decode("utf-8", errors="replace")
+
+
+async def _file_lines(path: Path, follow: bool, poll_interval: float) -> AsyncIterator[str]:
+    # Regular files never block for long, so plain reads are fine here; yield
+    # to the loop now and then so other sources are not starved.
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        partial = ""
+        count = 0
+        while True:
+            line = f.readline()
+            if line.endswith("\n"):
+                yield partial + line
+                partial = ""
+                count += 1
+                if count % 256 == 0:
+                    await asyncio.sleep(0)
+                continue
+            partial += line
+            if not follow:
+                if partial:
+                    yield partial
+                return
+            await asyncio.sleep(poll_interval)
+
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+class Ingestor:
+    """Pair readings from many sources and evaluate them in micro-batches.
+
+    *methods* is any mapping of method name to :class:`core.Method` (a
+    :class:`core.registry.MethodRegistry` picks up catalog edits). *sink* is
+    called with each :class:`IngestBatch`; it may be a coroutine function.
+    Use as ``async with Ingestor(...) as ingestor:`` or call :meth:`start`
+    and :meth:`close`.
+    """
+
+    def __init__(
+        self,
+        methods: Mapping[str, Method],
+        sink: Callable[[IngestBatch], Any],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        batches_in_flight: int = DEFAULT_BATCHES_IN_FLIGHT,
+        pair_timeout: float = DEFAULT_PAIR_TIMEOUT,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ) -> None:
+        if batch_size < 1 or queue_size < 1 or batches_in_flight < 1 or max_pending < 1:
+            raise ValueError("batch_size, queue_size, batches_in_flight and max_pending must be >= 1")
+        self.methods = methods
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.batches_in_flight = batches_in_flight
+        self.pair_timeout = pair_timeout
+        self.max_pending = max_pending
+
+        self._sources: Dict[str, SourceMetrics] = {}
+        # (method, sample) -> (source, value, received), oldest first.
+        self._pending: Dict[Tuple[str, str], Tuple[str, float, float]] = {}
+        self._source_tasks: Set[asyncio.Task] = set()
+        self._servers: List[asyncio.Server] = []
+        self._readings: Optional[asyncio.Queue] = None
+        self._batches: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self.batches = 0
+        self.sink_errors = 0
+
+    # -- lifecycle ------------------------------------------------------------
+    async def start(self) -> "Ingestor":
+        if self._workers:
+            return self
+        self._readings = asyncio.Queue(self.queue_size)
+        self._batches = asyncio.Queue(self.batches_in_flight)
+        self._workers = [
+            asyncio.create_task(self._batcher(), name="ingest-batcher"),
+            asyncio.create_task(self._evaluator(), name="ingest-evaluator"),
+        ]
+        return self
+
+    async def wait_sources(self) -> None:
+        """Wait until every source added so far has reached its end."""
+        while self._source_tasks:
+            await asyncio.gather(*list(self._source_tasks), return_exceptions=True)
+
+    async def close(self) -> None:
+        """Stop listening and reading, then evaluate everything already read."""
+        for server in self._servers:
+            server.close()
+        for task in list(self._source_tasks):
+            task.cancel()
+        await self.wait_sources()
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers.clear()
+        if self._workers:
+            await self._readings.put(_STOP)
+            await asyncio.gather(*self._workers)
+            self._workers = []
+
+    async def __aenter__(self) -> "Ingestor":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    # -- sources --------------------------------------------------------------
+    def _source(self, name: str) -> SourceMetrics:
+        stats = self._sources.get(name)
+        if stats is None:
+            stats = self._sources[name] = SourceMetrics()
+        return stats
+
+    def add_lines(self, name: str, lines: AsyncIterable[str]) -> asyncio.Task:
+        """Read feed lines from *lines* as source *name*."""
+        if not self._workers:
+            raise RuntimeError("Ingestor is not started")
+        self._source(name)
+        task = asyncio.create_task(self._read(name, lines), name=f"ingest-source-{name}")
+        self._source_tasks.add(task)
+        task.add_done_callback(self._source_tasks.discard)
+        return task
+
+    def add_stream(self, name: str, reader: asyncio.StreamReader) -> asyncio.Task:
+        """Read from an asyncio stream (a socket or a pipe)."""
+        return self.add_lines(name, _stream_lines(reader))
+
+    def add_file(self, name: str, path: str | Path, follow: bool = False, poll_interval: float = 0.5) -> asyncio.Task:
+        """Read a file; with *follow* keep waiting for appended lines (like ``tail -f``)."""
+        return self.add_lines(name, _file_lines(Path(path), follow, poll_interval))
+
+    async def serve_tcp(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.Server:
+        """Accept analyzer connections; each one is a source.
+
+        A connection is named ``tcp:<peer host>:<peer port>`` unless its first
+        line is ``#source NAME``. Port 0 picks a free port (see
+        ``server.sockets[0].getsockname()``).
+        """
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            first = await reader.readline()
+            text = first.decode("utf-8", errors="replace")
+            if text.startswith("#source "):
+                name, head = text[len("#source "):].strip(), []
+            else:
+                peer = writer.get_extra_info("peername") or ("?", 0)
+                name, head = f"tcp:{peer[0]}:{peer[1]}", [text]
+
+            async def lines() -> AsyncIterator[str]:
+                for line in head:
+                    yield line
+                async for line in _stream_lines(reader):
+                    yield line
+
+            try:
+                await self.add_lines(name, lines())
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(handle, host, port)
+        self._servers.append(server)
+        return server
+
+    async def _read(self, name: str, lines: AsyncIterable[str]) -> None:
+        stats = self._sources[name]
+        queue = self._readings
+        loop = asyncio.get_running_loop()
+        async for line in lines:
+            try:
+                parsed = parse_line(line)
+            except ValueError as exc:
+                stats.errors += 1
+                logger.debug("Source %s: %s", name, exc)
+                continue
+            if parsed is None:
+                continue
+            stats.readings += 1
+            await queue.put((name, parsed, loop.time()))  # blocks while the queue is full
+            stats.queued += 1
+            if stats.queued > stats.max_queued:
+                stats.max_queued = stats.queued
+
+    # -- pairing and batching -------------------------------------------------
+    def _pair(self, name: str, parsed: Parsed, received: float) -> Optional[Pair]:
+        method, sample, value, v2 = parsed
+        if v2 is not None:
+            return Pair(name, method, sample, value, v2, received)
+        key = (method, sample)
+        first = self._pending.pop(key, None)
+        if first is not None:
+            return Pair(name, method, sample, first[1], value, received)
+        if len(self._pending) >= self.max_pending:
+            oldest = self._pending.pop(next(iter(self._pending)))
+            self._sources[oldest[0]].unpaired += 1
+        self._pending[key] = (name, value, received)
+        return None
+
+    def _expire(self, now: float) -> None:
+        limit = now - self.pair_timeout
+        while self._pending:
+            key, (source, _, received) = next(iter(self._pending.items()))
+            if received >= limit:
+                break
+            del self._pending[key]
+            self._sources[source].unpaired += 1
+
+    async def _batcher(self) -> None:
+        queue = self._readings
+        loop = asyncio.get_running_loop()
+        batch: List[Pair] = []
+        deadline = 0.0
+        stopping = False
+        # One get() is kept pending across flush timeouts: cancelling it (as
+        # wait_for does) could lose a reading it had already taken.
+        getter: Optional[asyncio.Future] = None
+        while not stopping:
+            if getter is None and not queue.empty():
+                item = queue.get_nowait()
+            else:
+                if getter is None:
+                    getter = asyncio.ensure_future(queue.get())
+                wake = deadline if batch else math.inf
+                if self._pending and self.pair_timeout < math.inf:
+                    # Wake for the oldest waiting reading too, so readings
+                    # expire while every feed is idle.
+                    wake = min(wake, next(iter(self._pending.values()))[2] + self.pair_timeout)
+                timeout = max(0.0, wake - loop.time()) if wake < math.inf else None
+                done, _ = await asyncio.wait((getter,), timeout=timeout)
+                item, getter = (getter.result(), None) if done else (None, getter)
+            # Take whatever else is already queued without waiting again.
+            while item is not None:
+                if item is _STOP:
+                    stopping = True
+                    break
+                name, parsed, received = item
+                self._sources[name].queued -= 1
+                pair = self._pair(name, parsed, received)
+                if pair is not None:
+                    if not batch:
+                        deadline = loop.time() + self.flush_interval
+                    batch.append(pair)
+                if batch and (len(batch) >= self.batch_size or loop.time() >= deadline):
+                    await self._batches.put(batch)  # blocks while enough batches are in flight
+                    batch = []
+                item = queue.get_nowait() if not queue.empty() else None
+            if batch and (stopping or loop.time() >= deadline):
+                await self._batches.put(batch)
+                batch = []
+            if self.pair_timeout < math.inf:
+                self._expire(loop.time())
+        await self._batches.put(_STOP)
+
+    # -- evaluation -----------------------------------------------------------
+    def _evaluate(self, pairs: List[Pair]) -> BulkResult:
+        names = [p.method for p in pairs]
+        v1 = np.fromiter((p.v1 for p in pairs), dtype=np.float64, count=len(pairs))
+        v2 = np.fromiter((p.v2 for p in pairs), dtype=np.float64, count=len(pairs))
+        return calc_tolerance_bulk(self.methods, names, v1, v2)
+
+    async def _evaluator(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pairs = await self._batches.get()
+            if pairs is _STOP:
+                return
+            batch = IngestBatch(pairs, await asyncio.to_thread(self._evaluate, pairs))
+            done = loop.time()
+            for pair in pairs:
+                stats = self._sources[pair.source]
+                stats.pairs += 1
+                stats.latencies.append(done - pair.received)
+            self.batches += 1
+            try:
+                outcome = self.sink(batch)
+                if inspect.isawaitable(outcome):
+                    await outcome
+            except Exception:
+                self.sink_errors += 1
+                logger.exception("Ingest sink failed on a batch of %d pairs", len(pairs))
+
+    # -- metrics --------------------------------------------------------------
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depths and per-source counters / latency percentiles."""
+        return {
+            "queue_depth": self._readings.qsize() if self._readings is not None else 0,
+            "queue_size": self.queue_size,
+            "batches_queued": self._batches.qsize() if self._batches is not None else 0,
+            "pending_readings": len(self._pending),
+            "batches": self.batches,
+            "sink_errors": self.sink_errors,
+            "sources": {name: stats.summary() for name, stats in sorted(self._sources.items())},
+        }
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+def _print_batch(batch: IngestBatch) -> None:
+    for row in batch.rows():
+        sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    from core.registry import get_registry
+
+    ingestor = Ingestor(
+        get_registry(args.methods_file), _print_batch,
+        batch_size=args.batch_size, flush_interval=args.flush_ms / 1000.0,
+    )
+    async with ingestor:
+        for spec in args.listen:
+            host, _, port = spec.rpartition(":")
+            server = await ingestor.serve_tcp(host or "127.0.0.1", int(port))
+            logger.info("Listening on %s", server.sockets[0].getsockname())
+        for path in args.files:
+            ingestor.add_file(path, path, follow=args.follow)
+        if args.listen or args.follow:
+            while True:
+                await asyncio.sleep(args.metrics_every or 3600)
+                if args.metrics_every:
+                    logger.info("metrics %s", json.dumps(ingestor.metrics()))
+        await ingestor.wait_sources()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m core.ingest",
+        description="Pair analyzer readings from TCP feeds and files; print results as JSON Lines.",
+    )
+    parser.add_argument("files", nargs="*", help="feed files to read")
+    parser.add_argument("--listen", action="append", default=[], metavar="HOST:PORT", help="accept TCP feeds")
+    parser.add_argument("--follow", action="store_true", help="keep reading files as they grow")
+    parser.add_argument("--methods-file", default="methods_enriched.csv", help="method registry CSV")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="pairs per micro-batch")
+    parser.add_argument("--flush-ms", type=float, default=1000.0 * DEFAULT_FLUSH_INTERVAL,
+                        help="flush a partial batch after this many ms")
+    parser.add_argument("--metrics-every", type=float, default=0.0, metavar="SECONDS",
+                        help="log metrics periodically")
+    args = parser.parse_args(argv)
+    configure_logging()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,377 @@
+# Optional runtime instrumentation for Method Precision Calculator
+
+"""Count and time the core entry points while a batch or service is running.
+
+Instrumentation is off by default. The hooks in :func:`core.load_methods`,
+:func:`core.safe_eval`, :func:`core.calc_tolerance` and
+:func:`core.batch.calc_tolerance_bulk` read one module global and skip all
+bookkeeping while it is ``None``, so disabled instrumentation adds no wrapper
+frame and no clock call to the hot path.
+
+It provides:
+* ``Instrumentation`` – thread-safe per-function call counts and timings plus
+  per-method evaluation counts and formula-error rates.
+* ``enable`` / ``disable`` / ``active`` – install or remove the process-wide
+  instance.
+* ``MemorySink``, ``PrometheusFileSink``, ``LogSink`` – export targets for
+  :meth:`Instrumentation.snapshot`.
+* ``PeriodicExporter`` – pushes snapshots to sinks from a background thread.
+* ``profile`` – a context manager instrumenting one batch run.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import core
+from core import logger
+
+# Snapshot keys are plain data (JSON-serialisable) so sinks need no knowledge
+# of this module's classes.
+Snapshot = Dict[str, Any]
+
+
+# ---------------------------------------------------------------------------
+# Counters
+# ---------------------------------------------------------------------------
+@dataclass
+class CallStats:
+    """Call count, error count and wall time of one instrumented function."""
+
+    count: int = 0
+    errors: int = 0
+    total: float = 0.0
+    min: float = float("inf")
+    max: float = 0.0
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+
+@dataclass
+class MethodStats:
+    """Number of pairs evaluated for one method and how many hit a formula error."""
+
+    evaluations: int = 0
+    formula_errors: int = 0
+
+    @property
+    def error_rate(self) -> float:
+        return self.formula_errors / self.evaluations if self.evaluations else 0.0
+
+
+class Instrumentation:
+    """Collects counters fed by the hooks in :mod:`core` and :mod:`core.batch`.
+
+    ``record`` is called once per successful call with its duration,
+    ``record_error`` once per call that raised. Passing a method name also
+    counts one evaluation for that method; bulk evaluation reports whole groups
+    through ``count_method``.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._calls: Dict[str, CallStats] = {}
+        self._methods: Dict[str, MethodStats] = {}
+        self.started = time.time()
+
+    def record(self, function: str, elapsed: float, method: Optional[str] = None) -> None:
+        with self._lock:
+            stats = self._calls.get(function)
+            if stats is None:
+                stats = self._calls[function] = CallStats()
+            stats.count += 1
+            stats.total += elapsed
+            if elapsed < stats.min:
+                stats.min = elapsed
+            if elapsed > stats.max:
+                stats.max = elapsed
+            if method is not None:
+                self._method(method).evaluations += 1
+
+    def record_error(self, function: str, method: Optional[str] = None) -> None:
+        """Count a failed call; with *method*, also a failed formula evaluation."""
+        with self._lock:
+            stats = self._calls.get(function)
+            if stats is None:
+                stats = self._calls[function] = CallStats()
+            stats.count += 1
+            stats.errors += 1
+            if method is not None:
+                entry = self._method(method)
+                entry.evaluations += 1
+                entry.formula_errors += 1
+
+    def count_method(self, method: str, n: int, errors: int = 0) -> None:
+        with self._lock:
+            entry = self._method(method)
+            entry.evaluations += n
+            entry.formula_errors += errors
+
+    def _method(self, name: str) -> MethodStats:
+        entry = self._methods.get(name)
+        if entry is None:
+            entry = self._methods[name] = MethodStats()
+        return entry
+
+    def reset(self) -> None:
+        with self._lock:
+            self._calls.clear()
+            self._methods.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> Snapshot:
+        """Return a consistent copy of all counters as plain data."""
+        with self._lock:
+            calls = {
+                name: {
+                    "count": s.count,
+                    "errors": s.errors,
+                    "seconds_total": s.total,
+                    "seconds_mean": s.total / (s.count - s.errors) if s.count > s.errors else None,
+                    "seconds_min": s.min if s.count > s.errors else None,
+                    "seconds_max": s.max,
+                }
+                for name, s in self._calls.items()
+            }
+            methods = {
+                name: {
+                    "evaluations": m.evaluations,
+                    "formula_errors": m.formula_errors,
+                    "formula_error_rate": m.error_rate,
+                }
+                for name, m in self._methods.items()
+            }
+        return {"started": self.started, "elapsed": time.time() - self.started, "calls": calls, "methods": methods}
+
+    def summary(self, top: int = 10) -> str:
+        """Human-readable report: per-function timings, then the busiest methods."""
+        return format_summary(self.snapshot(), top)
+
+
+def format_summary(snapshot: Snapshot, top: int = 10) -> str:
+    lines = [f"Instrumentation summary ({snapshot['elapsed']:.2f} s)"]
+    if not snapshot["calls"]:
+        lines.append("  no instrumented calls")
+    for name, c in sorted(snapshot["calls"].items()):
+        mean = f"{c['seconds_mean'] * 1e6:.2f} µs" if c["seconds_mean"] is not None else "-"
+        lines.append(
+            f"  {name:<20} calls={c['count']:<9} errors={c['errors']:<6} "
+            f"total={c['seconds_total']:.4f} s mean={mean} max={c['seconds_max'] * 1e6:.1f} µs"
+        )
+    methods = sorted(snapshot["methods"].items(), key=lambda item: -item[1]["evaluations"])
+    if methods:
+        lines.append(f"  methods ({len(methods)}, top {min(top, len(methods))} by evaluations):")
+        for name, m in methods[:top]:
+            lines.append(
+                f"    {name:<32} evaluations={m['evaluations']:<9} "
+                f"formula_errors={m['formula_errors']} ({m['formula_error_rate']:.2%})"
+            )
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Process-wide switch
+# ---------------------------------------------------------------------------
+def enable(instrumentation: Optional[Instrumentation] = None) -> Instrumentation:
+    """Install *instrumentation* (or a fresh one) in the core hooks and return it."""
+    if instrumentation is None:
+        instrumentation = Instrumentation()
+    core._probe = instrumentation
+    return instrumentation
+
+
+def disable() -> Optional[Instrumentation]:
+    """Remove the active instrumentation; returns it so its counters can be read."""
+    previous = core._probe
+    core._probe = None
+    return previous
+
+
+def active() -> Optional[Instrumentation]:
+    return core._probe
+
+
+# ---------------------------------------------------------------------------
+# Sinks
+# ---------------------------------------------------------------------------
+class MemorySink:
+    """Keeps exported snapshots in memory (the last *keep*, or all with ``None``)."""
+
+    def __init__(self, keep: Optional[int] = 1):
+        self.keep = keep
+        self.snapshots: List[Snapshot] = []
+
+    @property
+    def latest(self) -> Optional[Snapshot]:
+        return self.snapshots[-1] if self.snapshots else None
+
+    def __call__(self, snapshot: Snapshot) -> None:
+        self.snapshots.append(snapshot)
+        if self.keep is not None and len(self.snapshots) > self.keep:
+            del self.snapshots[: len(self.snapshots) - self.keep]
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def prometheus_text(snapshot: Snapshot, prefix: str = "mpc") -> str:
+    """Render *snapshot* in the Prometheus text exposition format."""
+    out: List[str] = []
+
+    def family(name: str, kind: str, help_text: str, samples: List[str]) -> None:
+        out.append(f"# HELP {prefix}_{name} {help_text}")
+        out.append(f"# TYPE {prefix}_{name} {kind}")
+        out.extend(f"{prefix}_{name}{sample}" for sample in samples)
+
+    calls = sorted(snapshot["calls"].items())
+    family("calls_total", "counter", "Calls of instrumented core functions.",
+           [f'{{function="{_label(n)}"}} {c["count"]}' for n, c in calls])
+    family("call_errors_total", "counter", "Calls that raised.",
+           [f'{{function="{_label(n)}"}} {c["errors"]}' for n, c in calls])
+    family("call_seconds_total", "counter", "Wall time spent in successful calls.",
+           [f'{{function="{_label(n)}"}} {c["seconds_total"]!r}' for n, c in calls])
+    family("call_seconds_max", "gauge", "Slowest successful call.",
+           [f'{{function="{_label(n)}"}} {c["seconds_max"]!r}' for n, c in calls])
+    methods = sorted(snapshot["methods"].items())
+    family("method_evaluations_total", "counter", "Pairs evaluated per method.",
+           [f'{{method="{_label(n)}"}} {m["evaluations"]}' for n, m in methods])
+    family("method_formula_errors_total", "counter", "Pairs whose r/R formula failed, per method.",
+           [f'{{method="{_label(n)}"}} {m["formula_errors"]}' for n, m in methods])
+    return "\n".join(out) + "\n"
+
+
+class PrometheusFileSink:
+    """Writes each snapshot to *path* for the node_exporter textfile collector.
+
+    The file is replaced atomically so the collector never reads a partial
+    export.
+    """
+
+    def __init__(self, path: str | Path, prefix: str = "mpc"):
+        self.path = Path(path)
+        self.prefix = prefix
+
+    def __call__(self, snapshot: Snapshot) -> None:
+        text = prometheus_text(snapshot, self.prefix)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+class LogSink:
+    """Logs one compact line per snapshot."""
+
+    def __init__(self, log: logging.Logger = logger, level: int = logging.INFO):
+        self.log = log
+        self.level = level
+
+    def __call__(self, snapshot: Snapshot) -> None:
+        calls = " ".join(
+            f"{name}={c['count']}/{c['errors']}err/{c['seconds_total']:.3f}s"
+            for name, c in sorted(snapshot["calls"].items())
+        )
+        evaluations = sum(m["evaluations"] for m in snapshot["methods"].values())
+        errors = sum(m["formula_errors"] for m in snapshot["methods"].values())
+        self.log.log(
+            self.level, "instrumentation: %s methods=%d evaluations=%d formula_errors=%d",
+            calls or "no calls", len(snapshot["methods"]), evaluations, errors,
+        )
+
+
+# ---------------------------------------------------------------------------
+# Exporting
+# ---------------------------------------------------------------------------
+def export(instrumentation: Instrumentation, sinks: Sequence[Callable[[Snapshot], None]]) -> None:
+    """Push one snapshot to every sink; a failing sink is logged, not raised."""
+    snapshot = instrumentation.snapshot()
+    for sink in sinks:
+        try:
+            sink(snapshot)
+        except Exception as exc:
+            logger.error("Instrumentation sink %r failed: %s", sink, exc)
+
+
+class PeriodicExporter:
+    """Exports snapshots every *interval* seconds from a daemon thread.
+
+    ``stop`` performs a final export so short runs are not lost.
+    """
+
+    def __init__(
+        self,
+        instrumentation: Instrumentation,
+        sinks: Sequence[Callable[[Snapshot], None]],
+        interval: float = 15.0,
+    ):
+        self.instrumentation = instrumentation
+        self.sinks = list(sinks)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "PeriodicExporter":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="mpc-instrumentation", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            export(self.instrumentation, self.sinks)
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            export(self.instrumentation, self.sinks)
+
+    def __enter__(self) -> "PeriodicExporter":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+@contextmanager
+def profile(
+    sinks: Optional[Sequence[Callable[[Snapshot], None]]] = None,
+    interval: Optional[float] = None,
+) -> Iterator[Instrumentation]:
+    """Instrument the enclosed block with a fresh :class:`Instrumentation`.
+
+    On exit the previously active instrumentation (usually none) is restored
+    and the summary is exported to *sinks*, or logged when no sinks are given.
+    With *interval*, snapshots are also exported periodically while the block
+    runs.
+    """
+
+    instrumentation = Instrumentation()
+    previous = core._probe
+    core._probe = instrumentation
+    exporter = PeriodicExporter(instrumentation, sinks, interval).start() if sinks and interval else None
+    try:
+        yield instrumentation
+    finally:
+        core._probe = previous
+        if exporter is not None:
+            exporter.stop()
+        elif sinks:
+            export(instrumentation, sinks)
+        else:
+            logger.info("%s", instrumentation.summary())
@@ -0,0 +1,307 @@
+# Precomputed formula lookup tables for Method Precision Calculator
+
+"""Tabulate formula-based r / R over a method's valid range.
+
+For formula methods r and R depend only on ``avg`` and are reported to
+``Method.decimals`` places, so they can be sampled once on a grid and
+linearly interpolated afterwards. Evaluating a pair then costs an index
+computation plus one multiply-add whatever the formula, and the table itself
+(``FormulaLookup.values``) can be shipped to targets without a fast ``pow``.
+On CPython the compiled catalog formulas (``k * avg ** p``) are about as cheap
+as the interpolation, so this mode is opt-in; it pays off for costlier
+formulas and for continuously re-evaluating edge deployments.
+
+Every table carries an absolute error bound (in the method's unit). The grid
+starts at the reporting resolution (``10 ** -decimals``) and is refined until
+the interpolation error, measured at several points inside every interval, is
+within the bound; :meth:`FormulaLookup.check` re-verifies it, optionally on a
+denser sample. Values of ``avg`` outside the
+tabulated range fall back to exact evaluation, so results are never worse than
+the bound.
+
+It provides:
+* ``FormulaLookup`` – one tabulated formula, callable like an evaluator.
+* ``valid_range`` – the ``(low, high)`` range of a method, from its limits or
+  its ``conc_range`` text.
+* ``tabulate_method`` / ``precompute_methods`` – attach lookup tables to
+  methods so :func:`core.calc_tolerance` and the batch path use them.
+"""
+
+import dataclasses
+import math
+import re
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+from core import Method, logger
+from core.formula import CompiledFormula, compile_formula
+
+# Default bound: 5 % of one unit in the last reported decimal.
+DEFAULT_ERROR_FRACTION = 0.05
+
+# Refuse tables larger than this many grid points per formula.
+DEFAULT_MAX_POINTS = 2_000_000
+
+# Points per grid interval at which build_lookup and FormulaLookup.check
+# measure the interpolation error.
+CHECK_SAMPLES_PER_STEP = 7
+
+# Grid intervals measured per NumPy block while tabulating (bounds memory).
+_TABULATE_BLOCK = 1 << 16
+
+_RANGE_RE = re.compile(r"(-?\d+(?:\.\d+)?)\s*(?:to|-|–)\s*(-?\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+def default_error_bound(decimals: int) -> float:
+    """Return the default absolute error bound for *decimals* reported places."""
+    return DEFAULT_ERROR_FRACTION * 10.0 ** (-decimals)
+
+
+def valid_range(method: Method) -> Optional[Tuple[float, float]]:
+    """Return the ``(low, high)`` range over which *method* applies, if known.
+
+    ``lower`` / ``upper`` win; missing ends are taken from the first
+    ``"A to B"`` span in ``conc_range`` (e.g. ``"0.5 to 400 mg/kg"``).
+    Returns ``None`` when no finite range can be determined.
+    """
+
+    low, high = method.lower, method.upper
+    if low is None or high is None:
+        match = _RANGE_RE.search(method.conc_range or "")
+        if match:
+            low = float(match.group(1)) if low is None else low
+            high = float(match.group(2)) if high is None else high
+    if low is None or high is None or not low < high:
+        return None
+    return low, high
+
+
+# ---------------------------------------------------------------------------
+# Lookup table
+# ---------------------------------------------------------------------------
+@dataclass(frozen=True)
+class FormulaLookup:
+    """A formula sampled on a uniform grid over ``[low, high]``.
+
+    ``values[i]`` is the exact formula value at ``low + i * step``. Calling the
+    object interpolates linearly; arguments outside the grid are evaluated
+    exactly. ``observed_error`` is the largest deviation measured while
+    building the table and is always ``<= max_error``.
+    """
+
+    formula: str
+    low: float
+    high: float
+    step: float
+    max_error: float
+    observed_error: float
+    values: array = field(repr=False)
+    exact: CompiledFormula = field(repr=False, compare=False)
+    scalar: Callable[[float], float] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "scalar", self._make_scalar())
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __call__(self, avg: float) -> float:
+        return self.scalar(avg)
+
+    def _make_scalar(self) -> Callable[[float], float]:
+        """Build the ``f(avg)`` closure stored in :attr:`scalar`.
+
+        It is what ``Method.eval_r`` / ``eval_R`` hold; its ``lookup`` and
+        ``evaluate_array`` attributes let the batch path find the table.
+        """
+        values = self.values.tolist()
+        low, step, last = self.low, self.step, len(values) - 1
+        exact = self.exact.scalar
+
+        def evaluate(avg: float) -> float:
+            pos = (avg - low) / step
+            if 0.0 <= pos < last:  # False for NaN as well
+                i = int(pos)
+                lo = values[i]
+                return lo + (values[i + 1] - lo) * (pos - i)
+            return exact(avg)
+
+        evaluate.lookup = self  # type: ignore[attr-defined]
+        evaluate.evaluate_array = self.evaluate_array  # type: ignore[attr-defined]
+        return evaluate
+
+    def evaluate_array(self, avg: Any) -> Any:
+        """Element-wise counterpart of :meth:`__call__` for NumPy arrays.
+
+        Uses the same arithmetic as the scalar path, so both agree exactly.
+        """
+        avg = np.asarray(avg, dtype=np.float64)
+        values = np.frombuffer(self.values, dtype=np.float64)
+        last = len(values) - 1
+        pos = (avg - self.low) / self.step
+        i = pos.astype(np.intp)
+        np.clip(i, 0, last - 1, out=i)
+        lo = values.take(i)
+        out = values.take(i + 1)
+        out -= lo
+        out *= pos - i
+        out += lo
+        outside = ~((pos >= 0.0) & (pos < last))
+        if outside.any():
+            exact = np.asarray(self.exact.evaluate_array(avg[outside]), dtype=np.float64)
+            out[outside] = np.broadcast_to(exact, (int(outside.sum()),))
+        return out
+
+    def check(self, samples_per_step: int = CHECK_SAMPLES_PER_STEP) -> float:
+        """Return the largest error against exact evaluation on a dense sample.
+
+        *samples_per_step* points are placed inside every grid interval.
+        Raises ``ValueError`` if the error exceeds ``max_error``.
+        """
+        intervals = len(self.values) - 1
+        offsets = np.arange(1, samples_per_step + 1) / (samples_per_step + 1)
+        x = (self.low + (np.arange(intervals)[:, None] + offsets) * self.step).ravel()
+        x = x[x <= self.high]
+        worst = float(np.max(np.abs(self.evaluate_array(x) - _exact_array(self.exact, x)), initial=0.0))
+        if worst > self.max_error:
+            raise ValueError(
+                f"Lookup for {self.formula!r} exceeds its error bound: {worst:.3g} > {self.max_error:.3g}"
+            )
+        return worst
+
+
+def _exact_array(exact: CompiledFormula, x: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.broadcast_to(np.asarray(exact.evaluate_array(x), dtype=np.float64), x.shape)
+
+
+def _tabulate(exact: CompiledFormula, low: float, high: float, step: float) -> Tuple[np.ndarray, float]:
+    """Return grid values and the largest interpolation error inside the intervals.
+
+    The error is measured at ``CHECK_SAMPLES_PER_STEP`` points per interval, not
+    only at the midpoint: for concave powers near zero (``avg ** 0.5`` from 0)
+    it peaks well off-centre.
+    """
+    intervals = max(1, math.ceil((high - low) / step))
+    values = _exact_array(exact, low + step * np.arange(intervals + 1))
+    offsets = np.arange(1, CHECK_SAMPLES_PER_STEP + 1) / (CHECK_SAMPLES_PER_STEP + 1)
+    errors = []
+    for start in range(0, intervals, _TABULATE_BLOCK):
+        i = np.arange(start, min(start + _TABULATE_BLOCK, intervals))[:, None]
+        lo = values[i]
+        interpolated = lo + (values[i + 1] - lo) * offsets
+        errors.append(np.max(np.abs(interpolated - _exact_array(exact, low + (i + offsets) * step))))
+    # np.max keeps a NaN (formula undefined inside an interval) as a failure.
+    return values, float(np.max(errors))
+
+
+def build_lookup(
+    formula: str,
+    low: float,
+    high: float,
+    resolution: float,
+    max_error: float,
+    max_points: int = DEFAULT_MAX_POINTS,
+) -> FormulaLookup:
+    """Tabulate *formula* on ``[low, high]`` within *max_error*.
+
+    The grid step starts at *resolution*. It is halved while the interpolation
+    error, measured at ``CHECK_SAMPLES_PER_STEP`` points inside every interval,
+    exceeds *max_error*, and doubled while a coarser grid
+    still meets it (linear formulas need only a few points). Raises
+    ``ValueError`` if the bound would need more than *max_points* grid points
+    or the formula is not finite on the range.
+    """
+
+    if not (math.isfinite(low) and math.isfinite(high) and low < high):
+        raise ValueError(f"Invalid range [{low}, {high}] for {formula!r}")
+    if max_error <= 0 or resolution <= 0:
+        raise ValueError("resolution and max_error must be positive")
+
+    exact = compile_formula(formula)
+    step = resolution
+    while True:
+        if (high - low) / step + 1 > max_points:
+            raise ValueError(
+                f"Tabulating {formula!r} on [{low}, {high}] within {max_error:g} needs more than {max_points} points"
+            )
+        values, error = _tabulate(exact, low, high, step)
+        if not np.isfinite(values).all():
+            raise ValueError(f"{formula!r} is not finite on [{low}, {high}]")
+        if error <= max_error:
+            break
+        step /= 2.0
+
+    # Coarsen while the bound still holds.
+    while step * 2.0 < high - low:
+        coarser, coarser_error = _tabulate(exact, low, high, step * 2.0)
+        if coarser_error > max_error:
+            break
+        step, values, error = step * 2.0, coarser, coarser_error
+
+    table = array("d")
+    table.frombytes(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    grid_high = low + (len(table) - 1) * step
+    return FormulaLookup(formula, low, grid_high, step, max_error, error, table, exact)
+
+
+# ---------------------------------------------------------------------------
+# Attaching tables to methods
+# ---------------------------------------------------------------------------
+def tabulate_method(
+    method: Method,
+    max_error: Optional[float] = None,
+    range_override: Optional[Tuple[float, float]] = None,
+    max_points: int = DEFAULT_MAX_POINTS,
+) -> Method:
+    """Return a copy of *method* whose formula evaluators are lookup tables.
+
+    The tables are reachable as ``copy.eval_r.lookup`` / ``copy.eval_R.lookup``.
+    *max_error* defaults to :func:`default_error_bound` of ``method.decimals``.
+    Methods without formulas are returned unchanged; a method without a known
+    range (and no *range_override*) raises ``ValueError``.
+    """
+
+    if not (method.formula_r or method.formula_R):
+        return method
+    bounds = range_override or valid_range(method)
+    if bounds is None:
+        raise ValueError(f"No valid range known for {method.name!r}; pass range_override")
+    low, high = bounds
+    resolution = 10.0 ** (-method.decimals)
+    bound = default_error_bound(method.decimals) if max_error is None else max_error
+
+    copy = dataclasses.replace(method)
+    for formula, attr in ((method.formula_r, "eval_r"), (method.formula_R, "eval_R")):
+        if formula and getattr(method, attr) is not None:
+            lookup = build_lookup(formula, low, high, resolution, bound, max_points)
+            object.__setattr__(copy, attr, lookup.scalar)
+    return copy
+
+
+def precompute_methods(
+    methods: Mapping[str, Method],
+    max_error: Optional[float] = None,
+    ranges: Optional[Mapping[str, Tuple[float, float]]] = None,
+    max_points: int = DEFAULT_MAX_POINTS,
+) -> Dict[str, Method]:
+    """Return ``name → Method`` with every tabulable formula method tabulated.
+
+    *ranges* overrides the valid range per method name. Methods whose range
+    cannot be determined, or whose table would exceed *max_points*, keep exact
+    evaluation (logged at INFO).
+    """
+
+    ranges = ranges or {}
+    out: Dict[str, Method] = {}
+    for name, method in methods.items():
+        try:
+            out[name] = tabulate_method(method, max_error, ranges.get(name), max_points)
+        except ValueError as exc:
+            logger.info("Keeping exact evaluation for %s: %s", name, exc)
+            out[name] = method
+    return out
+
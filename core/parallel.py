@@ -0,0 +1,200 @@
+# Multi-core batch runner for Method Precision Calculator
+
+"""Evaluate a large CSV on several cores with a process pool.
+
+The input file is split into byte-range shards aligned on line boundaries.
+Each worker process loads the method registry once (pool initializer),
+streams its shard through :func:`core.stream.evaluate_chunk` and writes the
+results to a temporary shard file; the parent concatenates the shard files in
+order. The output is byte-for-byte identical to :func:`core.stream.evaluate_csv_file`.
+
+Byte-range splitting assumes one record per line: quoted fields containing
+newlines are not supported here (use the serial path for such files). Any
+ASCII-compatible encoding (UTF-8, ISO-8859-1) is fine.
+
+Run as ``python -m core.parallel INPUT OUTPUT --workers N``.
+"""
+
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from core import Method, configure_logging, load_methods, logger
+from core.stream import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_COLUMNS,
+    OUTPUT_COLUMNS,
+    StreamStats,
+    _column_indices,
+    evaluate_chunk,
+    evaluate_csv_file,
+    iter_rows,
+    peak_rss_bytes,
+)
+
+# Shards per worker – more, smaller shards balance uneven row costs.
+SHARDS_PER_WORKER = 4
+
+# Per-process registry, populated by the pool initializer.
+_worker_methods: Dict[str, Method] = {}
+
+
+def _init_worker(methods_path: str) -> None:
+    global _worker_methods
+    _worker_methods = load_methods(methods_path)
+
+
+# ---------------------------------------------------------------------------
+# Sharding
+# ---------------------------------------------------------------------------
+def _next_line_start(f, pos: int) -> int:
+    """Return the offset of the first line starting at or after *pos*."""
+    f.seek(pos - 1)
+    if f.read(1) == b"\n":
+        return pos
+    f.readline()
+    return f.tell()
+
+
+def plan_shards(path: str | Path, n_shards: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """Return the raw header line and ``(start, end)`` byte ranges of the body.
+
+    Every range starts at the beginning of a line; a line belongs to the range
+    in which it starts. Empty ranges are dropped.
+    """
+
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        body_start = f.tell()
+        step = max(1, (size - body_start) // max(1, n_shards))
+        cuts = [body_start]
+        for i in range(1, n_shards):
+            pos = body_start + i * step
+            if pos >= size:
+                break
+            cuts.append(max(cuts[-1], _next_line_start(f, pos)))
+        cuts.append(size)
+    ranges = [(a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
+    return header, ranges
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+def _run_shard(
+    path: str,
+    start: int,
+    end: int,
+    indices: Sequence[int],
+    out_path: str,
+    chunk_size: int,
+    encoding: str,
+) -> int:
+    rows = 0
+    with open(path, "rb") as fin, open(out_path, "w", encoding="utf-8", newline="") as fout:
+        writer = csv.writer(fout, lineterminator="\n")
+        fin.seek(start)
+        pos = start
+        while pos < end:
+            lines: List[str] = []
+            while pos < end and len(lines) < chunk_size:
+                raw = fin.readline()
+                if not raw:
+                    pos = end
+                    break
+                pos += len(raw)
+                lines.append(raw.decode(encoding))
+            chunk = list(iter_rows(csv.reader(lines), indices))
+            writer.writerows(evaluate_chunk(_worker_methods, chunk))
+            rows += len(chunk)
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+def evaluate_csv_parallel(
+    input_path: str | Path,
+    output_path: str | Path,
+    methods_path: str | Path,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    columns: Sequence[str] = DEFAULT_COLUMNS,
+    encoding: str = "utf-8",
+) -> StreamStats:
+    """Evaluate *input_path* with *workers* processes and write *output_path*.
+
+    ``workers=None`` uses ``os.cpu_count()``; ``workers=1`` runs the serial
+    streaming path in-process and values below 1 raise ``ValueError``. ``peak_rss_bytes`` covers the parent only.
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+    if workers == 1:
+        return evaluate_csv_file(input_path, output_path, load_methods(methods_path),
+                                 chunk_size=chunk_size, columns=columns, encoding=encoding)
+
+    start = time.perf_counter()
+    header, ranges = plan_shards(input_path, workers * SHARDS_PER_WORKER)
+    header_row = next(csv.reader([header.decode(encoding)]), None)
+    if header_row is None:
+        raise ValueError("Input CSV is empty")
+    indices = _column_indices(header_row, columns)
+
+    output_path = Path(output_path)
+    with tempfile.TemporaryDirectory(dir=output_path.parent) as tmp:
+        shard_paths = [os.path.join(tmp, f"shard_{i:05d}.csv") for i in range(len(ranges))]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(str(methods_path),)) as pool:
+            futures = [
+                pool.submit(_run_shard, str(input_path), a, b, indices, shard_paths[i], chunk_size, encoding)
+                for i, (a, b) in enumerate(ranges)
+            ]
+            total = sum(f.result() for f in futures)
+
+        with open(output_path, "w", encoding="utf-8", newline="") as fout:
+            csv.writer(fout, lineterminator="\n").writerow(OUTPUT_COLUMNS)
+            for shard in shard_paths:
+                with open(shard, "r", encoding="utf-8", newline="") as fin:
+                    shutil.copyfileobj(fin, fout)
+
+    stats = StreamStats(
+        rows=total,
+        chunks=len(ranges),
+        seconds=time.perf_counter() - start,
+        peak_rss_bytes=peak_rss_bytes(),
+    )
+    logger.info("Parallel evaluation finished with %d workers: %s", workers, stats.summary())
+    return stats
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Evaluate a duplicate-result CSV on several cores.")
+    parser.add_argument("input", help="CSV with Method, V1 and V2 columns")
+    parser.add_argument("output", help="result CSV to write")
+    parser.add_argument("--methods-file", default="methods_enriched.csv", help="method registry CSV")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per chunk")
+    parser.add_argument("--encoding", default="utf-8", help="input file encoding")
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be >= 1")
+    configure_logging()
+
+    stats = evaluate_csv_parallel(args.input, args.output, args.methods_file, workers=args.workers,
+                                  chunk_size=args.chunk_size, encoding=args.encoding)
+    print(stats.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,431 @@
+# SQL pushdown of tolerance checks for Method Precision Calculator
+
+"""Evaluate duplicate pairs inside SQLite (or DuckDB) instead of in Python.
+
+The method registry is copied once into a temporary ``mpc_methods`` table.
+Each ``Formula_r`` / ``Formula_R`` is stored as its compiled shape
+(:mod:`core.formula`): constants, ``k * (avg + c)`` and ``k * avg ** p``
+become coefficient columns, any other whitelisted expression is translated
+to a SQL expression. One set-based query then joins the pair table to the
+methods and computes avg, |diff|, r, R, 0.75R, the pass flags and the
+:mod:`core.batch` status code of every row, so rows never have to be pulled
+into Python just to be checked.
+
+Every number is bit-identical to :func:`core.calc_tolerance` for the same
+pair: the query performs the same IEEE operations in the same order, with
+``pow``, ``ln``, ``sqrt`` and ``exp`` from the C library. Statuses and
+``NaN`` handling follow :func:`core.batch.calc_tolerance_bulk`, with ``NULL``
+in the part of ``NaN`` (``NULL`` inputs give ``STATUS_INVALID_VALUE``; a
+formula domain error – a ``NULL`` or infinite r or R – gives
+``STATUS_FORMULA_ERROR``). Non-numeric cells (``''``, ``'abc'``) are ``NULL``
+as well, where a plain SQLite ``CAST`` would read them as 0.0.
+NumPy's vectorised ``power`` can differ from the C library in the last bit,
+so bulk results for power formulas may differ from these by one ulp.
+Tabulated methods (:mod:`core.lookup`) are evaluated from the exact formula.
+
+It provides:
+* ``formula_to_sql`` – translate a formula to a SQL expression of ``avg``.
+* ``SqlEvaluator`` – ``query`` builds the SQL; ``evaluate`` returns a
+  :class:`~core.batch.BulkResult`; ``materialize`` writes the results to a
+  table; ``summary`` returns per-method pass/fail counts.
+"""
+
+import argparse
+import ast
+import math
+import sys
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core import TOLERANCE_FACTOR, Method, configure_logging, logger
+from core.batch import (
+    STATUS_FORMULA_ERROR,
+    STATUS_INVALID_VALUE,
+    STATUS_OK,
+    STATUS_OUT_OF_RANGE,
+    STATUS_UNKNOWN_METHOD,
+    BulkResult,
+)
+from core.formula import FormulaError, compile_formula, parse_formula
+
+METHODS_TABLE = "mpc_methods"
+
+# Rows fetched per round trip by SqlEvaluator.evaluate.
+FETCH_SIZE = 10_000
+
+# Formula kinds stored in mpc_methods.
+KIND_CONSTANT = 0
+KIND_LINEAR = 1
+KIND_POWER = 2
+KIND_EXPRESSION = 3
+KIND_BROKEN = 4
+
+_KINDS = {"constant": KIND_CONSTANT, "linear": KIND_LINEAR, "power": KIND_POWER}
+
+# Output columns of SqlEvaluator.query. SQL identifiers are case-insensitive,
+# so r and R are spelled out as in core.history.
+RESULT_COLUMNS = [
+    "method", "v1", "v2", "unit", "decimals", "avg", "diff", "repeatability", "reproducibility",
+    "tolerance_075R", "repeatability_pass", "reproducibility_pass", "tolerance_pass", "status",
+]
+
+
+# ---------------------------------------------------------------------------
+# Formula translation
+# ---------------------------------------------------------------------------
+def _literal(value: float) -> str:
+    # Always a REAL literal: SQLite divides integers as integers.
+    return repr(float(value))
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def formula_to_sql(formula: str, avg: str = "avg", dialect: str = "sqlite") -> str:
+    """Translate *formula* into a fully parenthesised SQL expression of *avg*.
+
+    Raises ``SyntaxError`` / :class:`~core.formula.FormulaError` like
+    :func:`core.formula.parse_formula`, and ``FormulaError`` for calls with no
+    SQL equivalent (three-argument ``pow``).
+    """
+
+    return _to_sql(parse_formula(formula), avg, dialect, formula)
+
+
+def _to_sql(node: ast.expr, avg: str, dialect: str, formula: str) -> str:
+    if isinstance(node, ast.Constant):
+        return _literal(node.value)
+    if isinstance(node, ast.Name):
+        return avg
+    if isinstance(node, ast.UnaryOp):
+        operand = _to_sql(node.operand, avg, dialect, formula)
+        return f"(- {operand})" if isinstance(node.op, ast.USub) else operand
+    if isinstance(node, ast.BinOp):
+        left = _to_sql(node.left, avg, dialect, formula)
+        right = _to_sql(node.right, avg, dialect, formula)
+        if isinstance(node.op, ast.Pow):
+            return f"pow({left}, {right})"
+        if isinstance(node.op, ast.Mod):
+            return _python_mod(left, right, dialect)
+        symbol = {ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.Div: "/"}[type(node.op)]
+        return f"({left} {symbol} {right})"
+    # ast.Call – whitelisted by parse_formula
+    name = node.func.id
+    args = [_to_sql(a, avg, dialect, formula) for a in node.args]
+    if name == "log" and len(args) == 2:
+        return f"(ln({args[0]}) / ln({args[1]}))"
+    if name == "pow" and len(args) == 2:
+        return f"pow({args[0]}, {args[1]})"
+    if name in ("abs", "sqrt", "exp", "log") and len(args) == 1:
+        return f"{'ln' if name == 'log' else name}({args[0]})"
+    raise FormulaError(f"{name}() with {len(args)} arguments has no SQL translation in {formula!r}")
+
+
+def _python_mod(left: str, right: str, dialect: str) -> str:
+    # fmod() takes the sign of the dividend; Python's % that of the divisor.
+    fmod = f"mod({left}, {right})" if dialect == "sqlite" else f"fmod({left}, {right})"
+    return f"(CASE WHEN {fmod} <> 0 AND ({fmod} < 0) <> ({right} < 0) THEN {fmod} + {right} ELSE {fmod} END)"
+
+
+def _shape(formula: str, static: float | None, dialect: str) -> Tuple[int, float, float, str]:
+    """Return ``(kind, k, x, expression)`` describing r or R of one method."""
+    if not formula:
+        return KIND_CONSTANT, static if static is not None else 0.0, 0.0, ""
+    try:
+        compiled = compile_formula(formula)
+        if compiled.kind in _KINDS:
+            k, *rest = compiled.coefficients
+            return _KINDS[compiled.kind], float(k), float(rest[0]) if rest else 0.0, ""
+        return KIND_EXPRESSION, 0.0, 0.0, formula_to_sql(formula, "avg", dialect)
+    except Exception as exc:
+        logger.error("Formula %s cannot be evaluated in SQL: %s", formula, exc)
+        return KIND_BROKEN, 0.0, 0.0, ""
+
+
+# ---------------------------------------------------------------------------
+# Evaluator
+# ---------------------------------------------------------------------------
+def _dialect(connection: Any) -> str:
+    # The class lives in duckdb or, in newer releases, in its _duckdb extension.
+    return "duckdb" if type(connection).__module__.lstrip("_").startswith("duckdb") else "sqlite"
+
+
+def _register_math(connection: Any) -> None:
+    """Provide pow/ln/sqrt/exp/mod on SQLite builds without math functions."""
+    try:
+        connection.execute("SELECT pow(2.0, 0.5), ln(2.0), sqrt(2.0), exp(1.0), mod(7.5, 2.0)").fetchone()
+        return
+    except Exception:
+        pass
+
+    def wrap(func):
+        def sql_function(*args):
+            if any(a is None for a in args):
+                return None
+            try:
+                return func(*args)
+            except (ValueError, ZeroDivisionError, OverflowError):
+                return None
+        return sql_function
+
+    for name, arity, func in (
+        ("pow", 2, math.pow),
+        ("ln", 1, math.log),
+        ("sqrt", 1, math.sqrt),
+        ("exp", 1, math.exp),
+        ("mod", 2, math.fmod),
+    ):
+        connection.create_function(name, arity, wrap(func), deterministic=True)
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """SQL ``mpc_to_float``: parse text like :func:`core.stream.evaluate_rows`.
+
+    Anything that is not a number (``''``, ``'abc'``, ``'12abc'``, ``'nan'``)
+    becomes ``NULL``, i.e. ``STATUS_INVALID_VALUE``.
+    """
+    if not isinstance(value, (str, int, float)):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return None if number != number else number
+
+
+def _numeric_sql(column: str, dialect: str) -> str:
+    """*column* as a DOUBLE, ``NULL`` for non-numeric values.
+
+    A plain ``CAST`` turns non-numeric text into 0.0 in SQLite, so text
+    cells go through ``mpc_to_float``; numbers stay in SQL.
+    """
+    if dialect == "sqlite":
+        return (f"CASE typeof({column}) WHEN 'real' THEN {column} WHEN 'integer' THEN CAST({column} AS REAL) "
+                f"WHEN 'text' THEN mpc_to_float({column}) END")
+    value = f"TRY_CAST({column} AS DOUBLE)"
+    return f"CASE WHEN isnan({value}) THEN NULL ELSE {value} END"
+
+
+class SqlEvaluator:
+    """Runs tolerance checks as SQL on a DB-API *connection*.
+
+    *connection* is a :mod:`sqlite3` connection or a DuckDB connection. The
+    methods are installed into a temporary table on construction; create a
+    new evaluator after changing the registry.
+    """
+
+    def __init__(self, connection: Any, methods: Mapping[str, Method], dialect: Optional[str] = None):
+        self.connection = connection
+        self.dialect = dialect or _dialect(connection)
+        self._expressions: Dict[str, List[Tuple[int, str]]] = {"rep": [], "repro": []}
+        if self.dialect == "sqlite":
+            _register_math(connection)
+            connection.create_function("mpc_to_float", 1, _to_float, deterministic=True)
+        self._install(methods)
+
+    def _install(self, methods: Mapping[str, Method]) -> None:
+        rows = []
+        for i, method in enumerate(methods.values()):
+            rep = _shape(method.formula_r, method.r, self.dialect)
+            repro = _shape(method.formula_R, method.R, self.dialect)
+            for prefix, shape in (("rep", rep), ("repro", repro)):
+                if shape[0] == KIND_EXPRESSION:
+                    self._expressions[prefix].append((i, shape[3]))
+            rows.append((i, method.name, method.unit, method.decimals, method.lower, method.upper,
+                         *rep[:3], *repro[:3]))
+        conn = self.connection
+        conn.execute(f"DROP TABLE IF EXISTS {METHODS_TABLE}")
+        conn.execute(
+            f"CREATE TEMP TABLE {METHODS_TABLE} ("
+            "id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, unit TEXT, decimals INTEGER, "
+            "lower DOUBLE, upper DOUBLE, "
+            "rep_kind INTEGER, rep_k DOUBLE, rep_x DOUBLE, "
+            "repro_kind INTEGER, repro_k DOUBLE, repro_x DOUBLE)"
+        )
+        conn.executemany(f"INSERT INTO {METHODS_TABLE} VALUES ({', '.join('?' * 12)})", rows)
+
+    def _value_sql(self, prefix: str) -> str:
+        k, x, kind = f"{prefix}_k", f"{prefix}_x", f"{prefix}_kind"
+        branches = [
+            f"WHEN {KIND_CONSTANT} THEN {k}",
+            f"WHEN {KIND_LINEAR} THEN {k} * (avg + {x})",
+            f"WHEN {KIND_POWER} THEN {k} * pow(avg, {x})",
+        ]
+        if self._expressions[prefix]:
+            cases = " ".join(f"WHEN {i} THEN {sql}" for i, sql in self._expressions[prefix])
+            branches.append(f"WHEN {KIND_EXPRESSION} THEN CASE id {cases} END")
+        return f"CASE {kind} {' '.join(branches)} END"
+
+    def query(
+        self,
+        table: str,
+        method: str = "method",
+        v1: str = "v1",
+        v2: str = "v2",
+        where: Optional[str] = None,
+        order_by: Optional[str] = None,
+    ) -> str:
+        """Return the SELECT producing :data:`RESULT_COLUMNS` for *table*.
+
+        *table* and the column arguments are identifiers (quoted here);
+        *where* and *order_by* are SQL fragments over the source table and
+        may use ``?`` parameters passed to :meth:`evaluate`. Rows come back
+        in *order_by* order, by default the source ``rowid`` (input order, as
+        in the Python paths); views and ``WITHOUT ROWID`` tables need an
+        explicit *order_by*.
+        """
+
+        q = quote_identifier
+        order = order_by or "rowid"
+        return f"""
+WITH src AS (
+    SELECT {q(method)} AS method, {_numeric_sql(q(v1), self.dialect)} AS v1,
+           {_numeric_sql(q(v2), self.dialect)} AS v2,
+           {order} AS sort_key
+    FROM {q(table)}{f" WHERE {where}" if where else ""}
+), ev AS (
+    SELECT src.*, (src.v1 + src.v2) / 2.0 AS avg, abs(src.v1 - src.v2) AS diff,
+           m.id, m.unit, m.decimals, m.lower, m.upper,
+           m.rep_kind, m.rep_k, m.rep_x, m.repro_kind, m.repro_k, m.repro_x,
+           m.rep_kind = {KIND_BROKEN} OR m.repro_kind = {KIND_BROKEN} AS broken
+    FROM src LEFT JOIN {METHODS_TABLE} AS m ON m.name = src.method
+), rr AS (
+    SELECT ev.*,
+           CASE WHEN broken THEN NULL ELSE {self._value_sql("rep")} END AS rep,
+           CASE WHEN broken THEN NULL ELSE {self._value_sql("repro")} END AS repro,
+           (lower IS NULL OR (v1 >= lower AND v2 >= lower))
+           AND (upper IS NULL OR (v1 <= upper AND v2 <= upper)) AS in_range
+    FROM ev
+), checked AS (
+    -- x - x = 0 is false or NULL for NULL, NaN and ±inf alike.
+    SELECT rr.*, NOT COALESCE(rep - rep = 0 AND repro - repro = 0, FALSE) AS failed
+    FROM rr
+)
+SELECT method, v1, v2,
+       COALESCE(unit, '') AS unit,
+       COALESCE(decimals, -1) AS decimals,
+       CASE WHEN id IS NULL OR broken THEN NULL ELSE avg END AS avg,
+       CASE WHEN id IS NULL OR broken THEN NULL ELSE diff END AS diff,
+       CASE WHEN failed THEN NULL ELSE rep END AS repeatability,
+       CASE WHEN failed THEN NULL ELSE repro END AS reproducibility,
+       CASE WHEN failed THEN NULL ELSE {_literal(TOLERANCE_FACTOR)} * repro END AS tolerance_075R,
+       COALESCE(NOT failed AND diff <= rep AND in_range, FALSE) AS repeatability_pass,
+       COALESCE(NOT failed AND diff <= repro AND in_range, FALSE) AS reproducibility_pass,
+       COALESCE(NOT failed AND diff <= {_literal(TOLERANCE_FACTOR)} * repro AND in_range, FALSE) AS tolerance_pass,
+       CASE
+           WHEN id IS NULL THEN {STATUS_UNKNOWN_METHOD}
+           WHEN v1 IS NULL OR v2 IS NULL THEN {STATUS_INVALID_VALUE}
+           WHEN broken OR failed THEN {STATUS_FORMULA_ERROR}
+           WHEN NOT in_range THEN {STATUS_OUT_OF_RANGE}
+           ELSE {STATUS_OK}
+       END AS status
+FROM checked
+ORDER BY sort_key
+"""
+
+    def evaluate(self, table: str, params: Sequence[Any] = (), **options: Any) -> BulkResult:
+        """Run :meth:`query` and return the rows as a :class:`BulkResult`.
+
+        Only the result columns cross into Python (no per-row objects are
+        built); ``NULL`` numbers become ``NaN``.
+        """
+
+        cursor = self.connection.execute(self.query(table, **options), tuple(params))
+        columns: List[list] = [[] for _ in RESULT_COLUMNS]
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for column, values in zip(columns, zip(*rows)):
+                column.extend(values)
+        data = dict(zip(RESULT_COLUMNS, columns))
+        floats = {field: np.array(data[name], dtype=np.float64) for field, name in (
+            ("avg", "avg"), ("diff", "diff"), ("r", "repeatability"), ("R", "reproducibility"),
+            ("tolerance_075R", "tolerance_075R"))}
+        method_name = np.empty(len(data["method"]), dtype=object)
+        method_name[:] = data["method"]
+        unit = np.empty(len(data["unit"]), dtype=object)
+        unit[:] = data["unit"]
+        return BulkResult(
+            method_name=method_name,
+            unit=unit,
+            decimals=np.array(data["decimals"], dtype=np.int16),
+            r_pass=np.array(data["repeatability_pass"], dtype=bool),
+            R_pass=np.array(data["reproducibility_pass"], dtype=bool),
+            tolerance_pass=np.array(data["tolerance_pass"], dtype=bool),
+            status=np.array(data["status"], dtype=np.int8),
+            **floats,
+        )
+
+    def materialize(self, into: str, table: str, params: Sequence[Any] = (), **options: Any) -> int:
+        """Write the results of *table* to a new table *into*; return its row count."""
+        conn = self.connection
+        conn.execute(f"CREATE TABLE {quote_identifier(into)} AS {self.query(table, **options)}", tuple(params))
+        if self.dialect == "sqlite":
+            conn.commit()
+        return conn.execute(f"SELECT count(*) FROM {quote_identifier(into)}").fetchone()[0]
+
+    def summary(self, table: str, params: Sequence[Any] = (), **options: Any) -> List[Dict[str, Any]]:
+        """Per-method counts of rows, ok rows and r / R / 0.75R failures."""
+        sql = f"""
+SELECT method, count(*) AS rows,
+       sum(CASE WHEN status = {STATUS_OK} THEN 1 ELSE 0 END) AS ok,
+       sum(CASE WHEN status = {STATUS_OK} AND NOT repeatability_pass THEN 1 ELSE 0 END) AS repeatability_fail,
+       sum(CASE WHEN status = {STATUS_OK} AND NOT reproducibility_pass THEN 1 ELSE 0 END) AS reproducibility_fail,
+       sum(CASE WHEN status = {STATUS_OK} AND NOT tolerance_pass THEN 1 ELSE 0 END) AS tolerance_fail
+FROM ({self.query(table, **options)}) AS results
+GROUP BY method ORDER BY method"""
+        cursor = self.connection.execute(sql, tuple(params))
+        names = [d[0] for d in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m core.pushdown",
+        description="Evaluate a table of duplicate pairs inside its SQLite / DuckDB database.",
+    )
+    parser.add_argument("database", help="SQLite database file (.duckdb files use DuckDB if installed)")
+    parser.add_argument("table", help="table holding the pairs")
+    parser.add_argument("--method-column", default="method")
+    parser.add_argument("--v1-column", default="v1")
+    parser.add_argument("--v2-column", default="v2")
+    parser.add_argument("--methods-file", default="methods_enriched.csv", help="method registry CSV")
+    parser.add_argument("--into", metavar="TABLE", help="write the results to a new table (default: print a summary)")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    from core.registry import get_registry
+
+    if args.database.endswith(".duckdb"):
+        import duckdb
+
+        connection = duckdb.connect(args.database)
+    else:
+        import sqlite3
+
+        connection = sqlite3.connect(args.database)
+    evaluator = SqlEvaluator(connection, get_registry(args.methods_file).methods)
+    options = dict(method=args.method_column, v1=args.v1_column, v2=args.v2_column)
+    try:
+        if args.into:
+            rows = evaluator.materialize(args.into, args.table, **options)
+            print(f"Wrote {rows} rows to {args.into}")
+        else:
+            for row in evaluator.summary(args.table, **options):
+                print("\t".join(str(v) for v in row.values()))
+    except Exception as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    finally:
+        connection.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# Process-wide method registry for Method Precision Calculator
+
+"""Load the method catalog once per process and pick up edits without restart.
+
+``MethodRegistry`` wraps a loaded catalog – a columnar
+:class:`core.table.MethodTable` plus its :class:`core.index.MethodIndex` –
+behind read-only accessors (by method name and by display label). Every
+access is cheap: at most once per ``poll_interval`` seconds the CSV is
+``stat``-ed, and if its size or mtime changed the catalog is reloaded and swapped in with a single assignment, so
+readers always see either the old or the new catalog, never a mix. A reload
+that fails (e.g. a half-written file) keeps the previous catalog.
+
+``get_registry`` returns the shared instance for a CSV path; both UIs use it.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+from core import Method, logger
+from core.index import MethodIndex
+from core.snapshot import load_methods_cached
+from core.table import MethodTable
+
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+@dataclass(frozen=True)
+class _Catalog:
+    methods: MethodTable
+    labels: Mapping[str, str]
+    index: MethodIndex
+    stamp: Tuple[int, int]
+
+
+class MethodRegistry:
+    """Read-only, hot-reloading view of a method CSV."""
+
+    def __init__(self, csv_path: str | Path, poll_interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        self.path = Path(csv_path)
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._catalog = self._load()
+        self._next_check = time.monotonic() + poll_interval
+
+    # -- loading ------------------------------------------------------------
+    def _stamp(self) -> Tuple[int, int]:
+        st = os.stat(self.path)
+        return st.st_size, st.st_mtime_ns
+
+    def _load(self) -> _Catalog:
+        stamp = self._stamp()
+        table = MethodTable(load_methods_cached(self.path).values())
+        labels = {table.display_label(i): name for i, name in enumerate(table.names)}
+        return _Catalog(table, MappingProxyType(labels), MethodIndex(table), stamp)
+
+    def _current(self) -> _Catalog:
+        if time.monotonic() >= self._next_check:
+            self.refresh()
+        return self._catalog
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload if the CSV changed (or *force*); return ``True`` on reload."""
+        with self._lock:
+            self._next_check = time.monotonic() + self.poll_interval
+            try:
+                if not force and self._stamp() == self._catalog.stamp:
+                    return False
+                catalog = self._load()
+            except Exception as exc:
+                logger.error("Reloading methods from %s failed, keeping previous catalog: %s", self.path, exc)
+                return False
+            self._catalog = catalog
+        logger.info("Reloaded %d methods from %s", len(catalog.methods), self.path)
+        return True
+
+    # -- read-only access ---------------------------------------------------
+    @property
+    def methods(self) -> MethodTable:
+        """Read-only ``name → Method`` mapping (a consistent snapshot)."""
+        return self._current().methods
+
+    @property
+    def label_map(self) -> Mapping[str, str]:
+        """Read-only ``display_label → name`` mapping."""
+        return self._current().labels
+
+    def get(self, name: str) -> Optional[Method]:
+        return self._current().methods.get(name)
+
+    def by_label(self, label: str) -> Optional[Method]:
+        catalog = self._current()
+        name = catalog.labels.get(label)
+        return catalog.methods.get(name) if name is not None else None
+
+    def names(self) -> List[str]:
+        return list(self._current().methods)
+
+    def labels(self) -> List[str]:
+        return list(self._current().labels)
+
+    @property
+    def index(self) -> MethodIndex:
+        """Search index of the current catalog (rebuilt on reload)."""
+        return self._current().index
+
+    def search(self, text: str = "", **facets: Optional[str]) -> List[str]:
+        """Shortcut for :meth:`core.index.MethodIndex.search`."""
+        return self._current().index.search(text, **facets)
+
+    @property
+    def table(self) -> MethodTable:
+        """The underlying columnar catalog."""
+        return self._current().methods
+
+    def __getitem__(self, name: str) -> Method:
+        return self._current().methods[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._current().methods
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._current().methods)
+
+    def __len__(self) -> int:
+        return len(self._current().methods)
+
+
+# ---------------------------------------------------------------------------
+# Process-wide instances
+# ---------------------------------------------------------------------------
+_registries: Dict[Path, MethodRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(csv_path: str | Path, poll_interval: float = DEFAULT_POLL_INTERVAL) -> MethodRegistry:
+    """Return the shared :class:`MethodRegistry` for *csv_path*, creating it once."""
+    key = Path(csv_path).resolve()
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = _registries[key] = MethodRegistry(key, poll_interval=poll_interval)
+        return registry
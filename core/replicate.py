@@ -0,0 +1,264 @@
+# Replicate-set evaluation for Method Precision Calculator
+
+"""Check sets of n ≥ 2 replicate results against the critical range.
+
+For *n* results obtained under repeatability (or reproducibility) conditions,
+ASTM/ISO practice accepts the set when its range does not exceed the critical
+range ``CR(n) = f(n) · σ``, where ``σ = r / 2.8`` (or ``R / 2.8``) is evaluated
+at the mean of the set and ``f(n)`` is the critical range factor of
+ISO 5725-6, Table 1. For ``n = 2`` this reduces to the pair check of
+:func:`core.calc_tolerance` (``|v1 - v2| ≤ r``).
+
+Groups are ragged: a flat value array plus ``offsets`` (group *g* is
+``values[offsets[g]:offsets[g + 1]]``, as in CSR matrices), or a long table of
+``(method, group key, value)`` rows. Ranges and means of all groups are
+computed with ``ufunc.reduceat`` in one pass; formulas run once per method
+on the means of its groups.
+
+It provides:
+* ``CRITICAL_RANGE_FACTORS`` / ``critical_range_factor`` – f(n) for 2 ≤ n ≤ 40.
+* ``ReplicateResult`` – a columnar result with one entry per group.
+* ``calc_replicates`` – evaluates groups given as values plus offsets.
+* ``calc_replicates_long`` – groups a long table and evaluates it.
+"""
+
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Mapping, Tuple
+
+import numpy as np
+
+import core
+from core import PRECISION_FACTOR, Method
+from core.batch import (
+    STATUS_FORMULA_ERROR,
+    STATUS_GROUP_SIZE,
+    STATUS_INVALID_VALUE,
+    STATUS_OK,
+    STATUS_OUT_OF_RANGE,
+    STATUS_UNKNOWN_METHOD,
+    _resolve_array,
+    factorize,
+)
+
+# Critical range factors f(n) for the 95 % level, ISO 5725-6 Table 1.
+CRITICAL_RANGE_FACTORS: Dict[int, float] = {
+    2: 2.8, 3: 3.3, 4: 3.6, 5: 3.9, 6: 4.0, 7: 4.2, 8: 4.3, 9: 4.4, 10: 4.5,
+    11: 4.6, 12: 4.6, 13: 4.7, 14: 4.7, 15: 4.8, 16: 4.8, 17: 4.9, 18: 4.9, 19: 5.0, 20: 5.0,
+    21: 5.0, 22: 5.1, 23: 5.1, 24: 5.1, 25: 5.2, 26: 5.2, 27: 5.2, 28: 5.3, 29: 5.3, 30: 5.3,
+    31: 5.3, 32: 5.3, 33: 5.4, 34: 5.4, 35: 5.4, 36: 5.4, 37: 5.4, 38: 5.5, 39: 5.5, 40: 5.5,
+}
+
+# f(n) / 2.8 indexed by n; NaN marks unsupported sizes.
+_SIGMA_MULTIPLIER = np.full(max(CRITICAL_RANGE_FACTORS) + 1, np.nan)
+for _n, _f in CRITICAL_RANGE_FACTORS.items():
+    _SIGMA_MULTIPLIER[_n] = _f / PRECISION_FACTOR
+
+
+def critical_range_factor(n: int) -> float:
+    """Return f(n); raises ``ValueError`` outside 2 ≤ n ≤ 40."""
+    try:
+        return CRITICAL_RANGE_FACTORS[n]
+    except KeyError:
+        raise ValueError(f"No critical range factor for n={n} (supported: 2–{max(CRITICAL_RANGE_FACTORS)})") from None
+
+
+# ---------------------------------------------------------------------------
+# Result container
+# ---------------------------------------------------------------------------
+@dataclass
+class ReplicateResult:
+    """Columnar result of :func:`calc_replicates`, one entry per group.
+
+    ``critical_range_r`` / ``critical_range_R`` are ``f(n) · r / 2.8`` and
+    ``f(n) · R / 2.8`` at the group mean; the pass flags compare ``range``
+    against them and are ``False`` unless ``status`` is ``STATUS_OK``. Groups
+    with fewer than 2 or more than 40 results get ``STATUS_GROUP_SIZE``;
+    statuses otherwise follow :class:`core.batch.BulkResult`.
+    """
+
+    method_name: np.ndarray
+    unit: np.ndarray
+    decimals: np.ndarray
+    n: np.ndarray
+    mean: np.ndarray
+    range: np.ndarray
+    r: np.ndarray
+    R: np.ndarray
+    critical_range_r: np.ndarray
+    critical_range_R: np.ndarray
+    r_pass: np.ndarray
+    R_pass: np.ndarray
+    status: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """Return group *index* as a plain dictionary."""
+        result = {f.name: getattr(self, f.name)[index] for f in fields(self)}
+        return {k: (v.item() if isinstance(v, np.generic) else v) for k, v in result.items()}
+
+
+# ---------------------------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------------------------
+def calc_replicates(
+    methods: Mapping[str, Method],
+    method_names: Any,
+    values: Any,
+    offsets: Any,
+) -> ReplicateResult:
+    """Evaluate ragged replicate groups mixing many methods.
+
+    ``method_names`` has one entry per group; ``offsets`` has one more entry
+    than there are groups, starts at 0, never decreases and ends at
+    ``len(values)``. Unknown methods, out-of-range or ``NaN`` results, failing
+    formulas and unsupported group sizes are reported in ``status``.
+    """
+
+    names = np.asarray(method_names, dtype=object)
+    vals = np.asarray(values, dtype=np.float64)
+    off = np.asarray(offsets, dtype=np.intp)
+    groups = len(names)
+    if names.ndim != 1 or vals.ndim != 1 or off.shape != (groups + 1,):
+        raise ValueError("method_names and values must be 1-D and offsets must have len(method_names) + 1 entries")
+    if off[0] != 0 or off[-1] != len(vals) or (np.diff(off) < 0).any():
+        raise ValueError("offsets must start at 0, never decrease and end at len(values)")
+
+    out = ReplicateResult(
+        method_name=names,
+        unit=np.full(groups, "", dtype=object),
+        decimals=np.full(groups, -1, dtype=np.int16),
+        n=np.diff(off),
+        mean=np.full(groups, np.nan),
+        range=np.full(groups, np.nan),
+        r=np.full(groups, np.nan),
+        R=np.full(groups, np.nan),
+        critical_range_r=np.full(groups, np.nan),
+        critical_range_R=np.full(groups, np.nan),
+        r_pass=np.zeros(groups, dtype=bool),
+        R_pass=np.zeros(groups, dtype=bool),
+        status=np.full(groups, STATUS_UNKNOWN_METHOD, dtype=np.int8),
+    )
+    if groups == 0:
+        return out
+    probe = core._probe
+    if probe is not None:
+        start = probe.clock()
+
+    # reduceat over the non-empty groups only: each segment then runs to the
+    # next non-empty start, which is exactly the group's end.
+    sizes = out.n
+    filled = sizes > 0
+    lo = np.full(groups, np.nan)
+    hi = np.full(groups, np.nan)
+    if filled.any():
+        starts = off[:-1][filled]
+        out.mean[filled] = np.add.reduceat(vals, starts) / sizes[filled]
+        lo[filled] = np.minimum.reduceat(vals, starts)
+        hi[filled] = np.maximum.reduceat(vals, starts)
+    out.range = hi - lo
+    multiplier = np.full(groups, np.nan)
+    supported = sizes < len(_SIGMA_MULTIPLIER)
+    multiplier[supported] = _SIGMA_MULTIPLIER[sizes[supported]]
+
+    inverse, unique_names = factorize(names)
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(inverse, minlength=len(unique_names)))))
+
+    for g, name in enumerate(unique_names):
+        method = methods.get(name)
+        if method is None:
+            continue
+        idx = order[bounds[g]:bounds[g + 1]]
+        out.unit[idx] = method.unit
+        out.decimals[idx] = method.decimals
+        mean = out.mean[idx]
+        try:
+            r = _resolve_array(method.formula_r, method.r, mean, method.eval_r)
+            R = _resolve_array(method.formula_R, method.R, mean, method.eval_R)
+        except Exception:
+            out.status[idx] = STATUS_FORMULA_ERROR
+            if probe is not None:
+                probe.count_method(name, len(idx), errors=len(idx))
+            continue
+        if probe is not None:
+            probe.count_method(name, len(idx))
+        out.r[idx] = r
+        out.R[idx] = R
+        in_range = np.ones(len(idx), dtype=bool)
+        if method.lower is not None:
+            in_range &= ~(lo[idx] < method.lower)
+        if method.upper is not None:
+            in_range &= ~(hi[idx] > method.upper)
+        out.status[idx] = np.where(in_range, STATUS_OK, STATUS_OUT_OF_RANGE)
+        # Domain errors come back as NaN or ±inf under errstate, as in
+        # core.batch.calc_tolerance_bulk; groups without a mean are left to
+        # the invalid-value check below.
+        failed = ~(np.isfinite(out.r[idx]) & np.isfinite(out.R[idx])) & ~np.isnan(mean)
+        if failed.any():
+            rows = idx[failed]
+            out.status[rows] = STATUS_FORMULA_ERROR
+            out.r[rows] = np.nan
+            out.R[rows] = np.nan
+
+    known = (out.status != STATUS_UNKNOWN_METHOD) & (out.status != STATUS_FORMULA_ERROR)
+    out.status[known & np.isnan(multiplier)] = STATUS_GROUP_SIZE
+    out.status[known & filled & np.isnan(out.range)] = STATUS_INVALID_VALUE
+
+    out.critical_range_r = multiplier * out.r
+    out.critical_range_R = multiplier * out.R
+    ok = out.status == STATUS_OK
+    with np.errstate(invalid="ignore"):
+        out.r_pass = (out.range <= out.critical_range_r) & ok
+        out.R_pass = (out.range <= out.critical_range_R) & ok
+    if probe is not None:
+        probe.record("calc_replicates", probe.clock() - start)
+    return out
+
+
+def calc_replicates_long(
+    methods: Mapping[str, Method],
+    method_names: Any,
+    group_keys: Any,
+    values: Any,
+) -> Tuple[np.ndarray, ReplicateResult]:
+    """Group a long table of ``(method, group key, value)`` rows and evaluate it.
+
+    Rows sharing a method name and group key (e.g. a sample ID) form one
+    replicate set, in any row order. Returns ``(keys, result)`` where ``keys``
+    holds the group key of each result entry, in order of first appearance.
+    """
+
+    names = np.asarray(method_names, dtype=object)
+    keys = np.asarray(group_keys)
+    vals = np.asarray(values, dtype=np.float64)
+    n = len(names)
+    if names.ndim != 1 or keys.shape != (n,) or vals.shape != (n,):
+        raise ValueError("method_names, group_keys and values must be 1-D columns of equal length")
+
+    # Factorise both columns to integer codes (numeric keys with np.unique,
+    # anything else with a dict) and sort once on the combined code: groups
+    # are then contiguous runs of the sorted rows.
+    name_codes, name_uniques = factorize(names)
+    key_codes, key_uniques = factorize(keys)
+    combined = name_codes * np.int64(len(key_uniques)) + key_codes
+    order = np.argsort(combined, kind="stable")
+    ordered = combined[order]
+    starts = np.flatnonzero(np.concatenate(([n > 0], ordered[1:] != ordered[:-1])))
+    offsets = np.append(starts, n)
+    group_codes = ordered[starts]
+    result = calc_replicates(
+        methods,
+        name_uniques[group_codes // max(len(key_uniques), 1)],
+        vals[order],
+        offsets,
+    )
+
+    # Report groups in order of first appearance (order[start] is the first
+    # row of each run because the sort is stable).
+    appearance = np.argsort(order[starts], kind="stable")
+    for f in fields(result):
+        setattr(result, f.name, getattr(result, f.name)[appearance])
+    return key_uniques[group_codes[appearance] % max(len(key_uniques), 1)], result
+
@@ -0,0 +1,381 @@
+# Memory-mapped columnar result store for Method Precision Calculator
+
+"""Keep tens of millions of evaluated pairs for audits in a binary column store.
+
+A store is a directory::
+
+    run.mpcr/
+        meta.json          version, columns and the method table
+        timestamp.bin      float64 – evaluation time (Unix seconds)
+        method_id.bin      uint32  – index into the method table
+        v1.bin … tolerance_075R.bin   float64
+        status.bin         int8    – core.batch STATUS_* code
+        flags.bin          uint8   – FLAG_REPEATABILITY | FLAG_REPRODUCIBILITY | FLAG_TOLERANCE
+
+Every column is a raw little-endian fixed-width array, so readers
+memory-map each one with :func:`numpy.memmap` – nothing is parsed or copied
+and a filter only touches the columns it tests (14 bytes per row for
+"method, time and R pass" instead of the 70-byte row). Appending writes to
+the end of every column file; the row count is the shortest column, so a
+crash mid-append never exposes a torn row. ``meta.json`` is replaced
+atomically before rows referring to a new method are written.
+
+One process may append at a time; any number may read (call
+:meth:`ResultStore.refresh` to see rows appended since opening).
+
+It provides:
+* ``ResultStore`` – ``append`` / ``append_rows`` to write, ``column`` /
+  ``select`` / ``rows`` to read, ``to_arrow`` / ``write_parquet`` with
+  :mod:`pyarrow` (optional).
+* ``FLAG_*`` – the pass bits of the ``flags`` column.
+"""
+
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from core import Method, logger
+from core.batch import STATUS_LABELS, STATUS_OK, BulkResult
+
+STORE_VERSION = 1
+
+FLAG_REPEATABILITY = 1
+FLAG_REPRODUCIBILITY = 2
+FLAG_TOLERANCE = 4
+
+COLUMNS: Dict[str, np.dtype] = {
+    "timestamp": np.dtype("<f8"),
+    "method_id": np.dtype("<u4"),
+    "v1": np.dtype("<f8"),
+    "v2": np.dtype("<f8"),
+    "avg": np.dtype("<f8"),
+    "diff": np.dtype("<f8"),
+    "r": np.dtype("<f8"),
+    "R": np.dtype("<f8"),
+    "tolerance_075R": np.dtype("<f8"),
+    "status": np.dtype("i1"),
+    "flags": np.dtype("u1"),
+}
+
+_META = "meta.json"
+_PASS_FLAGS = {"r_pass": FLAG_REPEATABILITY, "R_pass": FLAG_REPRODUCIBILITY, "tolerance_pass": FLAG_TOLERANCE}
+
+TimeLike = float | datetime
+
+
+def _column_file(root: Path, name: str) -> Path:
+    return root / f"{name}.bin"
+
+
+def _seconds(value: TimeLike) -> float:
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+class ResultStore:
+    """A columnar result store opened for reading (``"r"``) or appending (``"a"``).
+
+    Use as a context manager, or call :meth:`close`.
+    """
+
+    def __init__(self, path: str | Path, mode: str = "r") -> None:
+        if mode not in ("r", "a"):
+            raise ValueError("mode must be 'r' or 'a'")
+        self.path = Path(path)
+        self.mode = mode
+        meta_path = self.path / _META
+        if not meta_path.exists():
+            if mode == "r":
+                raise FileNotFoundError(f"No result store at {self.path}")
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._methods: List[Dict[str, Any]] = []
+            self._write_meta()
+            for name in COLUMNS:
+                _column_file(self.path, name).touch()
+        else:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != STORE_VERSION:
+                raise ValueError(f"Unsupported result store version {meta.get('version')!r}")
+            stored = {name: np.dtype(descr) for name, descr in meta["columns"].items()}
+            if stored != COLUMNS:
+                raise ValueError(f"Result store {self.path} has different columns")
+            self._methods = meta["methods"]
+        self._ids = {m["name"]: i for i, m in enumerate(self._methods)}
+        self._files: Dict[str, BinaryIO] = {}
+        self._maps: Dict[str, np.ndarray] = {}
+        self._length = self._stored_length()
+        if mode == "a":
+            # Drop a torn tail left by an interrupted append.
+            for name, dtype in COLUMNS.items():
+                f = open(_column_file(self.path, name), "r+b")
+                f.truncate(self._length * dtype.itemsize)
+                f.seek(0, os.SEEK_END)
+                self._files[name] = f
+
+    # -- metadata -------------------------------------------------------------
+    def _write_meta(self) -> None:
+        meta = {
+            "version": STORE_VERSION,
+            "columns": {name: dtype.str for name, dtype in COLUMNS.items()},
+            "methods": self._methods,
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=_META, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path / _META)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _stored_length(self) -> int:
+        return min(
+            os.path.getsize(_column_file(self.path, name)) // dtype.itemsize
+            for name, dtype in COLUMNS.items()
+        )
+
+    @property
+    def methods(self) -> List[str]:
+        """Method names by ``method_id``."""
+        return [m["name"] for m in self._methods]
+
+    def method_ids(self, names: Iterable[str] = (), prefix: Optional[str] = None) -> List[int]:
+        """Ids of the given method names (unknown names are ignored) and/or of names starting with *prefix*."""
+        ids = {self._ids[n] for n in names if n in self._ids}
+        if prefix is not None:
+            ids.update(i for i, m in enumerate(self._methods) if m["name"].startswith(prefix))
+        return sorted(ids)
+
+    def __len__(self) -> int:
+        return self._length
+
+    # -- writing --------------------------------------------------------------
+    def _method_ids_for(self, names: Sequence[str], units: Sequence[Any], decimals: Sequence[Any]) -> np.ndarray:
+        added = False
+        codes = np.empty(len(names), dtype=COLUMNS["method_id"])
+        for i, name in enumerate(names):
+            mid = self._ids.get(name)
+            if mid is None:
+                mid = self._ids[name] = len(self._methods)
+                self._methods.append({"name": name, "unit": str(units[i]), "decimals": int(decimals[i])})
+                added = True
+            codes[i] = mid
+        if added:
+            self._write_meta()
+        return codes
+
+    def append(
+        self,
+        method_names: Sequence[str],
+        v1: Any,
+        v2: Any,
+        result: BulkResult,
+        timestamp: Optional[Any] = None,
+    ) -> int:
+        """Append the rows of a :func:`core.calc_tolerance_bulk` result.
+
+        *timestamp* is a scalar or one value per row (default: now). Returns
+        the number of rows written.
+        """
+        if self.mode != "a":
+            raise ValueError("Result store is open read-only")
+        n = len(result)
+        if n == 0:
+            return 0
+        # Factorise names first so new methods are registered once per call.
+        uniq: Dict[str, int] = {}
+        inverse = np.fromiter((uniq.setdefault(nm, len(uniq)) for nm in method_names), dtype=np.intp, count=n)
+        row_of = np.empty(len(uniq), dtype=np.intp)
+        row_of[inverse] = np.arange(n)  # any row of each name: unit / decimals are per method
+        ids = self._method_ids_for(list(uniq), result.unit[row_of], result.decimals[row_of])[inverse]
+
+        flags = (
+            result.r_pass.astype(np.uint8) * FLAG_REPEATABILITY
+            | result.R_pass.astype(np.uint8) * FLAG_REPRODUCIBILITY
+            | result.tolerance_pass.astype(np.uint8) * FLAG_TOLERANCE
+        )
+        when = time.time() if timestamp is None else timestamp
+        columns = {
+            "timestamp": np.broadcast_to(np.asarray(when, dtype=np.float64), (n,)),
+            "method_id": ids,
+            "v1": v1,
+            "v2": v2,
+            "avg": result.avg,
+            "diff": result.diff,
+            "r": result.r,
+            "R": result.R,
+            "tolerance_075R": result.tolerance_075R,
+            "status": result.status,
+            "flags": flags,
+        }
+        for name, dtype in COLUMNS.items():
+            data = np.ascontiguousarray(columns[name], dtype=dtype)
+            if data.shape != (n,):
+                raise ValueError(f"Column {name!r} has shape {data.shape}, expected ({n},)")
+            self._files[name].write(data.tobytes())
+        self._length += n
+        self._maps.clear()
+        return n
+
+    def append_rows(
+        self,
+        methods: Mapping[str, Method],
+        method_names: Sequence[str],
+        v1: Any,
+        v2: Any,
+        timestamp: Optional[Any] = None,
+    ) -> int:
+        """Evaluate ``(method, v1, v2)`` columns and append the results."""
+        from core.batch import calc_tolerance_bulk
+
+        names = list(method_names)
+        v1 = np.asarray(v1, dtype=np.float64)
+        v2 = np.asarray(v2, dtype=np.float64)
+        return self.append(names, v1, v2, calc_tolerance_bulk(methods, names, v1, v2), timestamp)
+
+    def flush(self) -> None:
+        for f in self._files.values():
+            f.flush()
+
+    # -- reading --------------------------------------------------------------
+    def refresh(self) -> int:
+        """Pick up rows appended by another process; return the row count."""
+        if self.mode == "r":
+            try:
+                with open(self.path / _META, encoding="utf-8") as f:
+                    self._methods = json.load(f)["methods"]
+            except (OSError, ValueError, KeyError) as exc:
+                logger.warning("Could not reread %s: %s", self.path / _META, exc)
+            self._ids = {m["name"]: i for i, m in enumerate(self._methods)}
+            self._length = self._stored_length()
+            self._maps.clear()
+        return self._length
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only, memory-mapped view of column *name* (no copy)."""
+        array = self._maps.get(name)
+        if array is None:
+            dtype = COLUMNS[name]
+            if self.mode == "a":
+                self.flush()
+            if self._length == 0:
+                array = np.empty(0, dtype=dtype)
+            else:
+                array = np.memmap(_column_file(self.path, name), dtype=dtype, mode="r", shape=(self._length,))
+            self._maps[name] = array
+        return array
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.column(name)
+
+    def select(
+        self,
+        method: str | Sequence[str] | None = None,
+        method_prefix: Optional[str] = None,
+        since: Optional[TimeLike] = None,
+        until: Optional[TimeLike] = None,
+        r_pass: Optional[bool] = None,
+        R_pass: Optional[bool] = None,
+        tolerance_pass: Optional[bool] = None,
+        status: Optional[int] = None,
+    ) -> np.ndarray:
+        """Return the indices of rows matching every given filter.
+
+        *method* takes exact names, *method_prefix* a name prefix (``"D5453"``
+        matches every D5453 variant); *since* is inclusive, *until*
+        exclusive. Pass filters consider rows with status ``ok`` only, so
+        ``R_pass=False`` finds real reproducibility failures::
+
+            march = store.select(method_prefix="D5453", R_pass=False,
+                                 since=datetime(2026, 3, 1), until=datetime(2026, 4, 1))
+        """
+        mask = np.ones(self._length, dtype=bool)
+        if method is not None or method_prefix is not None:
+            names = [method] if isinstance(method, str) else list(method or ())
+            ids = self.method_ids(names, method_prefix)
+            mask &= np.isin(self.column("method_id"), np.asarray(ids, dtype=COLUMNS["method_id"]))
+        if since is not None or until is not None:
+            ts = self.column("timestamp")
+            if since is not None:
+                mask &= ts >= _seconds(since)
+            if until is not None:
+                mask &= ts < _seconds(until)
+        if status is not None:
+            mask &= self.column("status") == status
+        wanted = {"r_pass": r_pass, "R_pass": R_pass, "tolerance_pass": tolerance_pass}
+        if any(v is not None for v in wanted.values()):
+            if status is None:
+                mask &= self.column("status") == STATUS_OK
+            flags = self.column("flags")
+            for key, value in wanted.items():
+                if value is not None:
+                    mask &= ((flags & _PASS_FLAGS[key]) != 0) == value
+        return np.flatnonzero(mask)
+
+    def rows(self, indices: Optional[Any] = None) -> List[Dict[str, Any]]:
+        """Rows as dictionaries (method name, unit, pass flags and status label)."""
+        idx = np.arange(self._length) if indices is None else np.asarray(indices, dtype=np.intp)
+        cols = {name: self.column(name)[idx].tolist() for name in COLUMNS}
+        out = []
+        for i in range(len(idx)):
+            method = self._methods[cols["method_id"][i]]
+            flags = cols["flags"][i]
+            out.append({
+                "timestamp": cols["timestamp"][i],
+                "method_name": method["name"],
+                "unit": method["unit"],
+                "decimals": method["decimals"],
+                **{name: cols[name][i] for name in ("v1", "v2", "avg", "diff", "r", "R", "tolerance_075R")},
+                **{key: bool(flags & bit) for key, bit in _PASS_FLAGS.items()},
+                "status": STATUS_LABELS[cols["status"][i]],
+            })
+        return out
+
+    # -- Arrow / Parquet ------------------------------------------------------
+    def to_arrow(self, indices: Optional[Any] = None):
+        """Return the rows (all, or *indices*) as a :class:`pyarrow.Table`.
+
+        The method column is dictionary-encoded with the store's method
+        table; without *indices* the numeric columns are wrapped zero-copy.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("to_arrow / write_parquet need pyarrow (pip install pyarrow)") from None
+        take = (lambda a: a) if indices is None else (lambda a: a[np.asarray(indices, dtype=np.intp)])
+        arrays = {"timestamp": pa.array(take(self.column("timestamp")))}
+        arrays["method"] = pa.DictionaryArray.from_arrays(
+            pa.array(take(self.column("method_id")).astype(np.int32)), pa.array(self.methods, pa.string())
+        )
+        for name in ("v1", "v2", "avg", "diff", "r", "R", "tolerance_075R", "status"):
+            arrays[name] = pa.array(take(self.column(name)))
+        flags = take(self.column("flags"))
+        for key, bit in _PASS_FLAGS.items():
+            arrays[key] = pa.array((flags & bit) != 0)
+        return pa.table(arrays)
+
+    def write_parquet(self, out_path: str | Path, indices: Optional[Any] = None) -> None:
+        """Write the rows (all, or *indices*) to a Parquet file."""
+        table = self.to_arrow(indices)
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, str(out_path))
+
+    # -- lifecycle ------------------------------------------------------------
+    def close(self) -> None:
+        self._maps.clear()
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
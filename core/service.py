@@ -0,0 +1,372 @@
+# HTTP/JSON calculation service for Method Precision Calculator
+
+"""Serve the precision check to other lab systems (LIMS, instrument middleware).
+
+``PrecisionService`` is a plain ASGI application – no web framework needed –
+that any ASGI server can run, e.g.::
+
+    python -m core.service --port 8000 --workers 4
+    uvicorn core.service:app --workers 4          # equivalent
+
+Endpoints:
+
+``GET /health``
+    ``{"status": "ok", "methods": <count>}``.
+``GET /methods``
+    ``{"methods": [<name>, ...]}``.
+``POST /check``
+    Body ``{"method": "D93-20 A", "v1": 60, "v2": 61}``; responds with the
+    :func:`core.calc_tolerance` result. Unknown methods give 404, values
+    outside the method's limits or non-numbers give 422.
+``POST /check/batch``
+    Body ``{"pairs": [{"method": ..., "v1": ..., "v2": ...}, ...]}`` (pairs
+    may also be ``[method, v1, v2]`` lists; with a top-level ``"method"``
+    they may be ``{"v1", "v2"}`` objects or ``[v1, v2]`` lists). The result
+    is streamed chunk by chunk as JSON Lines with the columns of
+    :data:`core.stream.OUTPUT_COLUMNS`, or as CSV when the request sends
+    ``Accept: text/csv``. Problems with single rows are reported in their
+    ``Status`` column, as in the CLI. If the server fails mid-stream, a JSON
+    Lines response ends with an ``{"error": ..., "pairs_sent": n}`` record
+    and the connection is aborted rather than completed.
+
+Each worker process loads the method registry once (at ASGI lifespan
+startup, or on the first request) through :func:`core.registry.get_registry`,
+so edits to the CSV are still picked up without a restart. A batch is
+evaluated against one catalog snapshot; large batches are evaluated in a
+thread so the event loop keeps serving small requests.
+
+It provides:
+* ``PrecisionService`` / ``create_app`` – the ASGI application.
+* ``app`` – the application for ``$MPC_METHODS_FILE`` (default
+  ``methods_enriched.csv``), for ``uvicorn core.service:app``.
+* ``main`` – command-line runner (needs ``uvicorn``).
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import math
+import os
+import sys
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from core import Method, calc_tolerance, configure_logging, logger
+from core.stream import OUTPUT_COLUMNS, evaluate_chunk, json_row
+
+DEFAULT_METHODS_FILE = "methods_enriched.csv"
+METHODS_FILE_ENV = "MPC_METHODS_FILE"
+
+# Pairs evaluated (and streamed) per chunk of a batch response.
+BATCH_CHUNK_SIZE = 5_000
+
+# Largest accepted request body.
+MAX_BODY_BYTES = 64 * 2**20
+
+Row = Tuple[str, str, str]
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+_JSON = b"application/json"
+_NDJSON = b"application/x-ndjson"
+_CSV = b"text/csv; charset=utf-8"
+
+# ``json.dumps`` with options builds a new encoder per call; reuse one.
+_encode_json = json.JSONEncoder(ensure_ascii=False, check_circular=False).encode
+
+
+class HTTPError(Exception):
+    """Request error reported to the client as ``{"error": message}``."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ---------------------------------------------------------------------------
+# Request parsing
+# ---------------------------------------------------------------------------
+def _text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def _number(payload: Mapping[str, Any], key: str) -> float:
+    value = payload.get(key)
+    if isinstance(value, bool):
+        value = None
+    try:
+        number = float(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        raise HTTPError(422, f"{key!r} must be a number") from None
+    if not math.isfinite(number):
+        raise HTTPError(422, f"{key!r} must be finite")
+    return number
+
+
+def parse_pairs(payload: Any) -> List[Row]:
+    """Return the ``(method, v1, v2)`` rows of a ``/check/batch`` body.
+
+    Raises :class:`HTTPError` (400) for a malformed body; values are kept as
+    text and checked per row by :func:`core.stream.evaluate_chunk`.
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("pairs"), list):
+        raise HTTPError(400, 'Body must be an object with a "pairs" list')
+    default = payload.get("method")
+    if default is not None and not isinstance(default, str):
+        raise HTTPError(400, '"method" must be a string')
+    rows: List[Row] = []
+    for i, pair in enumerate(payload["pairs"]):
+        if isinstance(pair, dict):
+            pair = {str(k).lower(): v for k, v in pair.items()}
+            name = pair.get("method", default)
+            rows.append((_text(name), _text(pair.get("v1")), _text(pair.get("v2"))))
+        elif isinstance(pair, list) and len(pair) == 3:
+            rows.append((_text(pair[0]), _text(pair[1]), _text(pair[2])))
+        elif isinstance(pair, list) and len(pair) == 2 and default is not None:
+            rows.append((default, _text(pair[0]), _text(pair[1])))
+        else:
+            raise HTTPError(400, f"pairs[{i}] must be an object or a [method, v1, v2] list")
+    return rows
+
+
+def _finite_or_none(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace NaN / ±inf (not valid JSON) by ``None``."""
+    return {k: (None if isinstance(v, float) and not math.isfinite(v) else v) for k, v in result.items()}
+
+
+# ---------------------------------------------------------------------------
+# Response encoding
+# ---------------------------------------------------------------------------
+def encode_chunk(methods: Mapping[str, Method], rows: Sequence[Row], as_csv: bool = False) -> bytes:
+    """Evaluate *rows* and encode them as JSON Lines (or CSV rows, no header)."""
+    out = evaluate_chunk(methods, rows)
+    if as_csv:
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator="\n").writerows(out)
+        return buf.getvalue().encode("utf-8")
+    return "".join(_encode_json(json_row(row)) + "\n" for row in out).encode("utf-8")
+
+
+def _csv_header() -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerow(OUTPUT_COLUMNS)
+    return buf.getvalue().encode("utf-8")
+
+
+async def _send_json(send: Send, status: int, payload: Any) -> None:
+    body = _encode_json(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", _JSON), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+# ---------------------------------------------------------------------------
+# Application
+# ---------------------------------------------------------------------------
+class PrecisionService:
+    """ASGI application serving :func:`core.calc_tolerance` over HTTP/JSON."""
+
+    def __init__(
+        self,
+        methods_file: str = DEFAULT_METHODS_FILE,
+        chunk_size: int = BATCH_CHUNK_SIZE,
+        max_body_bytes: int = MAX_BODY_BYTES,
+    ) -> None:
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        self.methods_file = methods_file
+        self.chunk_size = chunk_size
+        self.max_body_bytes = max_body_bytes
+        self._registry = None
+        self._routes: Dict[str, Tuple[str, Callable[..., Awaitable[None]]]] = {
+            "/health": ("GET", self._health),
+            "/methods": ("GET", self._methods),
+            "/check": ("POST", self._check),
+            "/check/batch": ("POST", self._batch),
+        }
+
+    @property
+    def registry(self):
+        """The worker's shared :class:`core.registry.MethodRegistry` (loaded on first use)."""
+        if self._registry is None:
+            from core.registry import get_registry
+
+            self._registry = get_registry(self.methods_file)
+        return self._registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        route = self._routes.get(scope["path"].rstrip("/") or "/")
+        started = False
+
+        async def tracked_send(message: Dict[str, Any]) -> None:
+            nonlocal started
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            if route is None:
+                raise HTTPError(404, f"No endpoint {scope['path']}")
+            verb, handler = route
+            if scope["method"] != verb:
+                raise HTTPError(405, f"{scope['path']} only accepts {verb}")
+            await handler(scope, receive, tracked_send)
+        except Exception as exc:
+            if started:
+                # Too late for an error status: let the server abort the
+                # connection so the client cannot mistake a cut-off stream
+                # for a complete response.
+                raise
+            if isinstance(exc, HTTPError):
+                await _send_json(send, exc.status, {"error": exc.message})
+            else:
+                logger.exception("Request %s %s failed", scope.get("method"), scope.get("path"))
+                await _send_json(send, 500, {"error": "Internal server error"})
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    registry = self.registry
+                except Exception as exc:
+                    await send({"type": "lifespan.startup.failed", "message": str(exc)})
+                    return
+                logger.info("Serving %d methods from %s", len(registry), self.methods_file)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _read_json(self, receive: Receive) -> Any:
+        parts: List[bytes] = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise HTTPError(400, "Client disconnected")
+            body = message.get("body", b"")
+            size += len(body)
+            if size > self.max_body_bytes:
+                raise HTTPError(413, f"Body exceeds {self.max_body_bytes} bytes")
+            parts.append(body)
+            if not message.get("more_body", False):
+                break
+        try:
+            return json.loads(b"".join(parts))
+        except ValueError as exc:
+            raise HTTPError(400, f"Invalid JSON: {exc}") from None
+
+    # -- endpoints ------------------------------------------------------------
+    async def _health(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await _send_json(send, 200, {"status": "ok", "methods": len(self.registry)})
+
+    async def _methods(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await _send_json(send, 200, {"methods": self.registry.names()})
+
+    async def _check(self, scope: Scope, receive: Receive, send: Send) -> None:
+        payload = await self._read_json(receive)
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        name = payload.get("method")
+        method = self.registry.get(name) if isinstance(name, str) else None
+        if method is None:
+            raise HTTPError(404, f"Unknown method {name!r}")
+        v1, v2 = _number(payload, "v1"), _number(payload, "v2")
+        try:
+            result = calc_tolerance(method, v1, v2)
+        except ValueError as exc:
+            raise HTTPError(422, str(exc)) from None
+        await _send_json(send, 200, _finite_or_none(result))
+
+    async def _batch(self, scope: Scope, receive: Receive, send: Send) -> None:
+        rows = parse_pairs(await self._read_json(receive))
+        accept = dict(scope.get("headers") or []).get(b"accept", b"")
+        as_csv = b"text/csv" in accept
+        methods = self.registry.methods  # one catalog snapshot for the whole batch
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", _CSV if as_csv else _NDJSON)],
+        })
+        if as_csv:
+            await send({"type": "http.response.body", "body": _csv_header(), "more_body": True})
+        size = self.chunk_size
+        offload = len(rows) > size
+        start = 0
+        try:
+            for start in range(0, len(rows), size):
+                chunk = rows[start:start + size]
+                if offload:
+                    body = await asyncio.to_thread(encode_chunk, methods, chunk, as_csv)
+                else:
+                    body = encode_chunk(methods, chunk, as_csv)
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+        except Exception:
+            # The status line is already sent: end JSON Lines with an error
+            # record, then re-raise so the server aborts the connection
+            # instead of completing the response normally.
+            logger.exception("Batch response failed after %d of %d pairs", start, len(rows))
+            if not as_csv:
+                error = {"error": "Internal server error", "pairs_sent": start}
+                await send({"type": "http.response.body", "body": json.dumps(error).encode() + b"\n",
+                            "more_body": True})
+            raise
+        await send({"type": "http.response.body", "body": b""})
+
+
+def create_app(methods_file: Optional[str] = None, **options: Any) -> PrecisionService:
+    """Return a :class:`PrecisionService` for *methods_file*.
+
+    Without *methods_file* the ``MPC_METHODS_FILE`` environment variable (or
+    ``methods_enriched.csv``) is used.
+    """
+    if methods_file is None:
+        methods_file = os.environ.get(METHODS_FILE_ENV, DEFAULT_METHODS_FILE)
+    return PrecisionService(methods_file, **options)
+
+
+# Nothing is loaded until the server sends lifespan startup or a request.
+app = create_app()
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m core.service",
+        description="Serve the r / R / 0.75R precision check over HTTP/JSON.",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="port (default: 8000)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default: 1)")
+    parser.add_argument("--methods-file", default=os.environ.get(METHODS_FILE_ENV, DEFAULT_METHODS_FILE),
+                        help="method registry CSV")
+    args = parser.parse_args(argv)
+    configure_logging()
+    try:
+        import uvicorn
+    except ImportError:
+        print("error: the service needs an ASGI server – pip install uvicorn", file=sys.stderr)
+        return 2
+    # Workers import ``core.service:app`` themselves and read the file from the environment.
+    os.environ[METHODS_FILE_ENV] = os.path.abspath(args.methods_file)
+    uvicorn.run("core.service:app", host=args.host, port=args.port, workers=max(1, args.workers),
+                log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
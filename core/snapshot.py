@@ -0,0 +1,128 @@
+# Persistent method-registry snapshots for Method Precision Calculator
+
+"""Skip CSV parsing on repeat loads with a binary snapshot of the registry.
+
+``load_methods_cached`` stores the parsed methods in a pickle next to the CSV
+(``methods.csv`` → ``.methods.csv.snapshot``). The snapshot records the CSV's
+resolved path, size, ``mtime_ns`` and SHA-256 plus the format it was built
+with (``core.PARSER_VERSION`` and the fields of ``Method``); it is reused when
+format, size and mtime match, or when only the mtime changed but the content
+hash still matches. Anything else rebuilds it from the CSV.
+
+Only plain field values are pickled (never code objects); ``Method`` instances
+are rebuilt on load, which re-attaches the compiled formula evaluators.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from dataclasses import fields
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from core import PARSER_VERSION, Method, load_methods, logger
+
+SNAPSHOT_VERSION = 2
+
+# Constructor fields of Method, in declaration order (display_label and the
+# compiled evaluators are derived in __post_init__).
+_FIELDS = tuple(f.name for f in fields(Method) if f.init and f.name != "display_label")
+
+# Part of the snapshot key: rows written by another parser version or for a
+# different Method layout are never reused, even if the CSV is unchanged.
+_FORMAT = hashlib.sha256(repr((
+    PARSER_VERSION, [(f.name, str(f.type)) for f in fields(Method) if f.init],
+)).encode()).hexdigest()[:16]
+
+
+def snapshot_path_for(csv_path: str | Path) -> Path:
+    """Return the default snapshot location for *csv_path*."""
+    path = Path(csv_path)
+    return path.with_name(f".{path.name}.snapshot")
+
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_snapshot(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with path.open("rb") as f:
+            data = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as exc:
+        logger.warning("Ignoring unreadable method snapshot %s: %s", path, exc)
+        return None
+    if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+        return None
+    return data
+
+
+def _write_snapshot(path: Path, data: Dict[str, Any]) -> None:
+    """Write *data* atomically; failures (e.g. read-only dirs) are logged only."""
+    try:
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError as exc:
+        logger.warning("Could not write method snapshot %s: %s", path, exc)
+
+
+def _to_rows(methods: Dict[str, Method]) -> Tuple[tuple, ...]:
+    return tuple(tuple(getattr(m, name) for name in _FIELDS) for m in methods.values())
+
+
+def _from_rows(rows: Tuple[tuple, ...]) -> Dict[str, Method]:
+    methods: Dict[str, Method] = {}
+    for row in rows:
+        method = Method(**dict(zip(_FIELDS, row)))
+        methods[method.name] = method
+    return methods
+
+
+def load_methods_cached(
+    csv_path: str | Path,
+    snapshot_path: Optional[str | Path] = None,
+) -> Dict[str, Method]:
+    """Return the same mapping as :func:`core.load_methods`, using a snapshot.
+
+    A missing or stale snapshot is rebuilt from the CSV automatically.
+    """
+
+    path = Path(csv_path)
+    if not path.is_file():
+        raise IOError(f"CSV file not found: {path}")
+    snap = Path(snapshot_path) if snapshot_path is not None else snapshot_path_for(path)
+    st = path.stat()
+    key = {"format": _FORMAT, "path": str(path.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    data = _read_snapshot(snap)
+    if data is not None and data["key"] == key:
+        return _from_rows(data["rows"])
+
+    digest = _file_hash(path)
+    same_format = data is not None and data["key"]["format"] == _FORMAT
+    if same_format and data["key"]["size"] == key["size"] and data["sha256"] == digest:
+        # Touched or copied but unchanged – refresh the key, keep the rows.
+        _write_snapshot(snap, {**data, "key": key})
+        return _from_rows(data["rows"])
+
+    methods = load_methods(path)
+    _write_snapshot(snap, {
+        "version": SNAPSHOT_VERSION,
+        "key": key,
+        "sha256": digest,
+        "rows": _to_rows(methods),
+    })
+    return methods
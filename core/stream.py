@@ -0,0 +1,295 @@
+# Streaming CSV evaluation for Method Precision Calculator
+
+"""Evaluate LIMS duplicate-result exports of any size with bounded memory.
+
+The input is read in fixed-size chunks of rows, each chunk is evaluated with
+:func:`core.batch.calc_tolerance_bulk` and the results are appended to the
+output CSV before the next chunk is read. Memory use therefore depends on
+``chunk_size`` only, not on the size of the file.
+
+It provides:
+* ``OUTPUT_COLUMNS`` – header of the result CSV.
+* ``evaluate_chunk`` – evaluate parsed rows and return formatted output rows
+  (``evaluate_rows`` and ``format_rows`` are its two halves).
+* ``json_row`` – an output row as a dictionary with typed values.
+* ``iter_rows`` – ``(method, v1, v2)`` cells of parsed CSV rows; short rows
+  are padded so they are reported rather than dropped.
+* ``evaluate_stream`` – stream between two open text files, optionally
+  appending every chunk to a :class:`core.results.ResultStore` and reporting
+  progress after each chunk.
+* ``evaluate_csv_file`` – path-based convenience wrapper.
+* ``StreamStats`` – rows, throughput and peak RSS of a run.
+"""
+
+import csv
+import itertools
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+
+from core import Method, logger
+from core.batch import STATUS_LABELS, STATUS_OK, BulkResult, calc_tolerance_bulk
+from core.results import ResultStore
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Input column names – they match the History export of the web app.
+DEFAULT_COLUMNS = ("Method", "V1", "V2")
+
+OUTPUT_COLUMNS = [
+    "Method", "V1", "V2", "Unit", "Avg", "|Diff|", "r", "R", "0.75R",
+    "r_pass", "R_pass", "0.75R_pass", "Status",
+]
+
+# Output columns holding numbers / PASS-FAIL flags (typed in JSON output).
+_NUMERIC_COLUMNS = {"V1", "V2", "Avg", "|Diff|", "r", "R", "0.75R"}
+_FLAG_COLUMNS = {"r_pass", "R_pass", "0.75R_pass"}
+
+
+@dataclass
+class StreamStats:
+    """Summary of a streaming run."""
+
+    rows: int
+    chunks: int
+    seconds: float
+    peak_rss_bytes: Optional[int]
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        rss = f"{self.peak_rss_bytes / 2**20:.1f} MiB" if self.peak_rss_bytes is not None else "n/a"
+        return (
+            f"{self.rows} rows in {self.chunks} chunks, {self.seconds:.2f} s "
+            f"({self.rows_per_sec:,.0f} rows/s), peak RSS {rss}"
+        )
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Return the peak resident set size of this process, if measurable."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# ---------------------------------------------------------------------------
+# Chunk evaluation
+# ---------------------------------------------------------------------------
+def _to_float(text: str) -> float:
+    try:
+        return float(text)
+    except ValueError:
+        return float("nan")
+
+
+def _fmt(value: float, decimals: int) -> str:
+    if decimals < 0 or value != value:  # unknown method or NaN
+        return ""
+    return f"{value:.{decimals}f}"
+
+
+def evaluate_rows(
+    methods: Mapping[str, Method],
+    rows: Sequence[Tuple[str, str, str]],
+) -> Tuple[List[str], np.ndarray, np.ndarray, BulkResult]:
+    """Parse ``(method_name, v1_text, v2_text)`` rows and evaluate them.
+
+    Returns the stripped method names, the parsed values (``NaN`` where not a
+    number) and the :class:`core.batch.BulkResult`.
+    """
+    names = [name.strip() for name, _, _ in rows]
+    v1 = np.fromiter((_to_float(a) for _, a, _ in rows), dtype=np.float64, count=len(rows))
+    v2 = np.fromiter((_to_float(b) for _, _, b in rows), dtype=np.float64, count=len(rows))
+    return names, v1, v2, calc_tolerance_bulk(methods, names, v1, v2)
+
+
+def format_rows(
+    rows: Sequence[Tuple[str, str, str]],
+    names: Sequence[str],
+    res: BulkResult,
+) -> List[List[str]]:
+    """Format an :func:`evaluate_rows` result as ``OUTPUT_COLUMNS`` rows."""
+    # Convert once to Python lists – indexing NumPy scalars per cell is slow.
+    cols = zip(
+        names, (a for _, a, _ in rows), (b for _, _, b in rows), res.unit.tolist(),
+        res.decimals.tolist(), res.status.tolist(),
+        res.avg.tolist(), res.diff.tolist(), res.r.tolist(), res.R.tolist(), res.tolerance_075R.tolist(),
+        res.r_pass.tolist(), res.R_pass.tolist(), res.tolerance_pass.tolist(),
+    )
+    out: List[List[str]] = []
+    for name, raw1, raw2, unit, dec, status, avg, diff, r, R, t075, r_ok, R_ok, t_ok in cols:
+        ok = status == STATUS_OK
+        out.append([
+            name, raw1.strip(), raw2.strip(), unit,
+            _fmt(avg, dec), _fmt(diff, dec), _fmt(r, dec), _fmt(R, dec), _fmt(t075, dec),
+            ("PASS" if r_ok else "FAIL") if ok else "",
+            ("PASS" if R_ok else "FAIL") if ok else "",
+            ("PASS" if t_ok else "FAIL") if ok else "",
+            STATUS_LABELS[status],
+        ])
+    return out
+
+
+def evaluate_chunk(
+    methods: Mapping[str, Method],
+    rows: Sequence[Tuple[str, str, str]],
+) -> List[List[str]]:
+    """Evaluate ``(method_name, v1_text, v2_text)`` rows and format the output.
+
+    Numbers are rounded to each method's ``decimals``; pass flags are
+    ``PASS``/``FAIL`` for valid rows and empty otherwise.
+    """
+
+    if not rows:
+        return []
+    names, _, _, res = evaluate_rows(methods, rows)
+    return format_rows(rows, names, res)
+
+
+def _typed(column: str, value: str) -> Any:
+    if value == "":
+        return None
+    if column in _NUMERIC_COLUMNS:
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    if column in _FLAG_COLUMNS:
+        return value == "PASS"
+    return value
+
+
+def json_row(row: Sequence[str]) -> Dict[str, Any]:
+    """Return an :func:`evaluate_chunk` row keyed by ``OUTPUT_COLUMNS``.
+
+    Numbers become floats, pass flags booleans and empty cells ``None``.
+    """
+    return {c: _typed(c, v) for c, v in zip(OUTPUT_COLUMNS, row)}
+
+
+def _column_indices(
+    header: Sequence[str],
+    columns: Sequence[str],
+    optional: Sequence[str] = (),
+) -> List[Optional[int]]:
+    """Indices of *columns* (required) then *optional* (``None`` if absent) in *header*."""
+    lookup = {h.strip().lower(): i for i, h in enumerate(header)}
+    try:
+        required = [lookup[c.lower()] for c in columns]
+    except KeyError as exc:
+        raise ValueError(f"Input is missing column {exc.args[0]!r}; header is {list(header)}") from None
+    return required + [lookup.get(c.lower()) for c in optional]
+
+
+def iter_rows(
+    reader: Iterable[Sequence[str]],
+    indices: Sequence[int],
+) -> Iterator[Tuple[str, str, str]]:
+    """Yield the ``(method, v1, v2)`` cells at *indices* of each CSV row.
+
+    Blank rows are skipped. Cells missing from a short row are read as empty,
+    so the row is reported as an invalid value instead of being dropped.
+    """
+    i_name, i_v1, i_v2 = indices
+    width = max(indices) + 1
+    for r in reader:
+        if len(r) < width:
+            if not any(cell.strip() for cell in r):
+                continue
+            r = list(r) + [""] * (width - len(r))
+        yield r[i_name], r[i_v1], r[i_v2]
+
+
+def iter_row_chunks(
+    reader: Iterable[Sequence[str]],
+    indices: Sequence[int],
+    chunk_size: int,
+) -> Iterable[List[Tuple[str, str, str]]]:
+    """Yield lists of at most *chunk_size* ``(method, v1, v2)`` tuples."""
+    rows = iter_rows(reader, indices)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ---------------------------------------------------------------------------
+# Streaming drivers
+# ---------------------------------------------------------------------------
+def evaluate_stream(
+    in_file: TextIO,
+    out_file: TextIO,
+    methods: Mapping[str, Method],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    columns: Sequence[str] = DEFAULT_COLUMNS,
+    write_header: bool = True,
+    store: Optional[ResultStore] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> StreamStats:
+    """Stream CSV rows from *in_file* to result rows in *out_file*.
+
+    *columns* names the method, value-1 and value-2 columns of the input header
+    (case-insensitive). Blank rows are skipped; short rows are evaluated with
+    their missing cells empty (see :func:`iter_rows`). Each chunk
+    is also appended to *store* (a :class:`core.results.ResultStore` open for
+    appending), and *progress* is called with the number of rows done.
+    """
+
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+    start = time.perf_counter()
+    reader = csv.reader(in_file)
+    header = next(reader, None)
+    if header is None:
+        raise ValueError("Input CSV is empty")
+    indices = _column_indices(header, columns)
+
+    writer = csv.writer(out_file, lineterminator="\n")
+    if write_header:
+        writer.writerow(OUTPUT_COLUMNS)
+
+    total = chunks = 0
+    for chunk in iter_row_chunks(reader, indices, chunk_size):
+        names, v1, v2, res = evaluate_rows(methods, chunk)
+        writer.writerows(format_rows(chunk, names, res))
+        if store is not None:
+            store.append(names, v1, v2, res)
+        total += len(chunk)
+        chunks += 1
+        if progress is not None:
+            progress(total)
+
+    stats = StreamStats(
+        rows=total,
+        chunks=chunks,
+        seconds=time.perf_counter() - start,
+        peak_rss_bytes=peak_rss_bytes(),
+    )
+    logger.info("Streaming evaluation finished: %s", stats.summary())
+    return stats
+
+
+def evaluate_csv_file(
+    input_path: str | Path,
+    output_path: str | Path,
+    methods: Mapping[str, Method],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    columns: Sequence[str] = DEFAULT_COLUMNS,
+    encoding: str = "utf-8",
+) -> StreamStats:
+    """Path-based wrapper around :func:`evaluate_stream`."""
+
+    with open(input_path, "r", encoding=encoding, newline="") as fin, \
+            open(output_path, "w", encoding="utf-8", newline="") as fout:
+        return evaluate_stream(fin, fout, methods, chunk_size=chunk_size, columns=columns)
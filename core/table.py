@@ -0,0 +1,158 @@
+# Columnar method catalog for Method Precision Calculator
+
+"""Store large method catalogs as parallel arrays instead of one object each.
+
+A ``MethodTable`` keeps numeric fields (``r``, ``R``, ``decimals``, ``lower``,
+``upper``) in typed :mod:`array` columns and every string field except
+``name`` as an index into a shared pool of interned strings. Units, matrices,
+scopes and formulas repeat heavily across per-product / per-lab variants, so
+memory per method is a few dozen bytes plus its name.
+
+The table is a read-only ``Mapping[str, Method]``: ``table[name]`` materialises
+a :class:`core.Method` on demand (recently used ones are kept in a small LRU),
+so it can be passed wherever a ``load_methods`` dictionary is expected.
+"""
+
+import math
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from core import Method, load_methods
+
+# String fields stored as pool codes, in Method constructor order.
+_STRING_FIELDS = (
+    "unit", "formula_r", "formula_R", "notes", "year", "matrix", "conc_range", "scope",
+)
+
+MATERIALISED_CACHE_SIZE = 256
+
+
+def _nan_if_none(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+def _none_if_nan(value: float) -> Optional[float]:
+    return None if value != value else value
+
+
+class MethodTable(Mapping):
+    """Immutable columnar catalog of methods keyed by name."""
+
+    def __init__(self, methods: Iterable[Method]) -> None:
+        self._names: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._pool: List[str] = []
+        pool_index: Dict[str, int] = {}
+
+        self.r = array("d")
+        self.R = array("d")
+        self.lower = array("d")
+        self.upper = array("d")
+        self.decimals = array("h")
+        self._codes: Dict[str, array] = {f: array("i") for f in _STRING_FIELDS}
+
+        for m in methods:
+            if m.name in self._index:
+                # Later rows win, as in load_methods.
+                self._overwrite(self._index[m.name], m, pool_index)
+                continue
+            self._index[m.name] = len(self._names)
+            self._names.append(m.name)
+            self.r.append(_nan_if_none(m.r))
+            self.R.append(_nan_if_none(m.R))
+            self.lower.append(_nan_if_none(m.lower))
+            self.upper.append(_nan_if_none(m.upper))
+            self.decimals.append(m.decimals)
+            for f in _STRING_FIELDS:
+                self._codes[f].append(self._intern(getattr(m, f), pool_index))
+
+        self._cache: "OrderedDict[int, Method]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    # -- construction helpers -------------------------------------------------
+    def _intern(self, value: str, pool_index: Dict[str, int]) -> int:
+        code = pool_index.get(value)
+        if code is None:
+            code = pool_index[value] = len(self._pool)
+            self._pool.append(sys.intern(value))
+        return code
+
+    def _overwrite(self, i: int, m: Method, pool_index: Dict[str, int]) -> None:
+        self.r[i] = _nan_if_none(m.r)
+        self.R[i] = _nan_if_none(m.R)
+        self.lower[i] = _nan_if_none(m.lower)
+        self.upper[i] = _nan_if_none(m.upper)
+        self.decimals[i] = m.decimals
+        for f in _STRING_FIELDS:
+            self._codes[f][i] = self._intern(getattr(m, f), pool_index)
+
+    @classmethod
+    def from_csv(cls, csv_path: str | Path) -> "MethodTable":
+        """Build a table from a method CSV (see :func:`core.load_methods`)."""
+        return cls(load_methods(csv_path).values())
+
+    # -- column access ----------------------------------------------------------
+    @property
+    def names(self) -> List[str]:
+        """Method names in catalog order (do not mutate)."""
+        return self._names
+
+    def index_of(self, name: str) -> int:
+        """Return the row index of *name*; raises ``KeyError`` if unknown."""
+        return self._index[name]
+
+    def string_column(self, field: str) -> List[str]:
+        """Return a string column (``unit``, ``matrix``, …) as a list."""
+        pool = self._pool
+        return [pool[c] for c in self._codes[field]]
+
+    def string_at(self, field: str, i: int) -> str:
+        return self._pool[self._codes[field][i]]
+
+    def display_label(self, i: int) -> str:
+        year = self.string_at("year", i)
+        return f"{self._names[i]} ({year})" if year else self._names[i]
+
+    def method_at(self, i: int) -> Method:
+        """Materialise row *i* as a :class:`core.Method`."""
+        with self._cache_lock:
+            cached = self._cache.get(i)
+            if cached is not None:
+                self._cache.move_to_end(i)
+                return cached
+        strings = {f: self._pool[self._codes[f][i]] for f in _STRING_FIELDS}
+        method = Method(
+            name=self._names[i],
+            r=_none_if_nan(self.r[i]),
+            R=_none_if_nan(self.R[i]),
+            decimals=self.decimals[i],
+            lower=_none_if_nan(self.lower[i]),
+            upper=_none_if_nan(self.upper[i]),
+            **strings,
+        )
+        with self._cache_lock:
+            self._cache[i] = method
+            if len(self._cache) > MATERIALISED_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return method
+
+    # -- Mapping interface ----------------------------------------------------
+    def __getitem__(self, name: str) -> Method:
+        return self.method_at(self._index[name])
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __repr__(self) -> str:
+        return f"<MethodTable {len(self)} methods, {len(self._pool)} distinct strings>"
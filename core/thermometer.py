@@ -0,0 +1,491 @@
+# Thermometer agreement checks for Method Precision Calculator
+
+"""Check pairs of calibrated thermometers for a whole calibration session.
+
+Two liquid-in-glass thermometers, with corrections applied, shall agree
+within 0.04 °C (ASTM 6.4.1, the web app's Thermometer Check). Corrections
+come from calibration certificates as tables of temperature vs correction;
+between certificate points the correction is interpolated linearly, and
+readings outside a certificate's range are not extrapolated but reported as
+out of range.
+
+A correction table CSV has one row per certificate point::
+
+    Thermometer,Temperature,Correction,Certificate
+    T-101,0,0.01,C-2291
+    T-101,20,-0.02,C-2291
+    T-102,20,0.00,C-3310
+
+and a session CSV one row per pair of readings (``Set_Point`` optional)::
+
+    Set_Point,Thermometer_1,Reading_1,Thermometer_2,Reading_2
+    20,T-101,20.03,T-102,20.01
+
+Corrections are interpolated with one :func:`numpy.interp` call per
+thermometer over all of its readings, as the bulk evaluator runs one batch
+per method.
+
+It provides:
+* ``CorrectionTable`` / ``read_correction_tables`` / ``load_correction_tables``
+  – certificate tables.
+* ``interpolate_corrections`` – corrections for arrays of readings.
+* ``AgreementResult`` / ``check_agreement`` – columnar agreement check.
+* ``check_session`` / ``check_session_file`` – the same for a session CSV.
+* ``format_report`` / ``write_report`` – one compact text report.
+* ``main`` – ``python -m core.thermometer``.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+
+from core import configure_logging, logger
+from core.batch import STATUS_INVALID_VALUE, STATUS_OK, STATUS_OUT_OF_RANGE, STATUS_UNKNOWN_METHOD
+from core.batch import STATUS_LABELS as _BULK_STATUS_LABELS
+from core.batch import factorize
+from core.stream import _column_indices, _to_float
+
+# °C, ASTM 6.4.1.
+AGREEMENT_LIMIT = 0.04
+
+# |ΔT| is rounded to this many decimals before the comparison, so that
+# binary floating-point noise cannot flip a pair lying exactly on the limit.
+_DELTA_DECIMALS = 9
+
+STATUS_UNKNOWN_THERMOMETER = STATUS_UNKNOWN_METHOD
+STATUS_LABELS = {**_BULK_STATUS_LABELS, STATUS_UNKNOWN_THERMOMETER: "unknown thermometer"}
+
+TABLE_COLUMNS = ("Thermometer", "Temperature", "Correction")
+SESSION_COLUMNS = ("Thermometer_1", "Reading_1", "Thermometer_2", "Reading_2")
+SET_POINT_COLUMN = "Set_Point"
+
+
+# ---------------------------------------------------------------------------
+# Correction tables
+# ---------------------------------------------------------------------------
+@dataclass(frozen=True)
+class CorrectionTable:
+    """Certificate corrections of one thermometer, sorted by temperature."""
+
+    thermometer: str
+    temperature: np.ndarray
+    correction: np.ndarray
+    certificate: str = ""
+
+    def __post_init__(self) -> None:
+        temperature = np.asarray(self.temperature, dtype=np.float64)
+        correction = np.asarray(self.correction, dtype=np.float64)
+        if temperature.ndim != 1 or temperature.shape != correction.shape or not len(temperature):
+            raise ValueError(f"Correction table of {self.thermometer!r} needs matching, non-empty 1-D columns")
+        if not (np.isfinite(temperature).all() and np.isfinite(correction).all()):
+            raise ValueError(f"Correction table of {self.thermometer!r} has non-numeric points")
+        order = np.argsort(temperature, kind="stable")
+        temperature, correction = temperature[order], correction[order]
+        if (np.diff(temperature) == 0).any():
+            raise ValueError(f"Correction table of {self.thermometer!r} lists a temperature twice")
+        object.__setattr__(self, "temperature", temperature)
+        object.__setattr__(self, "correction", correction)
+
+    @property
+    def low(self) -> float:
+        return float(self.temperature[0])
+
+    @property
+    def high(self) -> float:
+        return float(self.temperature[-1])
+
+    def correction_at(self, readings: Any) -> np.ndarray:
+        """Interpolated corrections; ``NaN`` outside ``low``–``high``."""
+        values = np.asarray(readings, dtype=np.float64)
+        out = np.interp(values, self.temperature, self.correction)
+        out[(values < self.temperature[0]) | (values > self.temperature[-1])] = np.nan
+        return out
+
+
+def _number(text: str, line: int, column: str) -> float:
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"Line {line}: {column} {text!r} is not a number") from None
+
+
+def read_correction_tables(in_file: TextIO) -> Dict[str, CorrectionTable]:
+    """Read a correction table CSV (see the module docstring) from *in_file*.
+
+    Columns are matched case-insensitively; ``Certificate`` is optional.
+    Raises ``ValueError`` for missing columns, short rows, non-numeric points
+    or a temperature listed twice for one thermometer.
+    """
+
+    reader = csv.reader(in_file)
+    header = next(reader, None)
+    if header is None:
+        raise ValueError("Correction table CSV is empty")
+    i_name, i_temp, i_corr, i_cert = _column_indices(header, TABLE_COLUMNS, ("Certificate",))
+    width = max(i for i in (i_name, i_temp, i_corr, i_cert) if i is not None) + 1
+    points: Dict[str, Tuple[List[float], List[float], str]] = {}
+    for line, row in enumerate(reader, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        if len(row) < width:
+            raise ValueError(f"Line {line}: expected {width} columns, got {len(row)}")
+        name = row[i_name].strip()
+        temps, corrs, cert = points.setdefault(name, ([], [], row[i_cert].strip() if i_cert is not None else ""))
+        temps.append(_number(row[i_temp], line, "Temperature"))
+        corrs.append(_number(row[i_corr], line, "Correction"))
+    return {
+        name: CorrectionTable(name, np.array(temps), np.array(corrs), cert)
+        for name, (temps, corrs, cert) in points.items()
+    }
+
+
+def load_correction_tables(csv_path: str | Path) -> Dict[str, CorrectionTable]:
+    """Load correction tables from a CSV file (UTF-8, falling back to ISO-8859-1)."""
+    path = Path(csv_path)
+    if not path.is_file():
+        raise IOError(f"CSV file not found: {path}")
+    for enc in ("utf-8-sig", "iso-8859-1"):
+        try:
+            with path.open("r", encoding=enc, newline="") as f:
+                tables = read_correction_tables(f)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise IOError(f"Unable to decode CSV {path} with supported encodings")
+    logger.info("Loaded correction tables of %d thermometers from %s", len(tables), path)
+    return tables
+
+
+def interpolate_corrections(
+    tables: Mapping[str, CorrectionTable],
+    thermometers: Any,
+    readings: Any,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(corrections, status)`` for readings of many thermometers.
+
+    *thermometers* names the thermometer of each reading. Corrections are
+    ``NaN`` where the status is not ``STATUS_OK``: no table for the
+    thermometer, a ``NaN`` reading, or a reading outside the table's range.
+    """
+
+    names = np.asarray(thermometers, dtype=object)
+    values = np.asarray(readings, dtype=np.float64)
+    if names.ndim != 1 or values.shape != names.shape:
+        raise ValueError("thermometers and readings must be 1-D columns of equal length")
+    corrections = np.full(len(values), np.nan)
+    status = np.full(len(values), STATUS_UNKNOWN_THERMOMETER, dtype=np.int8)
+    if not len(values):
+        return corrections, status
+
+    codes, unique_names = factorize(names)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(unique_names)))))
+    for g, name in enumerate(unique_names):
+        table = tables.get(name)
+        if table is None:
+            continue
+        idx = order[bounds[g]:bounds[g + 1]]
+        corrections[idx] = table.correction_at(values[idx])
+        status[idx] = STATUS_OK
+
+    known = status == STATUS_OK
+    status[known & np.isnan(values)] = STATUS_INVALID_VALUE
+    status[known & ~np.isnan(values) & np.isnan(corrections)] = STATUS_OUT_OF_RANGE
+    return corrections, status
+
+
+# ---------------------------------------------------------------------------
+# Agreement check
+# ---------------------------------------------------------------------------
+@dataclass
+class AgreementResult:
+    """Columnar result of :func:`check_agreement`, one entry per pair.
+
+    ``difference`` is ``corrected_1 - corrected_2`` and ``delta`` its absolute
+    value. ``passes`` is ``False`` unless ``status`` is ``STATUS_OK``; the
+    status of a pair is the worse of its two readings' statuses.
+    """
+
+    set_point: np.ndarray
+    thermometer_1: np.ndarray
+    thermometer_2: np.ndarray
+    reading_1: np.ndarray
+    reading_2: np.ndarray
+    correction_1: np.ndarray
+    correction_2: np.ndarray
+    corrected_1: np.ndarray
+    corrected_2: np.ndarray
+    difference: np.ndarray
+    delta: np.ndarray
+    passes: np.ndarray
+    status: np.ndarray
+    limit: float = field(default=AGREEMENT_LIMIT)
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """Return pair *index* as a plain dictionary."""
+        result = {f.name: getattr(self, f.name)[index] for f in fields(self) if f.name != "limit"}
+        result = {k: (v.item() if isinstance(v, np.generic) else v) for k, v in result.items()}
+        result["status"] = STATUS_LABELS[result["status"]]
+        return result
+
+
+def check_agreement(
+    tables: Mapping[str, CorrectionTable],
+    thermometer_1: Any,
+    reading_1: Any,
+    thermometer_2: Any,
+    reading_2: Any,
+    limit: float = AGREEMENT_LIMIT,
+    set_points: Optional[Any] = None,
+) -> AgreementResult:
+    """Apply interpolated corrections to both readings and compare them.
+
+    A pair agrees when ``|corrected_1 - corrected_2| <= limit`` (°C).
+    *set_points* is only carried into the result and the report.
+    """
+
+    if not limit > 0:
+        raise ValueError("limit must be a positive number of °C")
+    names_1 = np.asarray(thermometer_1, dtype=object)
+    names_2 = np.asarray(thermometer_2, dtype=object)
+    values_1 = np.asarray(reading_1, dtype=np.float64)
+    values_2 = np.asarray(reading_2, dtype=np.float64)
+    n = len(names_1)
+    points = np.full(n, np.nan) if set_points is None else np.asarray(set_points, dtype=np.float64)
+    if any(a.shape != (n,) for a in (names_2, values_1, values_2, points)):
+        raise ValueError("all columns must be 1-D and of equal length")
+
+    # Both thermometer columns in one pass: most thermometers appear in both.
+    corrections, status = interpolate_corrections(
+        tables, np.concatenate((names_1, names_2)), np.concatenate((values_1, values_2))
+    )
+    correction_1, correction_2 = corrections[:n], corrections[n:]
+    status_1, status_2 = status[:n], status[n:]
+    pair_status = np.where(status_1 != STATUS_OK, status_1, status_2)
+
+    corrected_1 = values_1 + correction_1
+    corrected_2 = values_2 + correction_2
+    difference = corrected_1 - corrected_2
+    delta = np.abs(difference)
+    with np.errstate(invalid="ignore"):
+        passes = (np.round(delta, _DELTA_DECIMALS) <= limit) & (pair_status == STATUS_OK)
+    return AgreementResult(
+        set_point=points,
+        thermometer_1=names_1,
+        thermometer_2=names_2,
+        reading_1=values_1,
+        reading_2=values_2,
+        correction_1=correction_1,
+        correction_2=correction_2,
+        corrected_1=corrected_1,
+        corrected_2=corrected_2,
+        difference=difference,
+        delta=delta,
+        passes=passes,
+        status=pair_status,
+        limit=float(limit),
+    )
+
+
+def check_session(
+    in_file: TextIO,
+    tables: Mapping[str, CorrectionTable],
+    limit: float = AGREEMENT_LIMIT,
+) -> AgreementResult:
+    """Check every pair of a session CSV (see the module docstring).
+
+    Non-numeric readings become ``NaN`` and are reported as invalid values;
+    blank rows are skipped and a short row raises ``ValueError``.
+    """
+
+    reader = csv.reader(in_file)
+    header = next(reader, None)
+    if header is None:
+        raise ValueError("Session CSV is empty")
+    indices = _column_indices(header, SESSION_COLUMNS, (SET_POINT_COLUMN,))
+    width = max(i for i in indices if i is not None) + 1
+    rows = []
+    for line, row in enumerate(reader, start=2):
+        if len(row) < width:
+            if any(cell.strip() for cell in row):
+                raise ValueError(f"Line {line}: expected {width} columns, got {len(row)}")
+            continue
+        rows.append(row)
+    i_t1, i_r1, i_t2, i_r2, i_sp = indices
+
+    def _text(i: int) -> List[str]:
+        return [r[i].strip() for r in rows]
+
+    def _values(i: Optional[int]) -> Optional[np.ndarray]:
+        if i is None:
+            return None
+        return np.fromiter((_to_float(r[i]) for r in rows), dtype=np.float64, count=len(rows))
+
+    return check_agreement(
+        tables, _text(i_t1), _values(i_r1), _text(i_t2), _values(i_r2), limit=limit, set_points=_values(i_sp)
+    )
+
+
+def check_session_file(
+    csv_path: str | Path,
+    tables: Mapping[str, CorrectionTable],
+    limit: float = AGREEMENT_LIMIT,
+    encoding: str = "utf-8-sig",
+) -> AgreementResult:
+    """Path-based wrapper around :func:`check_session`."""
+    with open(csv_path, "r", encoding=encoding, newline="") as f:
+        return check_session(f, tables, limit=limit)
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+def _groups(
+    key: np.ndarray,
+    ok: np.ndarray,
+    failed: np.ndarray,
+    delta: np.ndarray,
+    difference: np.ndarray,
+) -> List[Tuple[Any, int, int, float, float]]:
+    """``(key, checked, failures, max |ΔT|, mean ΔT)`` per distinct key.
+
+    Statistics cover evaluated pairs (*ok*) only.
+    """
+    codes, uniques = factorize(key)
+    size = len(uniques)
+    checked = np.bincount(codes, weights=ok, minlength=size).astype(np.int64)
+    failures = np.bincount(codes, weights=failed, minlength=size).astype(np.int64)
+    max_delta = np.full(size, np.nan)
+    np.fmax.at(max_delta, codes[ok], delta[ok])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_diff = np.bincount(codes[ok], weights=difference[ok], minlength=size) / checked
+    return list(zip(uniques.tolist(), checked.tolist(), failures.tolist(), max_delta.tolist(), mean_diff.tolist()))
+
+
+def _fmt(value: float, spec: str) -> str:
+    if value != value:
+        width = "".join(ch for ch in spec.split(".")[0] if ch.isdigit())
+        return f"{'—':>{width or 1}}"
+    return format(value, spec)
+
+
+def format_report(
+    result: AgreementResult,
+    title: str = "THERMOMETER AGREEMENT REPORT",
+    max_listed: int = 50,
+) -> str:
+    """One compact text report of a checked session.
+
+    Totals, then per set point and per thermometer the number of evaluated
+    pairs, failures, the largest |ΔT| and the mean signed ΔT (for a
+    thermometer: its corrected reading minus its partner's, so a steady
+    bias shows up on the thermometer that has it), then every failing or
+    unevaluated pair (the first *max_listed* of them).
+    """
+
+    ok = result.status == STATUS_OK
+    failed = ok & ~result.passes
+    evaluated, n_failed = int(ok.sum()), int(failed.sum())
+    lines = [
+        "=" * 64,
+        f"  {title}",
+        f"  {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+        "=" * 64,
+        f"  Limit {result.limit:.3f} °C   Pairs {len(result)}   Pass {evaluated - n_failed}   "
+        f"Fail {n_failed}   Not evaluated {len(result) - evaluated}",
+    ]
+
+    if len(result) and not np.isnan(result.set_point).all():
+        lines += ["-" * 64, f"  {'Set point':>10}  {'Checked':>7}  {'Fail':>5}  {'Max |ΔT|':>9}  {'Mean ΔT':>9}"]
+        for point, pairs, fails, max_delta, mean in _groups(result.set_point, ok, failed,
+                                                            result.delta, result.difference):
+            lines.append(f"  {_fmt(point, '10.2f')}  {pairs:7d}  {fails:5d}  {_fmt(max_delta, '9.4f')}  {_fmt(mean, '+9.4f')}")
+
+    if len(result):
+        # Every pair counts once for each of its two thermometers.
+        by_thermometer = _groups(
+            np.concatenate((result.thermometer_1, result.thermometer_2)),
+            np.concatenate((ok, ok)),
+            np.concatenate((failed, failed)),
+            np.concatenate((result.delta, result.delta)),
+            np.concatenate((result.difference, -result.difference)),
+        )
+        lines += ["-" * 64, f"  {'Thermometer':<22}  {'Checked':>7}  {'Fail':>5}  {'Max |ΔT|':>9}  {'Mean ΔT':>9}"]
+        for name, pairs, fails, max_delta, mean in sorted(by_thermometer, key=lambda g: g[0]):
+            lines.append(f"  {name[:22]:<22}  {pairs:7d}  {fails:5d}  {_fmt(max_delta, '9.4f')}  {_fmt(mean, '+9.4f')}")
+
+    problems = np.flatnonzero(~result.passes)
+    if len(problems):
+        lines += ["-" * 64, "  Failures and pairs not evaluated:"]
+        for i in problems[:max_listed].tolist():
+            row = result.row(i)
+            where = "" if row["set_point"] != row["set_point"] else f"@{row['set_point']:g}  "
+            detail = (f"|ΔT| {row['delta']:.4f} °C" if row["status"] == STATUS_LABELS[STATUS_OK]
+                      else row["status"])
+            lines.append(
+                f"  {where}{row['thermometer_1']} {_fmt(row['reading_1'], '.3f')} ({_fmt(row['correction_1'], '+.3f')})"
+                f"  vs  {row['thermometer_2']} {_fmt(row['reading_2'], '.3f')} ({_fmt(row['correction_2'], '+.3f')})"
+                f"  →  {detail}"
+            )
+        if len(problems) > max_listed:
+            lines.append(f"  … and {len(problems) - max_listed} more")
+    lines.append("=" * 64)
+    return "\n".join(lines) + "\n"
+
+
+def write_report(result: AgreementResult, path: str | Path, title: str = "THERMOMETER AGREEMENT REPORT") -> None:
+    """Write :func:`format_report` to *path* atomically."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(format_report(result, title))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m core.thermometer",
+        description="Check thermometer pairs of a calibration session against certificate corrections.",
+    )
+    parser.add_argument("tables", help="correction table CSV (Thermometer, Temperature, Correction)")
+    parser.add_argument("session", help="session CSV (Thermometer_1, Reading_1, Thermometer_2, Reading_2)")
+    parser.add_argument("--limit", type=float, default=AGREEMENT_LIMIT,
+                        help=f"agreement limit in °C (default: {AGREEMENT_LIMIT})")
+    parser.add_argument("--report", metavar="PATH", help="write the report to PATH instead of stdout")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    try:
+        result = check_session_file(args.session, load_correction_tables(args.tables), limit=args.limit)
+    except (OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    if args.report:
+        write_report(result, args.report)
+    else:
+        sys.stdout.write(format_report(result))
+    # Non-zero when any pair failed or could not be checked.
+    return 0 if result.passes.all() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
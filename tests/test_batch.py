@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+import core
+from core import Method, calc_tolerance, load_methods
+from core.batch import calc_tolerance_batch
+
+METHODS = load_methods("methods_enriched.csv")
+
+
+@pytest.mark.parametrize("name", [
+    "D56-22 HT",
+    "D56-22 LT",
+    "D93-20 A",
+    "D4294-21 (mg/kg)",
+    "D5453-23 (< 400 mg/kg S)",
+])
+def test_batch_matches_scalar_path(name):
+    method = METHODS[name]
+    rng = np.random.default_rng(0)
+    v1 = rng.uniform(50, 300, size=200)
+    v2 = v1 + rng.normal(0, 3, size=200)
+    batch = calc_tolerance_batch(method, v1, v2)
+    assert len(batch) == 200
+    for i in range(0, 200, 17):
+        expected = calc_tolerance(method, float(v1[i]), float(v2[i]))
+        got = batch.row(i)
+        for key in ("avg", "diff", "r", "R", "tolerance_075R"):
+            assert got[key] == pytest.approx(expected[key])
+        for key in ("r_pass", "R_pass", "tolerance_pass"):
+            assert got[key] == expected[key]
+
+
+def test_out_of_range_rows_are_masked_not_raised():
+    method = Method(name="X", r=1.0, R=2.0, unit="u", formula_r="", formula_R="",
+                    decimals=2, lower=0.5, upper=400.0)
+    batch = calc_tolerance_batch(method, [1.0, 0.1, 500.0], [1.2, 1.0, 399.0])
+    assert batch.in_range.tolist() == [True, False, False]
+    assert batch.r_pass.tolist() == [True, False, False]
+
+
+def test_numpy_functions_in_formulas():
+    method = Method(name="X", r=None, R=None, unit="u", formula_r="sqrt(avg)",
+                    formula_R="pow(avg, 0.5) + log(exp(1))", decimals=2, lower=None, upper=None)
+    batch = calc_tolerance_batch(method, [4.0, 16.0], [4.0, 16.0])
+    np.testing.assert_allclose(batch.r, [2.0, 4.0])
+    np.testing.assert_allclose(batch.R, [3.0, 5.0])
+    np.testing.assert_allclose(batch.tolerance_high - batch.tolerance_low, 1.5 * batch.R)
+
+
+def test_mismatched_lengths_raise():
+    with pytest.raises(ValueError):
+        calc_tolerance_batch(METHODS["D56-22 HT"], [1.0, 2.0], [1.0])
+
+
+def test_lazy_export_from_core():
+    assert core.calc_tolerance_batch is calc_tolerance_batch
+
+
+def test_bulk_preserves_row_order_and_reports_status():
+    from core.batch import (
+        STATUS_OK, STATUS_OUT_OF_RANGE, STATUS_UNKNOWN_METHOD, calc_tolerance_bulk,
+    )
+
+    names = ["D445-24 (Diesel @ 40°C)", "D86-23 IBP (Gasoline)", "NOPE", "D5453-23 (< 400 mg/kg S)",
+             "D445-24 (Diesel @ 40°C)", "D5453-23 (< 400 mg/kg S)"]
+    v1 = [2.5, 35.0, 1.0, 10.0, 3.1, 0.1]
+    v2 = [2.51, 36.0, 1.0, 10.5, 3.0, 0.2]
+    bulk = calc_tolerance_bulk(METHODS, names, v1, v2)
+
+    assert bulk.status.tolist() == [STATUS_OK, STATUS_OK, STATUS_UNKNOWN_METHOD, STATUS_OK, STATUS_OK,
+                                    STATUS_OUT_OF_RANGE]
+    for i in (0, 1, 3, 4):
+        expected = calc_tolerance(METHODS[names[i]], v1[i], v2[i])
+        row = bulk.row(i)
+        assert row["method_name"] == names[i]
+        assert row["r"] == pytest.approx(expected["r"])
+        assert row["R_pass"] == expected["R_pass"]
+        assert row["decimals"] == expected["decimals"]
+    assert np.isnan(bulk.avg[2]) and not bulk.r_pass[2]
+    assert not bulk.r_pass[5]
+
+
+@pytest.mark.parametrize("formula", ["0.1 * log(avg)", "avg ** 0.5", "0.2 * sqrt(avg)"])
+def test_bulk_reports_domain_errors_as_formula_errors(formula):
+    from core.batch import STATUS_FORMULA_ERROR, STATUS_OK, calc_tolerance_bulk
+
+    method = Method(name="M", r=None, R=None, unit="x", formula_r=formula, formula_R="1.0",
+                    decimals=2, lower=None, upper=None)
+    bulk = calc_tolerance_bulk({"M": method}, ["M", "M"], [-5.0, 20.0], [-5.0, 20.5])
+    with pytest.raises((ValueError, TypeError)):
+        calc_tolerance(method, -5.0, -5.0)
+    assert bulk.status.tolist() == [STATUS_FORMULA_ERROR, STATUS_OK]
+    assert np.isnan(bulk.r[0]) and not (bulk.r_pass[0] or bulk.R_pass[0] or bulk.tolerance_pass[0])
+    assert bulk.avg[0] == -5.0
+    assert bulk.r[1] == pytest.approx(calc_tolerance(method, 20.0, 20.5)["r"])
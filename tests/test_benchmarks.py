@@ -0,0 +1,22 @@
+import json
+
+from benchmarks.bench_core import compare, formula_shape, main
+
+
+def test_formula_shape_groups_coefficients():
+    assert formula_shape("(0.029 * avg)") == formula_shape("(0.1267 * avg)") == "(k*avg)"
+    assert formula_shape("(12 * avg**0.5)") == "(k*avg**k)"
+    assert formula_shape("(0.0318 * (avg + 60))") == "(k*(avg+k))"
+
+
+def test_benchmark_run_writes_json_and_compares(tmp_path):
+    out = tmp_path / "bench.json"
+    assert main(["--quick", "--repeat", "1", "--min-time", "0.0", "-k", "calc_tolerance[", "--output", str(out)]) == 0
+    report = json.loads(out.read_text(encoding="utf-8"))
+    assert {r["name"] for r in report["results"]} >= {"calc_tolerance[D93-20 A]"}
+
+    slower = json.loads(json.dumps(report))
+    for r in slower["results"]:
+        r["min_s"] *= 10
+    assert compare(slower, report, threshold=0.2)
+    assert not compare(report, report, threshold=0.2)
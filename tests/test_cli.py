@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from core.cli import main, run
+
+ROOT = Path(__file__).resolve().parent.parent
+METHODS = str(ROOT / "methods_enriched.csv")
+
+CSV_INPUT = "Method,V1,V2\nD93-20 A,60,61\nD56-22 HT,40,40.5\nNope,1,2\nD93-20 A,x,1\n"
+
+
+def _run(inputs, **kwargs):
+    out = io.StringIO()
+    run(inputs, out, METHODS, **kwargs)
+    return out.getvalue()
+
+
+def test_csv_file_to_csv(tmp_path):
+    path = tmp_path / "pairs.csv"
+    path.write_text(CSV_INPUT)
+    rows = list(csv.DictReader(io.StringIO(_run([str(path)]))))
+    assert [r["Status"] for r in rows] == ["ok", "ok", "unknown method", "invalid value"]
+    assert rows[0]["r"] == "1.7545" and rows[0]["0.75R_pass"] == "PASS"
+
+
+def test_short_csv_rows_are_invalid_values(tmp_path):
+    path = tmp_path / "pairs.csv"
+    path.write_text("Method,V1,V2\nD93-20 A,60\n\nD93-20 A,60,61\n")
+    rows = list(csv.DictReader(io.StringIO(_run([str(path)]))))
+    assert [(r["V2"], r["Status"]) for r in rows] == [("", "invalid value"), ("61", "ok")]
+
+
+def test_jsonl_file_to_jsonl(tmp_path):
+    path = tmp_path / "pairs.jsonl"
+    path.write_text('{"method": "D93-20 A", "v1": 60, "v2": 61}\n\n{"Method": "D56-22 HT", "V1": 40, "V2": 40.5}\n')
+    rows = [json.loads(line) for line in _run([str(path)], output_format="jsonl").splitlines()]
+    assert [r["Method"] for r in rows] == ["D93-20 A", "D56-22 HT"]
+    assert rows[0]["Avg"] == 60.5 and rows[0]["r_pass"] is True
+
+
+def test_method_option_needs_only_values(tmp_path):
+    path = tmp_path / "readings.csv"
+    path.write_text("v1,v2\n60,61\n70,75\n")
+    rows = list(csv.DictReader(io.StringIO(_run([str(path)], method="D93-20 A"))))
+    assert {r["Method"] for r in rows} == {"D93-20 A"}
+    assert rows[1]["r_pass"] == "FAIL"
+
+
+def test_unknown_method_option_is_an_error(tmp_path, capsys):
+    path = tmp_path / "readings.csv"
+    path.write_text("v1,v2\n60,61\n")
+    assert main([str(path), "--method", "Nope", "--methods-file", METHODS]) == 2
+    assert "Unknown method" in capsys.readouterr().err
+
+
+def test_zero_workers_is_an_error(tmp_path, capsys):
+    path = tmp_path / "pairs.csv"
+    path.write_text(CSV_INPUT)
+    with pytest.raises(SystemExit) as exc:
+        main([str(path), "--workers", "0", "--methods-file", METHODS])
+    assert exc.value.code == 2 and "--workers must be >= 1" in capsys.readouterr().err
+    with pytest.raises(ValueError):
+        _run([str(path)], workers=0)
+
+
+def test_parallel_output_matches_serial(tmp_path):
+    path = tmp_path / "pairs.csv"
+    path.write_text("Method,V1,V2\n" + "".join(f"D93-20 A,{60 + i % 50},{61 + i % 7}\n" for i in range(500)))
+    serial = _run([str(path)], chunk_size=64)
+    assert _run([str(path)], workers=2, chunk_size=64) == serial
+
+
+def test_stdin_is_sniffed_and_no_ui_modules_are_imported():
+    code = (
+        "import sys; from core.cli import main; rc = main(['--methods-file', sys.argv[1]]); "
+        "sys.stdout.flush(); "
+        "assert not {'pandas', 'streamlit', 'tkinter'} & set(sys.modules), sorted(sys.modules); "
+        "raise SystemExit(rc)"
+    )
+    jsonl = '{"method": "D93-20 A", "v1": 60, "v2": 61}\n'
+    proc = subprocess.run([sys.executable, "-c", code, METHODS], input=jsonl, capture_output=True, text=True,
+                          cwd=ROOT)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.splitlines()[1].startswith("D93-20 A,60,61,")
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_python_dash_m_entry_point(tmp_path, fmt):
+    path = tmp_path / "pairs.csv"
+    path.write_text(CSV_INPUT)
+    proc = subprocess.run([sys.executable, "-m", "core", str(path), "--format", fmt, "--methods-file", METHODS],
+                          capture_output=True, text=True, cwd=ROOT)
+    assert proc.returncode == 0, proc.stderr
+    assert len(proc.stdout.splitlines()) == (5 if fmt == "csv" else 4)
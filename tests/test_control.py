@@ -0,0 +1,104 @@
+import json
+import random
+import statistics
+
+import pytest
+
+from core import PRECISION_FACTOR, calc_tolerance, load_methods
+from core.control import ChartParams, ControlCharts, get_control_charts
+
+
+def _duplicates(n, r, scale=1.0, seed=0):
+    """|diff| of duplicate results whose repeatability is *scale* × r."""
+    rng = random.Random(seed)
+    sigma = scale * r / PRECISION_FACTOR
+    return [abs(rng.gauss(0.0, sigma) - rng.gauss(0.0, sigma)) for _ in range(n)]
+
+
+def test_welford_matches_batch_statistics():
+    charts = ControlCharts()
+    diffs = _duplicates(500, r=0.3)
+    for d in diffs:
+        charts.update("M", d, 0.3, 0.7)
+    stats = charts.stats("M")
+    assert stats.n == 500
+    assert stats.mean_diff == pytest.approx(statistics.fmean(diffs))
+    assert stats.std_diff == pytest.approx(statistics.stdev(diffs))
+
+
+def test_in_control_method_matches_published_precision():
+    charts = ControlCharts()
+    signals = [charts.update("M", d, 0.3, 0.7) for d in _duplicates(5_000, r=0.3)]
+    stats = charts.stats("M")
+    assert stats.r_ratio == pytest.approx(1.0, abs=0.05)
+    assert stats.R_ratio == pytest.approx(0.3 / 0.7, abs=0.05)
+    assert stats.r_failures / stats.n == pytest.approx(0.05, abs=0.015)
+    assert sum(s.cusum for s in signals) < 25
+
+
+def test_degraded_precision_signals():
+    charts = ControlCharts()
+    for d in _duplicates(200, r=0.3, seed=1):
+        charts.update("M", d, 0.3, 0.7)
+    before = charts.stats("M")
+    for d in _duplicates(200, r=0.3, scale=2.0, seed=2):
+        charts.update("M", d, 0.3, 0.7)
+    after = charts.stats("M")
+    assert after.ewma_signals > before.ewma_signals
+    assert after.cusum_signals > before.cusum_signals
+    assert after.shewhart_signals > before.shewhart_signals
+    assert after.r_ratio > 1.3
+
+
+def test_static_zero_precision_is_not_charted():
+    charts = ControlCharts()
+    assert not charts.update("M", 0.5, 0.0, 0.0)
+    stats = charts.stats("M")
+    assert stats.n == 1 and stats.r_ratio is None and stats.R_ratio is None
+
+
+def test_snapshot_restore_continues_exactly():
+    diffs = _duplicates(300, r=0.3, scale=1.4)
+    uninterrupted = ControlCharts(ChartParams(ewma_lambda=0.1))
+    for d in diffs:
+        uninterrupted.update("M", d, 0.3, 0.7)
+
+    first = ControlCharts(ChartParams(ewma_lambda=0.1))
+    for d in diffs[:150]:
+        first.update("M", d, 0.3, 0.7)
+    data = json.loads(json.dumps(first.snapshot()))
+    resumed = ControlCharts.restore(data)
+    for d in diffs[150:]:
+        resumed.update("M", d, 0.3, 0.7)
+
+    assert resumed.params == uninterrupted.params
+    assert resumed.snapshot() == uninterrupted.snapshot()
+
+
+def test_save_and_load(tmp_path):
+    path = tmp_path / "control.json"
+    assert len(ControlCharts.load(path)) == 0
+    charts = ControlCharts()
+    charts.update("M", 0.1, 0.3, 0.7, timestamp=123.0)
+    charts.save(path)
+    loaded = ControlCharts.load(path)
+    assert loaded.stats("M") == charts.stats("M")
+    assert loaded.params == ChartParams()
+    # Explicit params replace the stored constants and keep the statistics.
+    params = ChartParams(ewma_lambda=0.1, cusum_h=4.0)
+    reloaded = ControlCharts.load(path, params)
+    assert reloaded.params == params and reloaded.stats("M") == charts.stats("M")
+    path.write_text("{not json")
+    assert len(ControlCharts.load(path)) == 0
+
+
+def test_update_from_calc_tolerance(tmp_path):
+    method = load_methods("methods_enriched.csv")["D93-20 A"]
+    charts = get_control_charts(tmp_path / "state.json")
+    assert get_control_charts(tmp_path / "state.json") is charts
+    result = calc_tolerance(method, 60.0, 61.0)
+    charts.update_result(result)
+    (row,) = charts.summary()
+    assert row["method"] == "D93-20 A"
+    assert row["mean_diff"] == pytest.approx(1.0)
+    assert row["r_ratio"] == pytest.approx(PRECISION_FACTOR * (1.0 / result["r"]) / 2 ** 0.5)
@@ -0,0 +1,116 @@
+import math
+
+import pytest
+
+from core import Method, calc_tolerance, load_methods, safe_eval
+from core.formula import (
+    FormulaCache,
+    FormulaError,
+    cache_stats,
+    clear_cache,
+    compile_formula,
+    make_evaluator,
+)
+
+
+def _formula_method(formula_r="(0.029 * avg)", formula_R="(0.071 * avg)"):
+    return Method(
+        name="D93-20 A", r=None, R=None, unit="°C",
+        formula_r=formula_r, formula_R=formula_R,
+        decimals=4, lower=None, upper=None,
+    )
+
+
+def test_cache_counts_hits_misses_and_evictions():
+    cache = FormulaCache(maxsize=2)
+    cache.get("avg * 2")
+    cache.get("avg * 2")
+    cache.get("avg * 3")
+    cache.get("avg * 4")  # evicts "avg * 2"
+    cache.get("avg * 2")
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (1, 4, 2, 2)
+
+
+def test_safe_eval_reuses_compiled_code():
+    clear_cache()
+    for avg in range(1, 50):
+        assert safe_eval("12 * avg**0.5", avg) == pytest.approx(12 * avg ** 0.5)
+    stats = cache_stats()
+    assert stats.misses == 1
+    assert stats.hits == 48
+
+
+def test_method_evaluators_match_safe_eval():
+    method = _formula_method()
+    assert method.eval_r(200.0) == pytest.approx(safe_eval(method.formula_r, 200.0))
+    result = calc_tolerance(method, 100.0, 102.0)
+    assert result["r"] == pytest.approx(0.029 * 101.0)
+    assert result["R"] == pytest.approx(0.071 * 101.0)
+
+
+def test_invalid_formula_still_raises_at_calculation():
+    method = _formula_method(formula_r="0.029 *")
+    assert method.eval_r is None
+    with pytest.raises(SyntaxError):
+        calc_tolerance(method, 1.0, 2.0)
+
+
+@pytest.mark.parametrize("formula", [
+    "__import__('os')",
+    "avg.__class__",
+    "[avg for avg in (1, 2)]",
+    "open('x')",
+    "sqrt(x=avg)",
+    "'a' * 3",
+    "avg if avg else 1",
+])
+def test_disallowed_syntax_is_rejected(formula):
+    with pytest.raises(FormulaError):
+        make_evaluator(formula)
+
+
+@pytest.mark.parametrize("formula, kind, coefficients", [
+    ("(0.029 * avg)", "linear", (0.029, 0)),
+    ("avg * 0.029", "linear", (0.029, 0)),
+    ("0.0119 * (avg + 8.0)", "linear", (0.0119, 8.0)),
+    ("0.5 * (avg - 2)", "linear", (0.5, -2)),
+    ("12 * avg**0.5", "power", (12, 0.5)),
+    ("avg ** -0.4", "power", (1, -0.4)),
+    ("0.35", "constant", (0.35,)),
+    ("0.02 * sqrt(avg) + 1", "generic", ()),
+])
+def test_common_shapes_are_recognised(formula, kind, coefficients):
+    compiled = compile_formula(formula)
+    assert compiled.kind == kind
+    assert compiled.coefficients == coefficients
+
+
+@pytest.mark.parametrize("formula", [
+    "(0.029 * avg)",
+    "0.0119 * (avg + 8.0)",
+    "0.5 * (avg - 2)",
+    "12 * avg**0.5",
+    "0.35",
+    "0.02 * sqrt(avg) + abs(-1) / exp(0) - log(avg) % 3",
+    "-pow(avg, 2) * 1e-4",
+])
+def test_compiled_formula_matches_python_arithmetic(formula):
+    namespace = {"__builtins__": {}, "abs": abs, "sqrt": math.sqrt, "log": math.log, "exp": math.exp, "pow": pow}
+    for avg in (0.7, 10.0, 123.4, 5000.0):
+        assert compile_formula(formula)(avg) == eval(formula, namespace, {"avg": avg})
+
+
+def test_methods_enriched_formulas_compile_to_shapes():
+    methods = load_methods("methods_enriched.csv")
+    kinds = {
+        compile_formula(f).kind
+        for m in methods.values() for f in (m.formula_r, m.formula_R) if f
+    }
+    assert "generic" not in kinds
+
+
+def test_loaded_methods_carry_evaluators():
+    methods = load_methods("methods_enriched.csv")
+    assert methods["D5453-23 (< 400 mg/kg S)"].eval_R is not None
+    assert methods["D56-22 HT"].eval_r is None
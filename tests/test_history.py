@@ -0,0 +1,95 @@
+import csv
+import io
+import sqlite3
+import threading
+
+import pytest
+
+from core import calc_tolerance, load_methods
+from core.history import DISPLAY_COLUMNS, HistoryRecord, HistoryStore, display_row
+
+
+def _record(i, session="s1", method="D93-20 A", passed=True):
+    return HistoryRecord(
+        timestamp=1_700_000_000.0 + i, session=session, method=method, unit="°C", decimals=2,
+        v1=10.0 + i, v2=10.1 + i, avg=10.05 + i, diff=0.1, r=0.3, R=0.7, tolerance_075R=0.525,
+        r_pass=passed, R_pass=passed, tolerance_pass=passed,
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    with HistoryStore(tmp_path / "history.sqlite3", batch_size=10) as s:
+        yield s
+
+
+def test_database_uses_wal_and_indexes(store):
+    conn = sqlite3.connect(store.path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(history)")}
+    assert {"history_timestamp", "history_method", "history_pass"} <= indexes
+
+
+def test_records_are_written_in_batches(store):
+    for i in range(15):
+        store.add(_record(i))
+    on_disk = sqlite3.connect(store.path).execute("SELECT COUNT(*) FROM history").fetchone()[0]
+    assert on_disk == 10
+    assert store.count() == 15  # reads flush the queue
+
+
+def test_page_is_newest_first_with_offset(store):
+    store.add_many(_record(i) for i in range(25))
+    first = store.page(10)
+    assert [r.timestamp for r in first] == [1_700_000_000.0 + i for i in range(24, 14, -1)]
+    last = store.page(10, offset=20)
+    assert len(last) == 5
+    assert last[-1] == _record(0)
+
+
+def test_filters(store):
+    store.add_many([_record(0), _record(1, session="s2"), _record(2, method="D445"), _record(3, passed=False)])
+    assert store.count(session="s2") == 1
+    assert store.count(method="D445") == 1
+    assert store.count(passed=False) == 1
+    assert store.count(passed=True, session="s1") == 2
+    assert store.count(since=1_700_000_002.0) == 2
+
+
+def test_clear_session_only(store):
+    store.add_many([_record(0), _record(1, session="s2")])
+    assert store.clear(session="s1") == 1
+    assert store.count() == 1
+
+
+def test_csv_export_streams_all_rows(store, monkeypatch):
+    monkeypatch.setattr("core.history.EXPORT_FETCH_SIZE", 7)
+    store.add_many(_record(i) for i in range(30))
+    chunks = list(store.iter_csv())
+    assert len(chunks) > 1
+    rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert list(rows[0]) == DISPLAY_COLUMNS
+    assert len(rows) == 30
+    assert rows[0]["V1"] == "10.0" and rows[0]["r ✓"] == "✅"
+
+
+def test_record_from_calc_tolerance(store):
+    method = load_methods("methods_enriched.csv")["D93-20 A"]
+    result = calc_tolerance(method, 60.0, 61.0)
+    store.add(HistoryRecord.from_result(result, 60.0, 61.0, method.decimals, session="s"))
+    (rec,) = store.page(1)
+    assert rec.method == "D93-20 A" and rec.R == result["R"] and rec.tolerance_pass == result["tolerance_pass"]
+    assert display_row(rec)["Avg"] == 60.5
+
+
+def test_concurrent_writers(store):
+    def work(n):
+        for i in range(200):
+            store.add(_record(i, session=f"t{n}"))
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert store.count() == 800
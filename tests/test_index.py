@@ -0,0 +1,45 @@
+import time
+
+from core import load_methods
+from core.index import MethodIndex, standard_prefix
+from core.table import MethodTable
+
+METHODS = load_methods("methods_enriched.csv")
+
+
+def test_standard_prefix():
+    assert standard_prefix("D445-24 (Diesel @ 40°C)") == "D445"
+    assert standard_prefix("D97-17b (Lubricating Oil)") == "D97"
+    assert standard_prefix("EPA 40 CFR 80 Sulfur (ULSD Diesel)") == "EPA"
+
+
+def test_facets_and_text_search():
+    index = MethodIndex(METHODS)
+    assert index.search(standard="d445") == [n for n in METHODS if n.startswith("D445-")]
+    assert "D5453-23 (< 400 mg/kg S)" in index.search(year="2023", unit="mg/kg")
+    sulfur_ulsd = index.search("all sulfur methods for ULSD")
+    assert "EPA 40 CFR 80 Sulfur (ULSD Diesel)" in sulfur_ulsd
+    assert "D7039-23 (< 40 ppm S)" in sulfur_ulsd
+    assert "D6079-23" not in sulfur_ulsd  # ULSD lubricity, not sulfur
+    assert index.search("sulf") == index.search("sulfur")
+    assert index.search("") == list(METHODS)
+
+
+def test_table_backed_index_matches_dict_backed():
+    table = MethodTable(METHODS.values())
+    assert MethodIndex(table).search("diesel", unit="°C") == MethodIndex(METHODS).search("diesel", unit="°C")
+
+
+def test_lookup_is_fast_on_large_catalog():
+    import dataclasses
+
+    base = list(METHODS.values())
+    big = MethodTable(
+        dataclasses.replace(base[i % len(base)], name=f"{base[i % len(base)].name} v{i}") for i in range(20_000)
+    )
+    index = MethodIndex(big)
+    start = time.perf_counter()
+    for _ in range(100):
+        hits = index.search("sulfur ulsd", standard="EPA")
+    elapsed = (time.perf_counter() - start) / 100
+    assert hits and elapsed < 0.005
@@ -0,0 +1,152 @@
+import asyncio
+import json
+
+import pytest
+
+from core import calc_tolerance, load_methods
+from core.ingest import Ingestor, parse_line
+
+METHODS = load_methods("methods_enriched.csv")
+
+
+class Collector:
+    """Sink recording batches; optionally slow, to exercise backpressure."""
+
+    def __init__(self, expected=None, delay=0.0):
+        self.batches = []
+        self.delay = delay
+        self.expected = expected
+        self.done = asyncio.Event()
+
+    async def __call__(self, batch):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.batches.append(batch)
+        if self.expected is not None and sum(map(len, self.batches)) >= self.expected:
+            self.done.set()
+
+    def rows(self):
+        return [row for batch in self.batches for row in batch.rows()]
+
+
+def test_parse_line_formats():
+    assert parse_line("D93-20 A, S1 ,60.5\n") == ("D93-20 A", "S1", 60.5, None)
+    assert parse_line('{"Method": "D93-20 A", "sample": 7, "value": 61}') == ("D93-20 A", "7", 61.0, None)
+    assert parse_line('{"method": "D93-20 A", "v1": 60, "v2": 61}') == ("D93-20 A", "", 60.0, 61.0)
+    assert parse_line("  ") is None and parse_line("# comment") is None
+    for bad in ("D93-20 A,60", "D93-20 A,S1,abc", '{"method": "x"}', "[1, 2]"):
+        with pytest.raises(ValueError):
+            parse_line(bad)
+
+
+def test_file_sources_pair_duplicates_across_sources(tmp_path):
+    a = tmp_path / "a.txt"
+    b = tmp_path / "b.txt"
+    a.write_text("D93-20 A,S1,60\nD93-20 A,S2,70\nnot a reading\nD93-20 A,S3,80\n")
+    b.write_text('{"method": "D93-20 A", "sample": "S2", "value": 75}\nD93-20 A,S1,61\n'
+                 '{"method": "D56-22 HT", "v1": 40, "v2": 40.5}\n')
+
+    async def main():
+        sink = Collector()
+        async with Ingestor(METHODS, sink, flush_interval=0.01) as ingestor:
+            ingestor.add_file("a", a)
+            ingestor.add_file("b", b)
+            await ingestor.wait_sources()
+        return sink, ingestor.metrics()
+
+    sink, metrics = asyncio.run(main())
+    rows = {row["sample"] or row["method_name"]: row for row in sink.rows()}
+    assert sorted(rows) == ["D56-22 HT", "S1", "S2"]
+    expected = calc_tolerance(METHODS["D93-20 A"], 60.0, 61.0)
+    assert rows["S1"]["r"] == pytest.approx(expected["r"]) and rows["S1"]["status"] == "ok"
+    assert rows["S2"]["r_pass"] is False  # 70 vs 75
+    assert metrics["sources"]["a"]["errors"] == 1
+    assert metrics["pending_readings"] == 1  # S3 is still waiting for its duplicate
+    assert metrics["sources"]["b"]["pairs"] == 3
+    assert metrics["sources"]["b"]["latency_ms_p95"] is not None
+
+
+def test_micro_batches_flush_on_size_and_on_time():
+    async def lines(n):
+        for i in range(n):
+            yield f'{{"method": "D93-20 A", "v1": {60 + i % 10}, "v2": 61}}\n'
+
+    async def main():
+        sink = Collector(expected=25)
+        async with Ingestor(METHODS, sink, batch_size=10, flush_interval=0.02) as ingestor:
+            ingestor.add_lines("feed", lines(25))
+            # The last 5 pairs are flushed by the timer, not by close().
+            await asyncio.wait_for(sink.done.wait(), timeout=5)
+        return [len(b) for b in sink.batches]
+
+    assert asyncio.run(main()) == [10, 10, 5]
+
+
+def test_tcp_feeds_with_backpressure_and_metrics():
+    n = 2_000
+
+    async def analyzer(port, name, offset):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"#source {name}\n".encode())
+        for i in range(n):
+            writer.write(f"D93-20 A,{name}-{i},{60 + offset}\nD93-20 A,{name}-{i},{61 + offset}\n".encode())
+            await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    async def main():
+        sink = Collector(expected=2 * n, delay=0.002)
+        ingestor = Ingestor(METHODS, sink, batch_size=50, queue_size=64, batches_in_flight=1)
+        async with ingestor:
+            server = await ingestor.serve_tcp("127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            await asyncio.gather(analyzer(port, "gc-1", 0), analyzer(port, "gc-2", 5))
+            await asyncio.wait_for(sink.done.wait(), timeout=30)
+            metrics = ingestor.metrics()
+        return sink, metrics
+
+    sink, metrics = asyncio.run(main())
+    assert len(sink.rows()) == 2 * n
+    assert all(len(b) <= 50 for b in sink.batches)
+    for name in ("gc-1", "gc-2"):
+        stats = metrics["sources"][name]
+        assert stats["readings"] == 2 * n and stats["pairs"] == n
+        assert 0 < stats["max_queued"] <= 64 + 1  # queue bound plus the reading being taken
+        assert stats["latency_ms_max"] >= stats["latency_ms_p50"] > 0
+    json.dumps(metrics)  # metrics are plain data
+
+
+def _expiry_run(**options):
+    async def lines():
+        yield "D93-20 A,S1,60\n"
+        await asyncio.sleep(0.05)
+        yield "D93-20 A,S2,60\n"
+
+    async def main():
+        async with Ingestor(METHODS, lambda batch: None, **options) as ingestor:
+            ingestor.add_lines("feed", lines())
+            await ingestor.wait_sources()
+        return ingestor.metrics()
+
+    metrics = asyncio.run(main())
+    return metrics["sources"]["feed"]["unpaired"], metrics["pending_readings"]
+
+
+def test_unpaired_readings_expire_or_are_evicted():
+    assert _expiry_run() == (0, 2)
+    assert _expiry_run(pair_timeout=0.02) == (1, 1)  # S1 timed out before S2 arrived
+    assert _expiry_run(max_pending=1) == (1, 1)  # S2 evicted S1
+
+
+def test_readings_expire_while_feeds_are_idle():
+    async def lines():
+        yield "D93-20 A,S1,60\n"
+
+    async def main():
+        async with Ingestor(METHODS, lambda batch: None, pair_timeout=0.02) as ingestor:
+            await ingestor.add_lines("feed", lines())
+            await asyncio.sleep(0.1)  # nothing else arrives
+            return ingestor.metrics()
+
+    metrics = asyncio.run(main())
+    assert (metrics["sources"]["feed"]["unpaired"], metrics["pending_readings"]) == (1, 0)
@@ -0,0 +1,106 @@
+import logging
+import time
+
+import numpy as np
+import pytest
+
+import core
+from core import Method, calc_tolerance, calc_tolerance_bulk, load_methods, safe_eval
+from core.instrument import (
+    Instrumentation,
+    LogSink,
+    MemorySink,
+    PeriodicExporter,
+    PrometheusFileSink,
+    disable,
+    enable,
+    profile,
+)
+
+METHODS = load_methods("methods_enriched.csv")
+
+
+def test_disabled_by_default_and_restored_after_profile():
+    assert core._probe is None
+    with profile(sinks=[MemorySink()]) as instr:
+        assert core._probe is instr
+        calc_tolerance(METHODS["D93-20 A"], 60, 61)
+    assert core._probe is None
+    assert instr.snapshot()["calls"]["calc_tolerance"]["count"] == 1
+
+    outer = enable()
+    try:
+        with profile(sinks=[MemorySink()]):
+            calc_tolerance(METHODS["D93-20 A"], 60, 61)
+        assert core._probe is outer and outer.snapshot()["calls"] == {}
+    finally:
+        assert disable() is outer
+
+
+def test_counts_timings_and_formula_errors(tmp_path):
+    broken = Method(name="Broken", r=None, R=None, unit="x", formula_r="avg +", formula_R="0.5",
+                    decimals=2, lower=None, upper=None)
+    sink = MemorySink()
+    with profile(sinks=[sink]):
+        load_methods("methods_enriched.csv")
+        with pytest.raises(IOError):
+            load_methods(tmp_path / "missing.csv")
+        for v in (60, 61, 62):
+            calc_tolerance(METHODS["D93-20 A"], v, v + 1)
+        with pytest.raises(SyntaxError):
+            calc_tolerance(broken, 10, 11)
+        with pytest.raises(ValueError):
+            calc_tolerance(METHODS["D56-22 HT"], 1, 2)  # below the method's range
+        safe_eval("0.1 * avg", 10)
+        names = ["D93-20 A"] * 4 + ["Broken"] * 2 + ["Unknown"]
+        calc_tolerance_bulk({**METHODS, "Broken": broken}, names, np.full(7, 60.0), np.full(7, 61.0))
+
+    snap = sink.latest
+    calls = snap["calls"]
+    assert calls["load_methods"]["count"] == 2 and calls["load_methods"]["errors"] == 1
+    assert calls["calc_tolerance"]["count"] == 5 and calls["calc_tolerance"]["errors"] == 2
+    assert calls["calc_tolerance"]["seconds_min"] <= calls["calc_tolerance"]["seconds_mean"]
+    # The uncompilable formula falls back to safe_eval, which fails too.
+    assert calls["safe_eval"]["count"] == 2 and calls["safe_eval"]["errors"] == 1
+    assert calls["calc_tolerance_bulk"]["count"] == 1
+    assert snap["methods"]["D93-20 A"] == {"evaluations": 7, "formula_errors": 0, "formula_error_rate": 0.0}
+    assert snap["methods"]["Broken"]["evaluations"] == 3
+    assert snap["methods"]["Broken"]["formula_error_rate"] == 1.0
+    assert "Unknown" not in snap["methods"] and "D56-22 HT" not in snap["methods"]
+
+
+def test_prometheus_file_and_log_sinks(tmp_path, caplog):
+    instr = Instrumentation(clock=iter(range(100)).__next__)
+    enable(instr)
+    try:
+        calc_tolerance(METHODS["D93-20 A"], 60, 61)
+        calc_tolerance(METHODS['D5453-23 (< 400 mg/kg S)'], 20, 21)
+    finally:
+        disable()
+
+    path = tmp_path / "mpc.prom"
+    PrometheusFileSink(path)(instr.snapshot())
+    text = path.read_text()
+    assert '# TYPE mpc_calls_total counter' in text
+    assert 'mpc_calls_total{function="calc_tolerance"} 2' in text
+    assert 'mpc_call_seconds_total{function="calc_tolerance"} 2.0' in text
+    assert 'mpc_method_evaluations_total{method="D5453-23 (< 400 mg/kg S)"} 1' in text
+    assert list(tmp_path.iterdir()) == [path]
+
+    with caplog.at_level(logging.INFO, logger="core"):
+        LogSink()(instr.snapshot())
+    assert "calc_tolerance=2/0err" in caplog.text and "evaluations=2" in caplog.text
+    assert "D93-20 A" in instr.summary()
+
+
+def test_periodic_exporter_final_export():
+    instr = Instrumentation()
+    sink = MemorySink(keep=None)
+    with PeriodicExporter(instr, [sink], interval=0.01):
+        instr.count_method("D93-20 A", 5)
+        for _ in range(500):
+            if sink.snapshots:
+                break
+            time.sleep(0.01)
+        assert sink.snapshots
+    assert sink.latest["methods"]["D93-20 A"]["evaluations"] == 5
@@ -0,0 +1,108 @@
+import math
+
+import numpy as np
+import pytest
+
+from core import Method, calc_tolerance, calc_tolerance_batch, load_methods
+from core.lookup import (
+    FormulaLookup,
+    build_lookup,
+    default_error_bound,
+    precompute_methods,
+    tabulate_method,
+    valid_range,
+)
+
+
+@pytest.fixture(scope="module")
+def methods():
+    return load_methods("methods_enriched.csv")
+
+
+@pytest.fixture(scope="module")
+def tabulated(methods):
+    return precompute_methods(methods)
+
+
+def test_valid_range_from_limits_and_conc_range(methods):
+    assert valid_range(methods["D5453-23 (< 400 mg/kg S)"]) == (0.5, 400.0)
+    assert valid_range(methods["D4294-21 (mg/kg)"]) == (50.0, 500.0)
+    assert valid_range(methods["D93-20 A"]) is None
+
+
+def test_precompute_tabulates_methods_with_known_range(methods, tabulated):
+    assert isinstance(tabulated["D5453-23 (< 400 mg/kg S)"].eval_R.lookup, FormulaLookup)
+    assert isinstance(tabulated["D4294-21 (mg/kg)"].eval_r.lookup, FormulaLookup)
+    # No range known – exact evaluation kept; static methods untouched.
+    assert not hasattr(tabulated["D93-20 A"].eval_r, "lookup")
+    assert tabulated["D56-22 HT"] is methods["D56-22 HT"]
+
+
+def test_lookup_stays_within_error_bound(tabulated):
+    for method in tabulated.values():
+        for evaluator in (method.eval_r, method.eval_R):
+            lookup = getattr(evaluator, "lookup", None)
+            if lookup is not None:
+                assert lookup.observed_error <= lookup.max_error
+                assert lookup.check() <= default_error_bound(method.decimals)
+
+
+def test_grid_is_refined_for_tight_bounds():
+    coarse = build_lookup("0.5797 * avg**0.75", 0.5, 400.0, resolution=0.01, max_error=5e-4)
+    fine = build_lookup("0.5797 * avg**0.75", 0.5, 400.0, resolution=0.01, max_error=1e-7)
+    assert fine.step < coarse.step
+    assert fine.check() <= 1e-7
+
+
+def test_bound_holds_for_sqrt_from_zero():
+    # The interpolation error of a concave power near 0 peaks off the midpoint.
+    lookup = build_lookup("sqrt(avg)", 0.0, 10.0, resolution=0.01, max_error=1e-3)
+    assert lookup.check() <= 1e-3
+    x = np.linspace(0.0, 4 * lookup.step, 10_001)
+    assert np.max(np.abs(lookup.evaluate_array(x) - np.sqrt(x))) <= 1e-3
+
+
+def test_table_size_is_capped():
+    with pytest.raises(ValueError):
+        build_lookup("12 * avg**0.5", 50.0, 500.0, resolution=1.0, max_error=1e-12, max_points=10_000)
+
+
+def test_outside_range_falls_back_to_exact():
+    lookup = build_lookup("12 * avg**0.5", 50.0, 500.0, resolution=1.0, max_error=0.05)
+    assert lookup(1000.0) == 12 * 1000.0 ** 0.5
+    assert lookup(10.0) == 12 * 10.0 ** 0.5
+    assert math.isnan(lookup(math.nan))
+
+
+def test_calc_tolerance_uses_table_within_bound(methods, tabulated):
+    exact = calc_tolerance(methods["D5453-23 (< 400 mg/kg S)"], 101.3, 103.9)
+    fast = calc_tolerance(tabulated["D5453-23 (< 400 mg/kg S)"], 101.3, 103.9)
+    bound = default_error_bound(2)
+    assert fast["r"] == pytest.approx(exact["r"], abs=bound)
+    assert fast["R"] == pytest.approx(exact["R"], abs=bound)
+
+
+def test_batch_path_matches_scalar_lookup(tabulated):
+    method = tabulated["D4294-21 (mg/kg)"]
+    rng = np.random.default_rng(3)
+    v1 = rng.uniform(20.0, 600.0, 2_000)
+    v2 = v1 + rng.normal(0.0, 5.0, v1.size)
+    batch = calc_tolerance_batch(method, v1, v2)
+    for i in range(0, v1.size, 97):
+        scalar = calc_tolerance(method, float(v1[i]), float(v2[i]))
+        assert batch.r[i] == scalar["r"]
+        assert batch.R[i] == scalar["R"]
+
+
+def test_explicit_range_and_bound():
+    method = Method(
+        name="D93-20 A", r=None, R=None, unit="°C",
+        formula_r="(0.029 * avg)", formula_R="(0.071 * avg)",
+        decimals=1, lower=None, upper=None,
+    )
+    with pytest.raises(ValueError):
+        tabulate_method(method)
+    fast = tabulate_method(method, max_error=1e-3, range_override=(40.0, 370.0))
+    assert fast.eval_R.lookup.max_error == 1e-3
+    assert fast.eval_R(123.45) == pytest.approx(0.071 * 123.45, abs=1e-3)
+    assert fast == method
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from core import load_methods
+from core.parallel import evaluate_csv_parallel, main, plan_shards
+from core.stream import evaluate_csv_file
+
+METHODS_PATH = "methods_enriched.csv"
+NAMES = ["D93-20 A", "D445-24 (Diesel @ 40°C)", "D86-23 IBP (Gasoline)", "D5453-23 (< 400 mg/kg S)", "BOGUS"]
+
+
+def _write_input(path, rows):
+    rng = random.Random(1)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Method,V1,V2\n")
+        for _ in range(rows):
+            v = rng.uniform(0.1, 450)
+            f.write(f"{rng.choice(NAMES)},{v:.3f},{v + rng.gauss(0, 1):.3f}\n")
+        f.write("D93-20 A,60\n\n")
+
+
+def test_shards_cover_body_on_line_boundaries(tmp_path):
+    src = tmp_path / "in.csv"
+    _write_input(src, 500)
+    data = src.read_bytes()
+    header, ranges = plan_shards(src, 7)
+    assert header == data[:data.index(b"\n") + 1]
+    assert ranges[0][0] == len(header) and ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start and data[start - 1:start] == b"\n"
+
+
+def test_parallel_output_matches_serial(tmp_path):
+    src = tmp_path / "in.csv"
+    _write_input(src, 3000)
+    serial = tmp_path / "serial.csv"
+    parallel = tmp_path / "parallel.csv"
+    evaluate_csv_file(src, serial, load_methods(METHODS_PATH), chunk_size=500)
+    stats = evaluate_csv_parallel(src, parallel, METHODS_PATH, workers=2, chunk_size=256)
+    assert stats.rows == 3001
+    assert parallel.read_bytes() == serial.read_bytes()
+
+
+def test_zero_workers_is_an_error(tmp_path):
+    src = tmp_path / "in.csv"
+    _write_input(src, 10)
+    with pytest.raises(ValueError):
+        evaluate_csv_parallel(src, tmp_path / "out.csv", METHODS_PATH, workers=0)
+    with pytest.raises(SystemExit) as exc:
+        main([str(src), str(tmp_path / "out.csv"), "--workers", "0"])
+    assert exc.value.code == 2
@@ -0,0 +1,135 @@
+import sqlite3
+from dataclasses import fields
+
+import numpy as np
+import pytest
+
+from core import Method, calc_tolerance, calc_tolerance_bulk, load_methods
+from core.batch import STATUS_FORMULA_ERROR, STATUS_INVALID_VALUE, STATUS_OK, STATUS_UNKNOWN_METHOD
+from core.formula import FormulaError, compile_formula
+from core.pushdown import SqlEvaluator, formula_to_sql, main
+from core.stream import evaluate_rows
+
+METHODS = load_methods("methods_enriched.csv")
+
+
+def _connect(dialect):
+    if dialect == "duckdb":
+        return pytest.importorskip("duckdb").connect()
+    return sqlite3.connect(":memory:")
+
+
+def _pairs_db(n=20_000, seed=0, dialect="sqlite"):
+    rng = np.random.default_rng(seed)
+    names = list(METHODS) + ["Nope"]
+    method = [names[i] for i in rng.integers(0, len(names), n)]
+    v1 = rng.uniform(0, 400, n)
+    v2 = v1 + rng.normal(0, 3, n)
+    v2[::97] = np.nan
+    conn = _connect(dialect)
+    conn.execute("CREATE TABLE pairs (method TEXT, v1 DOUBLE, v2 DOUBLE)")
+    conn.executemany(
+        "INSERT INTO pairs VALUES (?, ?, ?)",
+        zip(method, v1.tolist(), [None if np.isnan(x) else x for x in v2.tolist()]),
+    )
+    return conn, method, v1, v2
+
+
+def _custom(name, formula_r, formula_R="0.5"):
+    return Method(name=name, r=None, R=None, unit="x", formula_r=formula_r, formula_R=formula_R,
+                  decimals=2, lower=None, upper=None)
+
+
+@pytest.mark.parametrize("dialect", ["sqlite", "duckdb"])
+def test_matches_python_paths_exactly(dialect):
+    conn, method, v1, v2 = _pairs_db(dialect=dialect)
+    # No order_by: results come back in input order by default.
+    res = SqlEvaluator(conn, METHODS).evaluate("pairs")
+    bulk = calc_tolerance_bulk(METHODS, method, v1, v2)
+
+    for f in fields(bulk):
+        if f.name not in ("avg", "diff", "r", "R", "tolerance_075R"):
+            np.testing.assert_array_equal(getattr(res, f.name), getattr(bulk, f.name), err_msg=f.name)
+        else:
+            np.testing.assert_allclose(getattr(res, f.name), getattr(bulk, f.name), rtol=1e-15, err_msg=f.name)
+    assert {STATUS_OK, STATUS_INVALID_VALUE, STATUS_UNKNOWN_METHOD} <= set(res.status.tolist())
+
+    # Bit-identical to the scalar path wherever it returns a result.
+    checked = 0
+    for i in np.flatnonzero(res.status == STATUS_OK)[:3_000]:
+        expected = calc_tolerance(METHODS[method[i]], v1[i], v2[i])
+        for key in ("avg", "diff", "r", "R", "tolerance_075R"):
+            assert getattr(res, key)[i] == expected[key]
+        checked += 1
+    assert checked == 3_000
+
+
+@pytest.mark.parametrize("formula", [
+    "sqrt(avg) * 0.5 + log(avg, 10)",
+    "-avg % 3 + avg % -7",
+    "exp(avg / 100) - abs(avg - 50)",
+    "pow(avg, 2) / 7 - log(avg)",
+    "3 / 2 * avg",
+])
+def test_formula_translation(formula):
+    conn = sqlite3.connect(":memory:")
+    compiled = compile_formula(formula)
+    for avg in (0.5, 12.25, 61.0, 399.9):
+        (value,) = conn.execute(f"SELECT {formula_to_sql(formula, repr(avg))}").fetchone()
+        assert value == compiled(avg)
+    with pytest.raises(FormulaError):
+        formula_to_sql("pow(avg, 2, 3)")
+
+
+def test_generic_and_broken_formulas():
+    methods = {"generic": _custom("generic", "0.1 * sqrt(avg + 4)"), "broken": _custom("broken", "avg +")}
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (m TEXT, a REAL, b REAL)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?)",
+                     [("generic", 60, 61), ("generic", -20, -21), ("broken", 1, 2), ("broken", 1, None)])
+    res = SqlEvaluator(conn, methods).evaluate("t", method="m", v1="a", v2="b", order_by="rowid")
+    assert res.r[0] == calc_tolerance(methods["generic"], 60, 61)["r"]
+    # sqrt of a negative: a formula error, as in the bulk path.
+    assert np.isnan(res.r[1]) and res.status[1] == STATUS_FORMULA_ERROR and not res.r_pass[1]
+    bulk = calc_tolerance_bulk(methods, ["generic"], [-20.0], [-21.0])
+    assert bulk.status[0] == STATUS_FORMULA_ERROR and res.avg[1] == bulk.avg[0]
+    assert res.status.tolist()[2:] == [STATUS_FORMULA_ERROR, STATUS_INVALID_VALUE]
+    assert np.isnan(res.avg[2]) and res.unit[2] == "x"
+
+
+def test_materialize_summary_and_cli(tmp_path):
+    conn, method, v1, v2 = _pairs_db(2_000)
+    evaluator = SqlEvaluator(conn, METHODS)
+    assert evaluator.materialize("checked", "pairs", where="method LIKE ?", params=["D5453%"]) == sum(
+        name.startswith("D5453") for name in method)
+    failures = conn.execute("SELECT count(*) FROM checked WHERE status = 0 AND NOT reproducibility_pass").fetchone()[0]
+    summary = {row["method"]: row for row in evaluator.summary("pairs")}
+    assert sum(row["rows"] for row in summary.values()) == 2_000
+    assert sum(summary[m]["reproducibility_fail"] for m in summary if m.startswith("D5453")) == failures
+
+    db = tmp_path / "lab.db"
+    file_conn = sqlite3.connect(db)
+    file_conn.execute("CREATE TABLE duplicates (method TEXT, first REAL, second REAL)")
+    file_conn.execute("INSERT INTO duplicates VALUES ('D93-20 A', 60, 61)")
+    file_conn.commit()
+    file_conn.close()
+    assert main([str(db), "duplicates", "--v1-column", "first", "--v2-column", "second", "--into", "out"]) == 0
+    row = sqlite3.connect(db).execute("SELECT repeatability, repeatability_pass FROM out").fetchone()
+    assert row == (calc_tolerance(METHODS["D93-20 A"], 60, 61)["r"], 1)
+
+
+def test_non_numeric_cells_are_invalid_like_the_stream_path():
+    cells = [("D93-20 A", "abc", "0.1"), ("D93-20 A", "", "0.2"), ("D93-20 A", "60", "61"),
+             ("D93-20 A", " 60.5 ", "61"), ("D93-20 A", "12abc", "12"), ("D93-20 A", "nan", "1"),
+             ("D93-20 A", 60, 61.5), ("D93-20 A", None, 61), ("Nope", "abc", "1")]
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE raw (method, v1, v2)")  # no affinity: cells stay as given
+    conn.executemany("INSERT INTO raw VALUES (?, ?, ?)", cells)
+    res = SqlEvaluator(conn, METHODS).evaluate("raw", order_by="rowid")
+
+    rows = [(m, "" if a is None else str(a), str(b)) for m, a, b in cells]
+    _, _, _, bulk = evaluate_rows(METHODS, rows)
+    np.testing.assert_array_equal(res.status, bulk.status)
+    np.testing.assert_array_equal(res.r_pass, bulk.r_pass)
+    assert res.status.tolist()[:2] == [STATUS_INVALID_VALUE] * 2
+    np.testing.assert_array_equal(res.r, bulk.r)
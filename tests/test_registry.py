@@ -0,0 +1,44 @@
+import os
+import shutil
+
+import pytest
+
+from core.registry import MethodRegistry, get_registry
+
+
+@pytest.fixture
+def csv_copy(tmp_path):
+    dst = tmp_path / "methods_enriched.csv"
+    shutil.copy("methods_enriched.csv", dst)
+    return dst
+
+
+def test_lookup_by_name_and_label(csv_copy):
+    reg = MethodRegistry(csv_copy)
+    method = reg.get("D93-20 A")
+    assert method is not None and reg.by_label(method.display_label) == method
+    assert "D93-20 A" in reg and len(reg) == len(reg.names())
+    with pytest.raises(TypeError):
+        reg.methods["new"] = method
+
+
+def test_edits_are_picked_up_after_poll_interval(csv_copy):
+    reg = MethodRegistry(csv_copy, poll_interval=0.0)
+    before = reg.methods
+    with csv_copy.open("a", encoding="utf-8") as f:
+        f.write("ZZ-1,1,2,°C,,,1,,,added,2026,,,\n")
+    st = csv_copy.stat()
+    os.utime(csv_copy, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert "ZZ-1" in reg
+    assert "ZZ-1" not in before  # old snapshot is untouched
+
+
+def test_failed_reload_keeps_previous_catalog(csv_copy):
+    reg = MethodRegistry(csv_copy, poll_interval=3600)
+    csv_copy.unlink()
+    assert reg.refresh(force=True) is False
+    assert "D93-20 A" in reg
+
+
+def test_get_registry_is_shared(csv_copy):
+    assert get_registry(csv_copy) is get_registry(str(csv_copy))
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from core import Method, calc_replicates, calc_replicates_long, calc_tolerance, load_methods
+from core.batch import (
+    STATUS_FORMULA_ERROR,
+    STATUS_GROUP_SIZE,
+    STATUS_INVALID_VALUE,
+    STATUS_OK,
+    STATUS_OUT_OF_RANGE,
+    STATUS_UNKNOWN_METHOD,
+)
+from core.replicate import critical_range_factor
+
+METHODS = load_methods("methods_enriched.csv")
+
+
+def test_pairs_match_calc_tolerance():
+    rng = np.random.default_rng(1)
+    v1 = rng.uniform(5, 300, 500)
+    v2 = v1 + rng.normal(0, 3, 500)
+    names = ["D93-20 A", "D56-22 HT", "D5453-23 (< 400 mg/kg S)"] * 166 + ["D93-20 A"] * 2
+    res = calc_replicates(METHODS, names, np.column_stack([v1, v2]).ravel(), np.arange(0, 1001, 2))
+    for i in range(500):
+        expected = calc_tolerance(METHODS[names[i]], v1[i], v2[i])
+        assert res.r_pass[i] == expected["r_pass"] and res.R_pass[i] == expected["R_pass"]
+        assert res.critical_range_r[i] == pytest.approx(expected["r"])
+        assert res.range[i] == pytest.approx(expected["diff"])
+
+
+def test_critical_range_for_larger_sets():
+    values = [60.0, 61.5, 62.2, 59.0, 61.0, 60.4]
+    res = calc_replicates(METHODS, ["D93-20 A", "D56-22 HT"], values, [0, 3, 6])
+    mean = np.mean(values[:3])
+    assert res.n.tolist() == [3, 3]
+    assert res.mean[0] == pytest.approx(mean) and res.range[0] == pytest.approx(2.2)
+    # σr = r / 2.8 with r = 0.029 · mean; CR = f(3) · σr.
+    assert res.critical_range_r[0] == pytest.approx(3.3 * 0.029 * mean / 2.8)
+    assert res.critical_range_R[1] == pytest.approx(3.3 * 5.8 / 2.8)
+    assert res.r_pass.tolist() == [False, False] and res.R_pass.tolist() == [True, True]
+    assert res.row(1)["critical_range_r"] == pytest.approx(3.3 * 1.6 / 2.8)
+    assert critical_range_factor(4) == 3.6
+    with pytest.raises(ValueError):
+        critical_range_factor(41)
+
+
+def test_statuses_and_ragged_edges():
+    groups = [
+        ("D93-20 A", [60, 61, 60.5, 60.2]),
+        ("D56-22 HT", [3.0, 5.0, 5.5]),  # below the 4.0 lower limit
+        ("Nope", [1, 2]),
+        ("D93-20 A", [60]),
+        ("D93-20 A", []),
+        ("D93-20 A", [60.0] * 41),
+        ("D93-20 A", [60, float("nan"), 61]),
+    ]
+    names = [g[0] for g in groups]
+    values = [v for g in groups for v in g[1]]
+    offsets = np.concatenate(([0], np.cumsum([len(g[1]) for g in groups])))
+    res = calc_replicates(METHODS, names, values, offsets)
+    assert res.status.tolist() == [
+        STATUS_OK, STATUS_OUT_OF_RANGE, STATUS_UNKNOWN_METHOD,
+        STATUS_GROUP_SIZE, STATUS_GROUP_SIZE, STATUS_GROUP_SIZE, STATUS_INVALID_VALUE,
+    ]
+    assert res.r_pass.tolist() == [True] + [False] * 6
+    assert res.n.tolist() == [4, 3, 2, 1, 0, 41, 3]
+    assert res.unit[2] == "" and res.decimals[2] == -1
+
+    with pytest.raises(ValueError):
+        calc_replicates(METHODS, ["D93-20 A"], [1, 2, 3], [0, 2])
+    with pytest.raises(ValueError):
+        calc_replicates(METHODS, ["D93-20 A", "D93-20 A"], [1, 2, 3], [0, 2, 1])
+
+
+def test_formula_domain_errors_are_formula_errors():
+    sqrt = Method(name="S", r=None, R=None, unit="u", formula_r="0.1 * sqrt(avg)", formula_R="0.2 * sqrt(avg)",
+                  decimals=2, lower=None, upper=None)
+    res = calc_replicates({"S": sqrt}, ["S", "S", "S"], [-4.0, -4.0, 4.0, 4.1, np.nan, 1.0], [0, 2, 4, 6])
+    assert res.status.tolist() == [STATUS_FORMULA_ERROR, STATUS_OK, STATUS_INVALID_VALUE]
+    assert np.isnan(res.r[0]) and np.isnan(res.critical_range_r[0])
+    assert not res.r_pass[0] and not res.R_pass[0]
+
+
+def test_long_table_groups_by_method_and_key():
+    rows = [
+        ("D93-20 A", "S2", 70.0),
+        ("D93-20 A", "S1", 60.0),
+        ("D56-22 HT", "S1", 40.0),
+        ("D93-20 A", "S2", 71.0),
+        ("D93-20 A", "S1", 61.0),
+        ("D93-20 A", "S1", 60.5),
+        ("D56-22 HT", "S1", 40.5),
+    ]
+    keys, res = calc_replicates_long(METHODS, *zip(*rows))
+    assert keys.tolist() == ["S2", "S1", "S1"]
+    assert res.method_name.tolist() == ["D93-20 A", "D93-20 A", "D56-22 HT"]
+    assert res.n.tolist() == [2, 3, 2]
+    assert res.mean.tolist() == pytest.approx([70.5, 60.5, 40.25])
+
+    # Numeric keys, shuffled rows: same groups as the offsets form.
+    rng = np.random.default_rng(2)
+    sizes = rng.integers(2, 7, 1_000)
+    values = rng.normal(50, 1, sizes.sum())
+    names = np.array(["D93-20 A", "D5453-23 (< 400 mg/kg S)"] * 500, dtype=object)
+    direct = calc_replicates(METHODS, names, values, np.concatenate(([0], np.cumsum(sizes))))
+    perm = rng.permutation(len(values))
+    keys, res = calc_replicates_long(
+        METHODS, np.repeat(names, sizes)[perm], np.repeat(np.arange(1_000), sizes)[perm], values[perm]
+    )
+    back = np.argsort(keys)
+    np.testing.assert_allclose(res.range[back], direct.range)
+    np.testing.assert_array_equal(res.R_pass[back], direct.R_pass)
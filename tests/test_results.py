@@ -0,0 +1,117 @@
+import io
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from core import calc_tolerance_bulk, load_methods
+from core.batch import STATUS_OK
+from core.cli import run
+from core.results import COLUMNS, ResultStore
+
+METHODS = load_methods("methods_enriched.csv")
+NAMES = ["D93-20 A", "D5453-23 (< 400 mg/kg S)", "D5453-23 (> 400 mg/kg S)", "D56-22 HT", "Nope"]
+
+
+def _data(n=5_000, seed=0):
+    rng = np.random.default_rng(seed)
+    names = [NAMES[i] for i in rng.integers(0, len(NAMES), n)]
+    v1 = rng.uniform(20, 120, n)
+    v2 = v1 + rng.normal(0, 8, n)
+    v2[::97] = np.nan
+    # Spread over February to April 2026.
+    ts = np.linspace(datetime(2026, 2, 1).timestamp(), datetime(2026, 4, 30).timestamp(), n)
+    return names, v1, v2, ts
+
+
+def test_round_trip_is_exact_and_memory_mapped(tmp_path):
+    names, v1, v2, ts = _data()
+    bulk = calc_tolerance_bulk(METHODS, names, v1, v2)
+    with ResultStore(tmp_path / "run.mpcr", mode="a") as store:
+        assert store.append(names, v1, v2, bulk, timestamp=ts) == len(names)
+
+    store = ResultStore(tmp_path / "run.mpcr")
+    assert len(store) == len(names)
+    assert isinstance(store["R"], np.memmap) and not store["R"].flags.writeable
+    np.testing.assert_array_equal(store["v2"], v2)
+    for column in ("avg", "diff", "r", "R", "tolerance_075R", "status"):
+        np.testing.assert_array_equal(store[column], getattr(bulk, column))
+    assert [store.methods[i] for i in store["method_id"]] == names
+
+    (row,) = store.rows([3])
+    assert row["method_name"] == names[3] and row["R_pass"] == bool(bulk.R_pass[3])
+    assert row["status"] in ("ok", "out of range", "unknown method", "invalid value")
+
+
+def test_select_matches_brute_force(tmp_path):
+    names, v1, v2, ts = _data()
+    store = ResultStore(tmp_path / "run.mpcr", mode="a")
+    store.append_rows(METHODS, names, v1, v2, timestamp=ts)
+
+    march = store.select(method_prefix="D5453", R_pass=False,
+                         since=datetime(2026, 3, 1), until=datetime(2026, 4, 1))
+    bulk = calc_tolerance_bulk(METHODS, names, v1, v2)
+    expected = [
+        i for i in range(len(names))
+        if names[i].startswith("D5453") and bulk.status[i] == STATUS_OK and not bulk.R_pass[i]
+        and datetime(2026, 3, 1).timestamp() <= ts[i] < datetime(2026, 4, 1).timestamp()
+    ]
+    assert len(expected) > 0
+    assert march.tolist() == expected
+    assert store.select(method=["Nope"]).size == names.count("Nope")
+    assert store.select(method="never stored").size == 0
+
+
+def test_reader_refresh_and_torn_tail(tmp_path):
+    path = tmp_path / "run.mpcr"
+    names, v1, v2, _ = _data(100)
+    writer = ResultStore(path, mode="a")
+    writer.append_rows(METHODS, names[:50], v1[:50], v2[:50])
+    writer.flush()
+    reader = ResultStore(path)
+    assert len(reader) == 50
+    writer.append_rows(METHODS, names[50:], v1[50:], v2[50:])
+    writer.close()
+    assert reader.refresh() == 100 and len(reader["avg"]) == 100
+
+    # A half-written row (interrupted append) is ignored and dropped on reopen.
+    with open(path / "avg.bin", "ab") as f:
+        f.write(b"\0" * 5)
+    assert len(ResultStore(path)) == 100
+    ResultStore(path, mode="a").close()
+    assert (path / "avg.bin").stat().st_size == 100 * COLUMNS["avg"].itemsize
+
+
+def test_read_only_and_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ResultStore(tmp_path / "missing")
+    ResultStore(tmp_path / "s", mode="a").close()
+    store = ResultStore(tmp_path / "s")
+    assert len(store) == 0 and store.select(R_pass=False).size == 0
+    with pytest.raises(ValueError):
+        store.append_rows(METHODS, ["D93-20 A"], [60], [61])
+
+
+def test_parquet_export(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    names, v1, v2, ts = _data(500)
+    store = ResultStore(tmp_path / "run.mpcr", mode="a")
+    store.append_rows(METHODS, names, v1, v2, timestamp=ts)
+    failures = store.select(R_pass=False)
+    store.write_parquet(tmp_path / "failures.parquet", failures)
+    table = pq.read_table(tmp_path / "failures.parquet")
+    assert table.num_rows == len(failures)
+    assert table.column("method").to_pylist() == [names[i] for i in failures]
+    assert not any(table.column("R_pass").to_pylist())
+
+
+def test_cli_store_keeps_unrounded_results(tmp_path):
+    path = tmp_path / "pairs.csv"
+    path.write_text("Method,V1,V2\n" + "".join(f"D93-20 A,{60 + i / 7},{61 + i / 11}\n" for i in range(300)))
+    for workers in (1, 2):
+        store_dir = tmp_path / f"store{workers}"
+        run([str(path)], io.StringIO(), "methods_enriched.csv", workers=workers, chunk_size=64, store=str(store_dir))
+        store = ResultStore(store_dir)
+        assert len(store) == 300
+        np.testing.assert_array_equal(store["v1"], [60 + i / 7 for i in range(300)])
+        assert store.methods == ["D93-20 A"]
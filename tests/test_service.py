@@ -0,0 +1,151 @@
+import asyncio
+import csv
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from core import calc_tolerance, load_methods
+from core.registry import get_registry
+from core.service import PrecisionService
+from core.stream import OUTPUT_COLUMNS, evaluate_chunk, json_row
+
+ROOT = Path(__file__).resolve().parent.parent
+METHODS = str(ROOT / "methods_enriched.csv")
+
+
+def call(app, method, path, body=None, headers=()):
+    """Run one request through the ASGI *app* in-process; return (status, headers, chunks)."""
+    data = b"" if body is None else (body if isinstance(body, bytes) else json.dumps(body).encode())
+    # Deliver the body in two parts to exercise ``more_body``.
+    inbox = [
+        {"type": "http.request", "body": data[: len(data) // 2], "more_body": True},
+        {"type": "http.request", "body": data[len(data) // 2:], "more_body": False},
+    ]
+    sent = []
+
+    async def receive():
+        return inbox.pop(0) if inbox else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "headers": list(headers), "query_string": b""}
+    asyncio.run(app(scope, receive, send))
+    start, *bodies = sent
+    assert start["type"] == "http.response.start"
+    assert not bodies[-1].get("more_body", False)
+    return start["status"], dict(start["headers"]), [m["body"] for m in bodies if m["body"]]
+
+
+@pytest.fixture(scope="module")
+def app():
+    return PrecisionService(METHODS, chunk_size=4)
+
+
+def test_lifespan_loads_the_shared_registry_once():
+    app = PrecisionService(METHODS)
+    inbox = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return inbox.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    asyncio.run(app({"type": "lifespan"}, receive, send))
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert app.registry is get_registry(METHODS)
+    status, _, (body,) = call(app, "GET", "/health")
+    assert status == 200 and json.loads(body)["methods"] == len(get_registry(METHODS))
+
+
+def test_single_pair_matches_calc_tolerance(app):
+    status, headers, (body,) = call(app, "POST", "/check", {"method": "D93-20 A", "v1": 60, "v2": "61"})
+    assert status == 200 and headers[b"content-type"] == b"application/json"
+    expected = calc_tolerance(load_methods(METHODS)["D93-20 A"], 60.0, 61.0)
+    assert json.loads(body) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("payload, status", [
+    ({"method": "Nope", "v1": 1, "v2": 2}, 404),
+    ({"method": "D56-22 HT", "v1": 1, "v2": 2}, 422),  # below the method's lower limit
+    ({"method": "D93-20 A", "v1": "x", "v2": 2}, 422),
+    ([1, 2], 400),
+    (b"{not json", 400),
+])
+def test_single_pair_errors(app, payload, status):
+    got, _, (body,) = call(app, "POST", "/check", payload)
+    assert got == status
+    assert "error" in json.loads(body)
+
+
+def test_routing_errors(app):
+    assert call(app, "GET", "/nowhere")[0] == 404
+    assert call(app, "GET", "/check")[0] == 405
+
+
+def test_batch_streams_json_lines_in_chunks(app):
+    pairs = [{"method": "D93-20 A", "v1": 60 + i, "v2": 61 + i} for i in range(9)]
+    pairs += [["D56-22 HT", 40, 40.5], ["Nope", 1, 2], {"method": "D93-20 A", "v1": "x", "v2": 1}]
+    status, headers, chunks = call(app, "POST", "/check/batch", {"pairs": pairs})
+    assert status == 200 and headers[b"content-type"] == b"application/x-ndjson"
+    assert len(chunks) == 3  # 12 pairs, 4 per chunk
+    rows = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+    text_rows = [(p["method"], str(p["v1"]), str(p["v2"])) if isinstance(p, dict) else tuple(map(str, p))
+                 for p in pairs]
+    assert rows == [json_row(r) for r in evaluate_chunk(load_methods(METHODS), text_rows)]
+    assert [r["Status"] for r in rows[-3:]] == ["ok", "unknown method", "invalid value"]
+
+
+def test_batch_csv_with_default_method(app):
+    body = {"method": "D93-20 A", "pairs": [[60, 61], {"v1": 70, "v2": 75}]}
+    status, headers, chunks = call(app, "POST", "/check/batch", body, headers=[(b"accept", b"text/csv")])
+    assert status == 200 and headers[b"content-type"].startswith(b"text/csv")
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == OUTPUT_COLUMNS
+    assert [(r[0], r[9]) for r in rows[1:]] == [("D93-20 A", "PASS"), ("D93-20 A", "FAIL")]
+
+
+def test_batch_rejects_malformed_and_oversized_bodies():
+    app = PrecisionService(METHODS, max_body_bytes=100)
+    assert call(app, "POST", "/check/batch", {"pairs": [[1, 2]]})[0] == 400  # no method for [v1, v2]
+    assert call(app, "POST", "/check/batch", {"rows": []})[0] == 400
+    assert call(app, "POST", "/check/batch", {"pairs": [["D93-20 A", 1, 2]] * 20})[0] == 413
+
+
+@pytest.mark.parametrize("accept", [b"application/x-ndjson", b"text/csv"])
+def test_batch_failure_mid_stream_aborts_the_response(monkeypatch, accept):
+    import core.service
+
+    real = core.service.encode_chunk
+    calls = []
+
+    def failing(*args):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("boom")
+        return real(*args)
+
+    monkeypatch.setattr(core.service, "encode_chunk", failing)
+    app = PrecisionService(METHODS, chunk_size=2)
+    data = json.dumps({"pairs": [["D93-20 A", 60, 61]] * 6}).encode()
+    inbox = [{"type": "http.request", "body": data, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return inbox.pop(0) if inbox else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/check/batch", "headers": [(b"accept", accept)],
+             "query_string": b""}
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(app(scope, receive, send))
+    assert [m["type"] for m in sent].count("http.response.start") == 1
+    assert sent[-1].get("more_body") is True  # never completed
+    if accept != b"text/csv":
+        assert json.loads(sent[-1]["body"]) == {"error": "Internal server error", "pairs_sent": 2}
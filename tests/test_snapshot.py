@@ -0,0 +1,65 @@
+import os
+import shutil
+
+from core import load_methods
+import core.snapshot as snapshot
+from core.snapshot import load_methods_cached, snapshot_path_for
+
+
+def _copy_registry(tmp_path, name="methods.csv"):
+    dst = tmp_path / name
+    shutil.copy(name, dst)
+    return dst
+
+
+def test_snapshot_round_trip_equals_csv_load(tmp_path):
+    src = _copy_registry(tmp_path)
+    first = load_methods_cached(src)
+    assert snapshot_path_for(src).is_file()
+    second = load_methods_cached(src)
+    assert first == second == load_methods(src)
+    assert second["D93-20 A"].eval_r is not None
+
+
+def test_fresh_snapshot_skips_csv_parsing(tmp_path, monkeypatch):
+    src = _copy_registry(tmp_path, "methods_enriched.csv")
+    load_methods_cached(src)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("CSV should not be parsed")
+
+    monkeypatch.setattr(snapshot, "load_methods", fail)
+    monkeypatch.setattr(snapshot, "_file_hash", fail)
+    assert "D5453-23 (< 400 mg/kg S)" in load_methods_cached(src)
+
+
+def test_touched_file_reuses_rows_and_edited_file_rebuilds(tmp_path, monkeypatch):
+    src = _copy_registry(tmp_path, "methods_enriched.csv")
+    load_methods_cached(src)
+    st = src.stat()
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    monkeypatch.setattr(snapshot, "load_methods", lambda p: (_ for _ in ()).throw(AssertionError))
+    assert "D93-20 A" in load_methods_cached(src)
+    monkeypatch.undo()
+
+    with src.open("a", encoding="utf-8") as f:
+        f.write("ZZ-NEW,1,2,°C,,,1,,,added,2026,,,\n")
+    assert load_methods_cached(src)["ZZ-NEW"].R == 2.0
+
+
+def test_corrupt_snapshot_is_rebuilt(tmp_path):
+    src = _copy_registry(tmp_path)
+    snapshot_path_for(src).write_bytes(b"not a pickle")
+    assert load_methods_cached(src) == load_methods(src)
+
+
+def test_snapshot_of_another_parser_version_is_rebuilt(tmp_path, monkeypatch):
+    src = _copy_registry(tmp_path)
+    load_methods_cached(src)
+    # Same CSV (size, mtime and hash), but rows built by a different parser.
+    monkeypatch.setattr(snapshot, "_FORMAT", "other")
+    parsed = []
+    monkeypatch.setattr(snapshot, "load_methods", lambda p: parsed.append(p) or load_methods(p))
+    assert load_methods_cached(src) == load_methods(src)
+    assert parsed == [src]
+    assert load_methods_cached(src) and parsed == [src]
@@ -0,0 +1,79 @@
+"""Cold-start guards: ``import core`` stays cheap and free of side effects."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Self time of all ``core`` modules in ``-X importtime`` (µs), best of a few runs
+# (typically ~3 ms). Wall-clock budgets are flaky on shared CI runners, so the
+# check only runs when MPC_TIMING_TESTS=1; the module and side-effect checks
+# always run.
+CORE_IMPORT_BUDGET_US = 30_000
+TIMING_TESTS = os.environ.get("MPC_TIMING_TESTS") == "1"
+
+HEAVY_MODULES = ["numpy", "pandas", "streamlit", "tkinter", "sqlite3", "csv", "core.formula"]
+
+
+def _python(code, *args):
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # measure with cached bytecode, as in production
+    proc = subprocess.run([sys.executable, *args, "-c", code], capture_output=True, text=True, cwd=ROOT, env=env)
+    assert proc.returncode == 0, proc.stderr
+    return proc
+
+
+def test_import_core_has_no_side_effects():
+    code = (
+        "import json, logging, sys\n"
+        "opened = []\n"
+        "sys.addaudithook(lambda event, args: event == 'open' and opened.append(str(args[0])))\n"
+        "root = logging.getLogger(); handlers, level = list(root.handlers), root.level\n"
+        "import core\n"
+        "print(json.dumps({\n"
+        "    'modules': sorted(sys.modules),\n"
+        "    'opened': [p for p in opened if not p.endswith(('.py', '.pyc'))],\n"
+        "    'logging': root.handlers == handlers and root.level == level,\n"
+        "}))\n"
+    )
+    _python("import core")  # warm the bytecode cache (writing it is not a side effect of core)
+    report = json.loads(_python(code).stdout)
+    loaded = set(report["modules"])
+    assert not loaded & set(HEAVY_MODULES), sorted(loaded & set(HEAVY_MODULES))
+    assert [m for m in loaded if m.startswith("core.")] == []
+    assert report["logging"]
+    # Only module sources / bytecode and package directories are read.
+    assert all(Path(p).is_dir() for p in report["opened"]), report["opened"]
+
+
+@pytest.mark.skipif(not TIMING_TESTS, reason="timing budget; set MPC_TIMING_TESTS=1 to run")
+def test_import_core_is_fast():
+    _python("import core")  # warm the bytecode cache
+    best = None
+    for _ in range(5):
+        lines = _python("import core", "-X", "importtime").stderr.splitlines()
+        total = 0
+        for line in lines:
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            self_us, _cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+            if name == "core" or name.startswith("core."):
+                total += int(self_us)
+        best = total if best is None else min(best, total)
+    assert best < CORE_IMPORT_BUDGET_US, f"import core took {best} µs (budget {CORE_IMPORT_BUDGET_US} µs)"
+
+
+def test_gui_import_builds_no_window():
+    code = (
+        "import sys, tkinter\n"
+        "import tolerance_calculator_gui as gui\n"
+        "assert tkinter._default_root is None\n"
+        "assert 'core.registry' not in sys.modules\n"
+        "assert callable(gui.main)\n"
+    )
+    _python(code)
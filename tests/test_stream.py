@@ -0,0 +1,75 @@
+import csv
+import io
+
+from core import load_methods
+from core.results import ResultStore
+from core.stream import OUTPUT_COLUMNS, evaluate_csv_file, evaluate_stream
+
+METHODS = load_methods("methods_enriched.csv")
+
+INPUT = """Sample,Method,V1,V2
+a,D93-20 A,60.0,61.0
+b,D86-23 IBP (Gasoline),35.0,40.0
+c,UNKNOWN,1,2
+d,D5453-23 (< 400 mg/kg S),abc,10
+e,D56-22 HT,30,31
+"""
+
+
+def _run(chunk_size):
+    out = io.StringIO()
+    stats = evaluate_stream(io.StringIO(INPUT), out, METHODS, chunk_size=chunk_size)
+    return stats, list(csv.reader(io.StringIO(out.getvalue())))
+
+
+def test_stream_output_is_independent_of_chunk_size():
+    stats1, rows1 = _run(chunk_size=1)
+    stats2, rows2 = _run(chunk_size=1000)
+    assert rows1 == rows2
+    assert (stats1.rows, stats1.chunks) == (5, 5)
+    assert (stats2.rows, stats2.chunks) == (5, 1)
+
+
+def test_stream_rows_and_statuses():
+    _, rows = _run(chunk_size=2)
+    assert rows[0] == OUTPUT_COLUMNS
+    by_method = {r[0]: dict(zip(OUTPUT_COLUMNS, r)) for r in rows[1:]}
+    d93 = by_method["D93-20 A"]
+    assert d93["Avg"] == "60.5000"
+    assert d93["r"] == f"{0.029 * 60.5:.4f}"
+    assert d93["r_pass"] == "PASS"
+    assert by_method["D86-23 IBP (Gasoline)"]["R_pass"] == "FAIL"
+    assert by_method["UNKNOWN"]["Status"] == "unknown method"
+    assert by_method["D5453-23 (< 400 mg/kg S)"]["Status"] == "invalid value"
+    assert by_method["D56-22 HT"]["Status"] == "ok"
+
+
+def test_short_rows_are_reported_not_dropped():
+    out = io.StringIO()
+    stats = evaluate_stream(io.StringIO("Sample,Method,V1,V2\na,D93-20 A,60\n\nb,D93-20 A,60,61\n"), out, METHODS)
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert stats.rows == 2
+    assert [(r["Method"], r["V1"], r["V2"], r["Status"]) for r in rows] == [
+        ("D93-20 A", "60", "", "invalid value"), ("D93-20 A", "60", "61", "ok"),
+    ]
+
+
+def test_evaluate_csv_file_reports_throughput(tmp_path):
+    src = tmp_path / "in.csv"
+    dst = tmp_path / "out.csv"
+    src.write_text(INPUT, encoding="utf-8")
+    stats = evaluate_csv_file(src, dst, METHODS, chunk_size=3)
+    assert stats.rows == 5
+    assert stats.rows_per_sec > 0
+    assert "rows/s" in stats.summary()
+    assert len(dst.read_text(encoding="utf-8").splitlines()) == 6
+
+
+def test_stream_appends_to_store_and_reports_progress(tmp_path):
+    done = []
+    with ResultStore(tmp_path / "run.mpcr", "a") as store:
+        evaluate_stream(io.StringIO(INPUT), io.StringIO(), METHODS, chunk_size=2, store=store, progress=done.append)
+        assert done == [2, 4, 5]
+        assert len(store) == 5
+        assert store.rows([0])[0]["method_name"] == "D93-20 A"
+        assert store.rows([2])[0]["status"] == "unknown method"
@@ -0,0 +1,51 @@
+import dataclasses
+import math
+import pickle
+
+import pytest
+
+from core import Method, load_methods
+from core.table import MethodTable
+
+
+def test_table_round_trips_every_method():
+    methods = load_methods("methods_enriched.csv")
+    table = MethodTable(methods.values())
+    assert len(table) == len(methods)
+    assert list(table) == list(methods)
+    for name, method in methods.items():
+        assert table[name] == method
+        assert table.display_label(table.index_of(name)) == method.display_label
+
+
+def test_columns_and_string_pool():
+    table = MethodTable.from_csv("methods_enriched.csv")
+    i = table.index_of("D56-22 HT")
+    assert table.r[i] == 1.6 and table.decimals[i] == 0
+    assert math.isnan(table.upper[i])
+    units = table.string_column("unit")
+    assert units.count("°C") > 10
+    # Repeated units share a single pooled string object.
+    assert len({id(u) for u in units if u == "°C"}) == 1
+
+
+def test_method_is_frozen_and_slotted():
+    method = load_methods("methods_enriched.csv")["D93-20 A"]
+    assert not hasattr(method, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        method.r = 1.0
+
+
+def test_method_pickle_round_trip_recompiles_formulas():
+    method = load_methods("methods.csv")["D56-22 LT"]
+    assert method.eval_r is not None
+    copy = pickle.loads(pickle.dumps(method))
+    assert copy == method and copy.display_label == method.display_label
+    assert copy.eval_r(50.0) == method.eval_r(50.0) and copy.eval_R(50.0) == method.eval_R(50.0)
+
+
+def test_duplicate_names_keep_last_row():
+    a = Method(name="X", r=1.0, R=2.0, unit="u", formula_r="", formula_R="", decimals=1, lower=None, upper=None)
+    b = dataclasses.replace(a, r=3.0)
+    table = MethodTable([a, b])
+    assert len(table) == 1 and table["X"].r == 3.0
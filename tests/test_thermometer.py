@@ -0,0 +1,90 @@
+import io
+
+import numpy as np
+import pytest
+
+from core import CorrectionTable, check_agreement, load_correction_tables
+from core.batch import STATUS_INVALID_VALUE, STATUS_OK, STATUS_OUT_OF_RANGE
+from core.thermometer import (
+    STATUS_UNKNOWN_THERMOMETER,
+    check_session,
+    format_report,
+    interpolate_corrections,
+    main,
+    read_correction_tables,
+)
+
+TABLES = """Thermometer,Temperature,Correction,Certificate
+T-101,40,0.00,C-2291
+T-101,0,0.01,C-2291
+T-101,20,-0.02,C-2291
+T-102,0,0.00,C-3310
+T-102,40,0.04,C-3310
+"""
+
+SESSION = """Set_Point,Thermometer_1,Reading_1,Thermometer_2,Reading_2
+20,T-101,20.03,T-102,19.99
+20,T-101,20.10,T-102,20.00
+10,T-101,10.00,T-102,10.00
+50,T-101,50.0,T-102,50.0
+20,T-101,abc,T-102,20
+20,T-999,20,T-102,20
+"""
+
+
+def test_tables_interpolate_linearly_within_certificate_range():
+    tables = read_correction_tables(io.StringIO(TABLES))
+    assert tables["T-101"].temperature.tolist() == [0, 20, 40] and tables["T-101"].certificate == "C-2291"
+    corrections, status = interpolate_corrections(
+        tables, ["T-101", "T-102", "T-101", "T-101", "T-999", "T-102"], [10, 30, 20, 40.5, 20, np.nan]
+    )
+    np.testing.assert_allclose(corrections[:3], [-0.005, 0.03, -0.02])
+    assert np.isnan(corrections[3:]).all()
+    assert status.tolist() == [STATUS_OK] * 3 + [STATUS_OUT_OF_RANGE, STATUS_UNKNOWN_THERMOMETER, STATUS_INVALID_VALUE]
+
+    with pytest.raises(ValueError):
+        CorrectionTable("T", [0, 20, 20], [0.0, 0.1, 0.2])
+    with pytest.raises(ValueError):
+        read_correction_tables(io.StringIO("Thermometer,Temperature\nT,0\n"))
+    with pytest.raises(ValueError, match="Line 3: expected 4 columns"):
+        read_correction_tables(io.StringIO(TABLES.splitlines()[0] + "\nT1,20,0.01,C\nT1,20\n"))
+
+
+def test_agreement_limit_and_statuses():
+    tables = read_correction_tables(io.StringIO(TABLES))
+    res = check_session(io.StringIO(SESSION), tables)
+    assert res.passes.tolist() == [True, False, True, False, False, False]
+    assert res.status.tolist() == [STATUS_OK] * 3 + [
+        STATUS_OUT_OF_RANGE, STATUS_INVALID_VALUE, STATUS_UNKNOWN_THERMOMETER]
+    # 20.10 - 0.0199 vs 20.00 + 0.02
+    assert res.delta[1] == pytest.approx(0.0601)
+    assert res.row(5)["status"] == "unknown thermometer"
+    assert check_session(io.StringIO(SESSION), tables, limit=0.1).passes[1]
+    with pytest.raises(ValueError, match="Line 3"):
+        check_session(io.StringIO(SESSION.splitlines()[0] + "\n20,T-101,20,T-102,20\n20,T-101\n\n"), tables)
+
+    # Exactly on the limit agrees despite binary rounding of the corrections.
+    flat = {"A": CorrectionTable("A", [0, 50], [0.01, 0.01]), "B": CorrectionTable("B", [0, 50], [-0.03, -0.03])}
+    assert check_agreement(flat, ["A"], [20.0], ["B"], [20.0]).passes.tolist() == [True]
+
+
+def test_report_and_cli(tmp_path, capsys):
+    tables = read_correction_tables(io.StringIO(TABLES))
+    report = format_report(check_session(io.StringIO(SESSION), tables), max_listed=2)
+    assert "Pairs 6   Pass 2   Fail 1   Not evaluated 3" in report
+    assert "T-101 20.100 (-0.020)  vs  T-102 20.000 (+0.020)  →  |ΔT| 0.0601 °C" in report
+    assert "… and 2 more" in report
+    lines = {line.split()[0]: line.split()[1:] for line in report.splitlines() if line.startswith("  T-")}
+    assert lines["T-101"][:2] == ["3", "1"] and lines["T-102"][-1] == "-0.0150"
+
+    (tmp_path / "tables.csv").write_text(TABLES, encoding="utf-8")
+    (tmp_path / "session.csv").write_text(SESSION.splitlines()[0] + "\n20,T-101,20.03,T-102,19.99\n", encoding="utf-8")
+    assert len(load_correction_tables(tmp_path / "tables.csv")) == 2
+    assert main([str(tmp_path / "tables.csv"), str(tmp_path / "session.csv")]) == 0
+    assert "Pass 1" in capsys.readouterr().out
+    assert main([str(tmp_path / "tables.csv"), str(tmp_path / "session.csv"), "--limit", "0.00001",
+                 "--report", str(tmp_path / "report.txt")]) == 1
+    assert "Fail 1" in (tmp_path / "report.txt").read_text(encoding="utf-8")
+    assert main([str(tmp_path / "missing.csv"), str(tmp_path / "session.csv")]) == 2
+    (tmp_path / "short.csv").write_text("Thermometer,Temperature,Correction\nT1,20\n", encoding="utf-8")
+    assert main([str(tmp_path / "short.csv"), str(tmp_path / "session.csv")]) == 2
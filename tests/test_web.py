@@ -0,0 +1,85 @@
+import gzip
+import shutil
+import tempfile
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+from core import calc_tolerance, load_methods
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_calculation_updates_history_tab(tmp_path, monkeypatch):
+    shutil.copy(ROOT / "methods_enriched.csv", tmp_path)
+    monkeypatch.chdir(tmp_path)
+    at = AppTest.from_file(str(ROOT / "tolerance_calculator_web.py"), default_timeout=60).run()
+    assert not at.exception
+    assert [t.label for t in at.tabs] == ["Calculator", "Thermometer Check", "History", "Control Charts", "Bulk Upload"]
+
+    at.number_input(key="v1").set_value(60.0)
+    at.number_input(key="v2").set_value(61.0)
+    at.button(key="calculate").click().run()
+    assert not at.exception
+    assert "Results" in "".join(m.value for m in at.markdown)
+    result = at.session_state.calc_result
+    expected = calc_tolerance(load_methods("methods_enriched.csv")[result["method"]], 60.0, 61.0)
+    assert {k: result[k] for k in expected} == expected
+    # The calculation reran the whole page, so History already lists it.
+    assert [c.value for c in at.caption if c.value.endswith(" calculations")] == ["1 calculations"]
+
+    # With every session shown, the clear button names and clears all of them.
+    at.toggle(key="history_all").set_value(True).run()
+    assert at.button(key="history_clear").label == "Clear All Sessions"
+    at.button(key="history_clear").click().run()
+    assert not at.exception
+    assert not [c.value for c in at.caption if c.value.endswith(" calculations")]
+
+
+def test_bulk_upload_tab_pages_and_filters(tmp_path, monkeypatch):
+    shutil.copy(ROOT / "methods_enriched.csv", tmp_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    rows = ["Method,V1,V2"] + ["D93-20 A,60,61", "D93-20 A,60,70", "Nope,1,2"] * 100
+    at = AppTest.from_file(str(ROOT / "tolerance_calculator_web.py"), default_timeout=60).run()
+    at.file_uploader(key="bulk_file").upload("pairs.csv", "\n".join(rows).encode(), "text/csv")
+    at.run()
+    at.button(key="bulk_run").click().run()
+    assert not at.exception
+
+    assert [m.value for m in at.metric] == ["300", "100", "100", "100"]
+    table = at.dataframe[-1].value
+    assert len(table) == 100 and table["Status"].tolist()[:3] == ["ok", "ok", "unknown method"]
+    at.selectbox(key="bulk_filter").select("R failures").run()
+    table = at.dataframe[-1].value
+    assert len(table) == 100 and {float(v) for v in table["V2"]} == {70.0}
+    at.selectbox(key="bulk_filter").select("All pairs").run()
+    at.number_input(key="bulk_page").set_value(3).run()
+    assert len(at.dataframe[-1].value) == 100
+
+    first = at.session_state.bulk["work"].path
+    with gzip.open(first / "results.csv.gz", "rt") as f:
+        assert len(f.read().splitlines()) == 301
+
+    # A new upload replaces the previous results and removes their directory.
+    at.file_uploader(key="bulk_file").upload("more.csv", b"Method,V1,V2\nD93-20 A,60,61\n", "text/csv")
+    at.run()
+    at.button(key="bulk_run").click().run()
+    assert not at.exception
+    assert [m.value for m in at.metric][0] == "1"
+    assert not first.exists() and at.session_state.bulk["work"].path.exists()
+    assert [p.name for p in tmp_path.glob("mpc-bulk-*")] == [at.session_state.bulk["work"].path.name]
+
+
+def test_thermometer_session_report(tmp_path, monkeypatch):
+    shutil.copy(ROOT / "methods_enriched.csv", tmp_path)
+    monkeypatch.chdir(tmp_path)
+    at = AppTest.from_file(str(ROOT / "tolerance_calculator_web.py"), default_timeout=60).run()
+    at.file_uploader(key="thermo_tables").upload(
+        "tables.csv", b"Thermometer,Temperature,Correction\nA,0,0.01\nA,40,0.03\nB,0,0\nB,40,0\n", "text/csv")
+    at.file_uploader(key="thermo_session").upload(
+        "session.csv", b"Thermometer_1,Reading_1,Thermometer_2,Reading_2\nA,20,B,20.03\nA,20,B,20.1\n", "text/csv")
+    at.run()
+    assert not at.exception
+    assert [m.value for m in at.metric] == ["2", "1", "0"]
+    assert "Pass 1   Fail 1" in at.code[0].value
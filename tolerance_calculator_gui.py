@@ -3,8 +3,10 @@ from tkinter import ttk, messagebox
 
 
 # Load methods using shared core utilities
-import logging
-from core import load_methods, calc_tolerance, TOLERANCE_FACTOR, logger
+from core import calc_tolerance, configure_logging, load_methods
+
+METHODS_CSV = "methods.csv"
+
 
 def load_methods_from_csv(file_path: str):
     """Legacy wrapper kept for backward compatibility.
@@ -26,63 +28,32 @@ def load_methods_from_csv(file_path: str):
                 "Upper_Limit": m.upper,
             }
         return methods_dict
-
-# Simple validator used by legacy tests
-def validate_input(value, lower_limit, upper_limit):
-    if not lower_limit <= value <= upper_limit:
-        raise ValueError(f"Value must be between {lower_limit} and {upper_limit}")
     except Exception as e:
         messagebox.showerror("Error", f"Error loading methods: {e}")
         return {}
 
 
+# Simple validator used by legacy tests
+def validate_input(value, lower_limit, upper_limit):
+    if not lower_limit <= value <= upper_limit:
+        raise ValueError(f"Value must be between {lower_limit} and {upper_limit}")
 
 
-# Load methods from the CSV file
-methods = load_methods_from_csv("methods.csv")
-
-
-def calculate_tolerance():
-    try:
-        selected_method = method_combobox.get()
-        if selected_method not in methods:
-            raise ValueError("Please select a valid method.")
-
-        # Retrieve the full Method object for calculation
-        method_obj = load_methods("methods.csv")[selected_method]
-        # Extract numeric values from entries
-        value1 = float(value1_entry.get())
-        value2 = float(value2_entry.get())
-
-        # Core calculation – will raise ValueError for out‑of‑range inputs.
-        result = calc_tolerance(method_obj, value1, value2)
-
-        # Build result display (mirrors original UI layout)
-        result_text = (
-            f"Method: {result['method_name']}\n"
-            f"Unit: {result['unit']}\n"
-            f"Average (X): {result['avg']:.{result['decimals']}f} {result['unit']}\n"
-            f"Absolute Difference: {result['diff']:.{result['decimals']}f} {result['unit']}\n\n"
-            f"Repeatability (r): {result['r']:.{result['decimals']}f} {result['unit']} - {'PASS' if result['r_pass'] else 'FAIL'}\n"
-            f"Reproducibility (R): {result['R']:.{result['decimals']}f} {result['unit']} - {'PASS' if result['R_pass'] else 'FAIL'}\n\n"
-            f"0.75R: {result['tolerance_075R']:.{result['decimals']}f} {result['unit']}\n"
-            f"Tolerance Range: {result['avg'] - result['tolerance_075R']:.{result['decimals']}f} to {result['avg'] + result['tolerance_075R']:.{result['decimals']}f} {result['unit']}"
-        )
-        result_label.config(text=result_text)
-
-    except ValueError as e:
-        messagebox.showerror("Input Error", str(e))
-    except Exception as e:
-        messagebox.showerror("Error", f"An unexpected error occurred: {e}")
-
-
-def save_results():
-    try:
-        with open("results.txt", "w") as file:
-            file.write(result_label.cget("text"))
-        messagebox.showinfo("Success", "Results saved to results.txt")
-    except Exception as e:
-        messagebox.showerror("Error", f"Could not save results: {e}")
+def format_result(result):
+    """Result text shown in the window (mirrors original UI layout)."""
+    d = result["decimals"]
+    unit = result["unit"]
+    return (
+        f"Method: {result['method_name']}\n"
+        f"Unit: {unit}\n"
+        f"Average (X): {result['avg']:.{d}f} {unit}\n"
+        f"Absolute Difference: {result['diff']:.{d}f} {unit}\n\n"
+        f"Repeatability (r): {result['r']:.{d}f} {unit} - {'PASS' if result['r_pass'] else 'FAIL'}\n"
+        f"Reproducibility (R): {result['R']:.{d}f} {unit} - {'PASS' if result['R_pass'] else 'FAIL'}\n\n"
+        f"0.75R: {result['tolerance_075R']:.{d}f} {unit}\n"
+        f"Tolerance Range: {result['avg'] - result['tolerance_075R']:.{d}f} to "
+        f"{result['avg'] + result['tolerance_075R']:.{d}f} {unit}"
+    )
 
 
 def show_help():
@@ -95,61 +66,109 @@ def show_help():
     )
 
 
-# Create the GUI
-root = tk.Tk()
-root.title("Tolerance Calculator")
-root.geometry("450x600")
-root.resizable(False, False)
-
-# Input fields
-value1_label = tk.Label(root, text="Enter Value 1:")
-value1_label.pack(pady=5)
-value1_entry = tk.Entry(root, font=("Arial", 12))
-value1_entry.pack(pady=5)
-
-value2_label = tk.Label(root, text="Enter Value 2:")
-value2_label.pack(pady=5)
-value2_entry = tk.Entry(root, font=("Arial", 12))
-value2_entry.pack(pady=5)
-
-# Method dropdown
-method_label = tk.Label(root, text="Select Method:")
-method_label.pack(pady=5)
-method_combobox = ttk.Combobox(root, values=list(methods.keys()), font=("Arial", 12))
-method_combobox.set("Select a method")
-method_combobox.pack(pady=5)
-
-# Dynamic unit label
-unit_label = tk.Label(root, text="", font=("Arial", 12, "italic"))
-unit_label.pack(pady=5)
-
+class CalculatorWindow:
+    """Widgets and callbacks of the calculator window.
 
-def update_unit(event):
-    selected_method = method_combobox.get()
-    if selected_method in methods:
-        unit_label.config(text=f"Unit: {methods[selected_method]['unit']}")
-    else:
-        unit_label.config(text="")
-
-
-method_combobox.bind("<<ComboboxSelected>>", update_unit)
-
-# Buttons
-calculate_button = ttk.Button(root, text="Calculate", command=calculate_tolerance)
-calculate_button.pack(pady=10)
-
-save_button = ttk.Button(root, text="Save Results", command=save_results)
-save_button.pack(pady=5)
-
-help_button = ttk.Button(root, text="Help", command=show_help)
-help_button.pack(pady=5)
-
-# Result display
-result_label = tk.Label(root, text="", justify="left", wraplength=400, font=("Arial", 12))
-result_label.pack(pady=10)
-
-pass_fail_label = tk.Label(root, text="", font=("Arial", 14, "bold"))
-pass_fail_label.pack(pady=5)
+    Built by :func:`main`, so importing this module creates no window and
+    loads no methods.
+    """
 
-# Run the GUI
-root.mainloop()
+    def __init__(self, root, methods):
+        self.methods = methods
+        root.title("Tolerance Calculator")
+        root.geometry("450x600")
+        root.resizable(False, False)
+
+        # Input fields
+        tk.Label(root, text="Enter Value 1:").pack(pady=5)
+        self.value1_entry = tk.Entry(root, font=("Arial", 12))
+        self.value1_entry.pack(pady=5)
+
+        tk.Label(root, text="Enter Value 2:").pack(pady=5)
+        self.value2_entry = tk.Entry(root, font=("Arial", 12))
+        self.value2_entry.pack(pady=5)
+
+        # Method search (prebuilt index in the shared registry)
+        tk.Label(root, text="Search Methods:").pack(pady=5)
+        self.search_var = tk.StringVar()
+        tk.Entry(root, textvariable=self.search_var, font=("Arial", 12)).pack(pady=5)
+
+        # Method dropdown
+        tk.Label(root, text="Select Method:").pack(pady=5)
+        self.method_combobox = ttk.Combobox(
+            root,
+            values=self.filtered_method_names(),
+            # Refresh on open so searches and CSV edits picked up by the registry apply
+            postcommand=lambda: self.method_combobox.configure(values=self.filtered_method_names()),
+            font=("Arial", 12),
+        )
+        self.method_combobox.set("Select a method")
+        self.method_combobox.pack(pady=5)
+
+        # Dynamic unit label
+        self.unit_label = tk.Label(root, text="", font=("Arial", 12, "italic"))
+        self.unit_label.pack(pady=5)
+        self.method_combobox.bind("<<ComboboxSelected>>", self.update_unit)
+
+        # Buttons
+        ttk.Button(root, text="Calculate", command=self.calculate_tolerance).pack(pady=10)
+        ttk.Button(root, text="Save Results", command=self.save_results).pack(pady=5)
+        ttk.Button(root, text="Help", command=show_help).pack(pady=5)
+
+        # Result display
+        self.result_label = tk.Label(root, text="", justify="left", wraplength=400, font=("Arial", 12))
+        self.result_label.pack(pady=10)
+
+        self.pass_fail_label = tk.Label(root, text="", font=("Arial", 14, "bold"))
+        self.pass_fail_label.pack(pady=5)
+
+    def filtered_method_names(self):
+        return self.methods.search(self.search_var.get())
+
+    def update_unit(self, event=None):
+        selected_method = self.method_combobox.get()
+        if selected_method in self.methods:
+            self.unit_label.config(text=f"Unit: {self.methods[selected_method].unit}")
+        else:
+            self.unit_label.config(text="")
+
+    def calculate_tolerance(self):
+        try:
+            method_obj = self.methods.get(self.method_combobox.get())
+            if method_obj is None:
+                raise ValueError("Please select a valid method.")
+
+            # Extract numeric values from entries
+            value1 = float(self.value1_entry.get())
+            value2 = float(self.value2_entry.get())
+
+            # Core calculation – will raise ValueError for out‑of‑range inputs.
+            result = calc_tolerance(method_obj, value1, value2)
+            self.result_label.config(text=format_result(result))
+
+        except ValueError as e:
+            messagebox.showerror("Input Error", str(e))
+        except Exception as e:
+            messagebox.showerror("Error", f"An unexpected error occurred: {e}")
+
+    def save_results(self):
+        try:
+            with open("results.txt", "w") as file:
+                file.write(self.result_label.cget("text"))
+            messagebox.showinfo("Success", "Results saved to results.txt")
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not save results: {e}")
+
+
+def main():
+    configure_logging()
+    # Shared, hot-reloading method registry (loaded once per process)
+    from core.registry import get_registry
+
+    root = tk.Tk()
+    CalculatorWindow(root, get_registry(METHODS_CSV))
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,349 +1,152 @@
 import streamlit as st
-import io
+import csv
+import math
+import time
+import uuid
 from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
 
-# ─── PAGE CONFIG ─────────────────────────────────────────────────────────────
-st.set_page_config(
-    page_title="Method Precision Calculator",
-    page_icon="🔬",
-    layout="centered",
-    initial_sidebar_state="collapsed",
-)
-
-# ─── CUSTOM CSS ──────────────────────────────────────────────────────────────
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=DM+Mono:wght@400;500&family=Sora:wght@300;400;600;700&display=swap');
-
-/* ── Global ── */
-html, body, [class*="css"] {
-    font-family: 'Sora', sans-serif;
-}
-
-/* ── Background ── */
-.stApp {
-    background: #0d1117;
-    color: #e6edf3;
-}
-
-/* ── Hide default Streamlit chrome ── */
-#MainMenu, footer, header { visibility: hidden; }
-.block-container {
-    padding-top: 2rem;
-    padding-bottom: 3rem;
-    max-width: 720px;
-}
-
-/* ── App Header ── */
-.app-header {
-    text-align: center;
-    padding: 2rem 0 1.5rem 0;
-    border-bottom: 1px solid #21262d;
-    margin-bottom: 2rem;
-}
-.app-header h1 {
-    font-family: 'Sora', sans-serif;
-    font-weight: 700;
-    font-size: 1.6rem;
-    letter-spacing: -0.5px;
-    color: #f0f6fc;
-    margin: 0;
-}
-.app-header .subtitle {
-    font-family: 'DM Mono', monospace;
-    font-size: 0.72rem;
-    color: #6e7681;
-    letter-spacing: 0.12em;
-    text-transform: uppercase;
-    margin-top: 0.35rem;
-}
-
-/* ── Tabs ── */
-.stTabs [data-baseweb="tab-list"] {
-    gap: 0;
-    border-bottom: 1px solid #21262d;
-    background: transparent;
-}
-.stTabs [data-baseweb="tab"] {
-    font-family: 'DM Mono', monospace;
-    font-size: 0.78rem;
-    letter-spacing: 0.08em;
-    text-transform: uppercase;
-    color: #6e7681;
-    padding: 0.6rem 1.2rem;
-    border-bottom: 2px solid transparent;
-    background: transparent;
-}
-.stTabs [aria-selected="true"] {
-    color: #58a6ff !important;
-    border-bottom: 2px solid #58a6ff !important;
-    background: transparent !important;
-}
-
-/* ── Cards ── */
-.result-card {
-    background: #161b22;
-    border: 1px solid #21262d;
-    border-radius: 10px;
-    padding: 1.4rem 1.6rem;
-    margin-bottom: 1rem;
-}
-.result-card-header {
-    font-family: 'DM Mono', monospace;
-    font-size: 0.68rem;
-    color: #6e7681;
-    letter-spacing: 0.14em;
-    text-transform: uppercase;
-    margin-bottom: 0.8rem;
-}
-
-/* ── Pass/Fail badges ── */
-.badge {
-    display: inline-block;
-    font-family: 'DM Mono', monospace;
-    font-size: 0.72rem;
-    font-weight: 500;
-    padding: 0.2rem 0.65rem;
-    border-radius: 999px;
-    letter-spacing: 0.08em;
-}
-.badge-pass {
-    background: rgba(35, 134, 54, 0.25);
-    color: #3fb950;
-    border: 1px solid rgba(63, 185, 80, 0.35);
-}
-.badge-fail {
-    background: rgba(218, 54, 51, 0.2);
-    color: #f85149;
-    border: 1px solid rgba(248, 81, 73, 0.35);
-}
-
-/* ── Metric rows ── */
-.metric-row {
-    display: flex;
-    justify-content: space-between;
-    align-items: center;
-    padding: 0.55rem 0;
-    border-bottom: 1px solid #21262d;
-}
-.metric-row:last-child { border-bottom: none; }
-.metric-label {
-    font-size: 0.82rem;
-    color: #8b949e;
-}
-.metric-value {
-    font-family: 'DM Mono', monospace;
-    font-size: 0.9rem;
-    color: #e6edf3;
-    font-weight: 500;
-}
-.metric-value.accent { color: #58a6ff; }
-
-/* ── Method note banner ── */
-.method-note {
-    background: rgba(88, 166, 255, 0.07);
-    border-left: 3px solid #58a6ff;
-    border-radius: 0 6px 6px 0;
-    padding: 0.6rem 1rem;
-    font-size: 0.8rem;
-    color: #8b949e;
-    margin-bottom: 1.2rem;
-    font-style: italic;
-}
-
-/* ── Rich method info panel ── */
-.method-info-panel {
-    background: #161b22;
-    border: 1px solid #21262d;
-    border-radius: 10px;
-    padding: 0.9rem 1.1rem;
-    margin-bottom: 1.2rem;
-}
-.info-row {
-    display: flex;
-    align-items: flex-start;
-    gap: 0.6rem;
-    padding: 0.35rem 0;
-    border-bottom: 1px solid #21262d;
-    font-size: 0.8rem;
-    line-height: 1.5;
-}
-.info-row:last-child { border-bottom: none; }
-.info-icon {
-    flex-shrink: 0;
-    font-size: 0.85rem;
-    margin-top: 0.05rem;
-}
-.info-text {
-    color: #8b949e;
-}
-.info-text strong {
-    color: #c9d1d9;
-    font-weight: 600;
-    font-family: "DM Mono", monospace;
-    font-size: 0.72rem;
-    letter-spacing: 0.05em;
-    text-transform: uppercase;
-    margin-right: 0.3rem;
-}
-
-/* ── Input labels ── */
-label, .stSelectbox label, .stNumberInput label {
-    font-family: 'DM Mono', monospace !important;
-    font-size: 0.72rem !important;
-    letter-spacing: 0.1em !important;
-    text-transform: uppercase !important;
-    color: #6e7681 !important;
-}
-
-/* ── Selectbox & inputs ── */
-.stSelectbox > div > div,
-.stNumberInput > div > div > input {
-    background: #161b22 !important;
-    border: 1px solid #30363d !important;
-    border-radius: 8px !important;
-    color: #e6edf3 !important;
-    font-family: 'DM Mono', monospace !important;
-    font-size: 0.88rem !important;
-}
-.stSelectbox > div > div:focus-within,
-.stNumberInput > div > div:focus-within {
-    border-color: #58a6ff !important;
-    box-shadow: 0 0 0 3px rgba(88,166,255,0.12) !important;
-}
-
-/* ── Buttons ── */
-.stButton > button {
-    font-family: 'DM Mono', monospace !important;
-    font-size: 0.78rem !important;
-    letter-spacing: 0.1em !important;
-    text-transform: uppercase !important;
-    background: #21262d !important;
-    border: 1px solid #30363d !important;
-    color: #8b949e !important;
-    border-radius: 8px !important;
-    padding: 0.55rem 1.2rem !important;
-    transition: all 0.15s ease !important;
-}
-.stButton > button:hover {
-    background: #30363d !important;
-    border-color: #58a6ff !important;
-    color: #58a6ff !important;
-}
-
-/* ── Download button ── */
-.stDownloadButton > button {
-    font-family: 'DM Mono', monospace !important;
-    font-size: 0.78rem !important;
-    letter-spacing: 0.1em !important;
-    text-transform: uppercase !important;
-    background: rgba(88, 166, 255, 0.12) !important;
-    border: 1px solid rgba(88, 166, 255, 0.4) !important;
-    color: #58a6ff !important;
-    border-radius: 8px !important;
-    width: 100% !important;
-}
-.stDownloadButton > button:hover {
-    background: rgba(88, 166, 255, 0.2) !important;
-}
-
-/* ── History table ── */
-.stDataFrame { border-radius: 8px; overflow: hidden; }
-
-/* ── Warning / info ── */
-.stAlert {
-    border-radius: 8px !important;
-    font-size: 0.83rem !important;
-}
-
-/* ── Section divider ── */
-.section-divider {
-    height: 1px;
-    background: #21262d;
-    margin: 1.5rem 0;
-}
-
-/* ── Thermometer result ── */
-.thermo-pass {
-    background: rgba(35,134,54,0.15);
-    border: 1px solid rgba(63,185,80,0.3);
-    border-radius: 10px;
-    padding: 1.2rem 1.5rem;
-    text-align: center;
-}
-.thermo-fail {
-    background: rgba(218,54,51,0.12);
-    border: 1px solid rgba(248,81,73,0.3);
-    border-radius: 10px;
-    padding: 1.2rem 1.5rem;
-    text-align: center;
-}
-.thermo-big {
-    font-family: 'DM Mono', monospace;
-    font-size: 2rem;
-    font-weight: 500;
-}
-.thermo-sub {
-    font-size: 0.8rem;
-    color: #8b949e;
-    margin-top: 0.3rem;
-}
-</style>
-""", unsafe_allow_html=True)
+APP_CSS = Path(__file__).with_name("assets") / "app.css"
+
+HEADER_HTML = """
+<div class="app-header">
+    <h1>🔬 Method Precision Calculator</h1>
+    <div class="subtitle">ASTM Repeatability & Reproducibility</div>
+</div>
+"""
+
+
+@lru_cache(maxsize=None)
+def app_style():
+    """The stylesheet wrapped in ``<style>``, read from disk once per process.
+
+    Style-only ``st.html`` goes to the event container, so it takes no space
+    in the layout.
+    """
+    return "<style>\n" + APP_CSS.read_text(encoding="utf-8") + "</style>"
 
 
 # ─── DATA LOADING ─────────────────────────────────────────────────────────────
-@st.cache_data
-def load_methods(file_path):
-    """Load methods using core loader and return a dict compatible with the UI.
-    The core loader returns ``Method`` objects; we convert them to the legacy dict
-    shape expected by the rest of this script.
+from core import configure_logging
+
+configure_logging()
+
+
+def load_registry(file_path):
+    """Return the process-wide :class:`core.registry.MethodRegistry`.
+
+    The registry loads the CSV once per process, reloads it when the file
+    changes and carries a prebuilt search index – no per-rerun copies or
+    regrouping.
     """
     try:
-        from core import load_methods as core_load
-        core_dict = core_load(file_path)
-        methods_dict: dict = {}
-        for name, m in core_dict.items():
-            methods_dict[name] = {
-                "r": m.r,
-                "R": m.R,
-                "unit": m.unit,
-                "formula_r": m.formula_r,
-                "formula_R": m.formula_R,
-                "decimals": m.decimals,
-                "lower": m.lower,
-                "upper": m.upper,
-                "notes": m.notes,
-                "year": m.year,
-                "matrix": m.matrix,
-                "conc_range": m.conc_range,
-                "scope": m.scope,
-                "display_label": m.display_label,
-            }
-        return methods_dict
+        from core.registry import get_registry
+        return get_registry(file_path)
     except Exception as e:
         st.error(f"Error loading methods: {e}")
-        return {}
+        st.stop()
 
 
-def group_methods(methods_dict):
-    """Group methods by base standard (D56, D93, etc.)"""
-    groups = {}
-    for name in methods_dict:
-        prefix = name.split("-")[0].strip()
-        groups.setdefault(prefix, []).append(name)
-    return groups
+HISTORY_DB = "history.sqlite3"
+HISTORY_PAGE_SIZE = 50
 
 
-def build_label_map(methods_dict):
-    """Returns {display_label: method_key} for selectbox use."""
-    return {v["display_label"]: k for k, v in methods_dict.items()}
+def load_history(db_path):
+    """Return the process-wide :class:`core.history.HistoryStore`."""
+    from core.history import get_history_store
+    return get_history_store(db_path)
 
 
-def safe_eval(formula, avg):
-    """Delegate to core.safe_eval for safety."""
-    from core import safe_eval as core_safe_eval
-    return core_safe_eval(formula, avg)
+CONTROL_STATE = "control_state.json"
+
+
+def load_control_charts(state_path):
+    """Return the process-wide :class:`core.control.ControlCharts`."""
+    from core.control import get_control_charts
+    return get_control_charts(state_path)
+
+
+def history_export(store, session):
+    """CSV export for the download button, built only when it is clicked.
+
+    Rows are streamed from SQLite into a spooled temporary file instead of a
+    DataFrame/StringIO holding the whole history.
+    """
+    import tempfile
+
+    out = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024, mode="w+b")
+    for chunk in store.iter_csv(session=session):
+        out.write(chunk.encode("utf-8"))
+    out.seek(0)
+    return out
+
+
+BULK_CHUNK_SIZE = 20_000
+BULK_PAGE_SIZE = 100
+BULK_RESULTS = "results.csv.gz"
+
+
+def read_upload(uploaded, read):
+    """Call ``read(text_file)`` on an uploaded file, decoded as it is read.
+
+    The wrapper is detached afterwards, so the upload itself stays open for
+    later reruns.
+    """
+    import io
+
+    uploaded.seek(0)
+    text = io.TextIOWrapper(uploaded, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        return read(text)
+    finally:
+        text.detach()
+
+
+class BulkWorkDir:
+    """Temporary directory holding one evaluated upload.
+
+    It is removed by :meth:`remove` when a new upload replaces it, or else
+    when the object is garbage-collected with its session state (or at
+    interpreter exit) – one finalizer per directory, no atexit hooks piling up.
+    """
+
+    def __init__(self):
+        import shutil
+        import tempfile
+        import weakref
+
+        self.path = Path(tempfile.mkdtemp(prefix="mpc-bulk-"))
+        self._finalizer = weakref.finalize(self, shutil.rmtree, str(self.path), ignore_errors=True)
+
+    def remove(self):
+        self._finalizer()
+
+
+def read_bulk_results(work):
+    """Bytes of the gzipped result CSV, for the deferred download."""
+    with open(work.path / BULK_RESULTS, "rb") as f:
+        return f.read()
+
+
+def run_bulk_upload(uploaded, methods, work_dir, progress=None):
+    """Evaluate an uploaded CSV chunk by chunk into *work_dir*.
+
+    The upload is decoded while it is read, each chunk is evaluated with the
+    vectorised bulk evaluator, appended to a memory-mapped result store (for
+    paging) and to a gzipped result CSV (for the download); memory use depends
+    on ``BULK_CHUNK_SIZE`` only. Returns the :class:`core.stream.StreamStats`.
+    """
+    import gzip
+    from core.results import ResultStore
+    from core.stream import evaluate_stream
+
+    def _evaluate(text):
+        with ResultStore(Path(work_dir) / "store", "a") as store, \
+                gzip.open(Path(work_dir) / BULK_RESULTS, "wt", encoding="utf-8", newline="", compresslevel=1) as out:
+            return evaluate_stream(text, out, methods, chunk_size=BULK_CHUNK_SIZE, store=store, progress=progress)
+
+    return read_upload(uploaded, _evaluate)
 
 
 def format_result_text(method_name, unit, avg, diff, r, R, r_pass, R_pass, decimals, v1, v2):
@@ -369,43 +172,35 @@ def format_result_text(method_name, unit, avg, diff, r, R, r_pass, R_pass, decim
 
 
 # ─── SESSION STATE ────────────────────────────────────────────────────────────
-if "history" not in st.session_state:
-    st.session_state.history = []
-
-# ─── HEADER ──────────────────────────────────────────────────────────────────
-st.markdown("""
-<div class="app-header">
-    <h1>🔬 Method Precision Calculator</h1>
-    <div class="subtitle">ASTM Repeatability & Reproducibility</div>
-</div>
-""", unsafe_allow_html=True)
-
-# ─── LOAD DATA ───────────────────────────────────────────────────────────────
-methods = load_methods("methods_enriched.csv")
-groups = group_methods(methods)
-
-# ─── TABS ────────────────────────────────────────────────────────────────────
-tab_calc, tab_thermo, tab_history = st.tabs(["Calculator", "Thermometer Check", "History"])
+def session_id():
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # TAB 1 — CALCULATOR
 # ═══════════════════════════════════════════════════════════════════════════════
-with tab_calc:
-
-    # Method selection with group filter
-    label_map = build_label_map(methods)
-    all_prefixes = sorted(groups.keys())
+@st.fragment
+def calculator_tab():
+    registry = load_registry("methods_enriched.csv")
+    methods = registry.methods
+    method_index = registry.index
+
+    # Method selection with group filter and indexed search
+    label_map = registry.label_map
     col_filter, col_method = st.columns([1, 2])
 
     with col_filter:
-        base_filter = st.selectbox("Standard", ["All"] + all_prefixes, key="base_filter")
+        base_filter = st.selectbox("Standard", ["All"] + method_index.standards(), key="base_filter")
+        search_text = st.text_input("Search", key="method_search", placeholder="e.g. sulfur ULSD")
 
     with col_method:
-        if base_filter == "All":
-            label_list = [methods[k]["display_label"] for k in methods.keys()]
-        else:
-            label_list = [methods[k]["display_label"] for k in groups.get(base_filter, [])]
+        matches = method_index.search(search_text, standard=None if base_filter == "All" else base_filter)
+        if not matches:
+            st.warning("No methods match the search — showing all.")
+            matches = method_index.search(standard=None if base_filter == "All" else base_filter)
+        label_list = [methods.display_label(methods.index_of(k)) for k in matches]
         selected_label = st.selectbox("Method / Procedure", label_list, key="sel_method")
 
     # Resolve label back to method key
@@ -415,14 +210,14 @@ with tab_calc:
     if selected_method and selected_method in methods:
         mi = methods[selected_method]
         info_parts = []
-        if mi.get("notes"):
-            info_parts.append(f'<div class="info-row"><span class="info-icon">📋</span><span class="info-text"><strong>Notes:</strong> {mi["notes"]}</span></div>')
-        if mi.get("matrix"):
-            info_parts.append(f'<div class="info-row"><span class="info-icon">🧪</span><span class="info-text"><strong>Matrix:</strong> {mi["matrix"]}</span></div>')
-        if mi.get("conc_range"):
-            info_parts.append(f'<div class="info-row"><span class="info-icon">📊</span><span class="info-text"><strong>Concentration Range:</strong> {mi["conc_range"]}</span></div>')
-        if mi.get("scope"):
-            info_parts.append(f'<div class="info-row"><span class="info-icon">🔍</span><span class="info-text"><strong>Scope:</strong> {mi["scope"]}</span></div>')
+        if mi.notes:
+            info_parts.append(f'<div class="info-row"><span class="info-icon">📋</span><span class="info-text"><strong>Notes:</strong> {mi.notes}</span></div>')
+        if mi.matrix:
+            info_parts.append(f'<div class="info-row"><span class="info-icon">🧪</span><span class="info-text"><strong>Matrix:</strong> {mi.matrix}</span></div>')
+        if mi.conc_range:
+            info_parts.append(f'<div class="info-row"><span class="info-icon">📊</span><span class="info-text"><strong>Concentration Range:</strong> {mi.conc_range}</span></div>')
+        if mi.scope:
+            info_parts.append(f'<div class="info-row"><span class="info-icon">🔍</span><span class="info-text"><strong>Scope:</strong> {mi.scope}</span></div>')
         if info_parts:
             st.markdown(
                 '<div class="method-info-panel">' + "".join(info_parts) + '</div>',
@@ -432,131 +227,136 @@ with tab_calc:
     # Value inputs
     col1, col2 = st.columns(2)
     m = methods[selected_method]
-    decimals = m["decimals"]
+    decimals = m.decimals
     fmt = f"%.{decimals}f"
-    step = 10 ** (-decimals)
+    step = 10.0 ** (-decimals)
 
     with col1:
         value1 = st.number_input("Value 1", value=0.0, step=step, format=fmt, key="v1")
     with col2:
         value2 = st.number_input("Value 2", value=0.0, step=step, format=fmt, key="v2")
 
-    calculate = st.button("Calculate", use_container_width=True)
+    calculate = st.button("Calculate", use_container_width=True, key="calculate")
 
     if calculate:
         if value1 == 0.0 and value2 == 0.0:
             st.warning("Both values are 0.0 — please enter your measurements.")
         else:
-            # Validate range
-            valid = True
-            if m["lower"] is not None and (value1 < m["lower"] or value2 < m["lower"]):
-                st.warning(f"Values must be ≥ {m['lower']} {m['unit']}")
-                valid = False
-            if m["upper"] is not None and (value1 > m["upper"] or value2 > m["upper"]):
-                st.warning(f"Values must be ≤ {m['upper']} {m['unit']}")
-                valid = False
-
-            if valid:
-                avg = (value1 + value2) / 2
-                diff = abs(value1 - value2)
-                unit = m["unit"]
-
-                try:
-                    r = safe_eval(m["formula_r"], avg) if m["formula_r"] else (m["r"] or 0)
-                    R = safe_eval(m["formula_R"], avg) if m["formula_R"] else (m["R"] or 0)
-                except Exception as e:
-                    st.error(f"Formula error: {e}")
-                    st.stop()
-
-                r_pass = diff <= r
-                R_pass = diff <= R
-                tolerance_075R = 0.75 * R
-                tol_pass = diff <= tolerance_075R
-
-                # ── Results Card ──
-                st.markdown('<div class="result-card">', unsafe_allow_html=True)
-                st.markdown('<div class="result-card-header">Results</div>', unsafe_allow_html=True)
-
-                rows_html = f"""
-                <div class="metric-row">
-                    <span class="metric-label">Method</span>
-                    <span class="metric-value accent">{selected_method}</span>
-                </div>
-                <div class="metric-row">
-                    <span class="metric-label">Average (X̄)</span>
-                    <span class="metric-value">{avg:.{decimals}f} {unit}</span>
-                </div>
-                <div class="metric-row">
-                    <span class="metric-label">|Difference|</span>
-                    <span class="metric-value">{diff:.{decimals}f} {unit}</span>
-                </div>
-                <div class="metric-row">
-                    <span class="metric-label">Repeatability (r)</span>
-                    <span class="metric-value">{r:.{decimals}f} {unit}&nbsp;&nbsp;
-                        <span class="badge {'badge-pass' if r_pass else 'badge-fail'}">{'PASS' if r_pass else 'FAIL'}</span>
-                    </span>
-                </div>
-                <div class="metric-row">
-                    <span class="metric-label">Reproducibility (R)</span>
-                    <span class="metric-value">{R:.{decimals}f} {unit}&nbsp;&nbsp;
-                        <span class="badge {'badge-pass' if R_pass else 'badge-fail'}">{'PASS' if R_pass else 'FAIL'}</span>
-                    </span>
-                </div>
-                <div class="metric-row">
-                    <span class="metric-label">0.75R Tolerance</span>
-                    <span class="metric-value">{tolerance_075R:.{decimals}f} {unit}&nbsp;&nbsp;
-                        <span class="badge {'badge-pass' if tol_pass else 'badge-fail'}">{'PASS' if tol_pass else 'FAIL'}</span>
-                    </span>
-                </div>
-                <div class="metric-row">
-                    <span class="metric-label">0.75R Acceptable Range</span>
-                    <span class="metric-value">{avg - tolerance_075R:.{decimals}f} – {avg + tolerance_075R:.{decimals}f} {unit}</span>
-                </div>
-                """
-                st.markdown(rows_html, unsafe_allow_html=True)
-                st.markdown('</div>', unsafe_allow_html=True)
-
-                # ── Formula details (collapsed) ──
-                with st.expander("Calculation details"):
-                    r_src = f"`{m['formula_r']}`" if m["formula_r"] else f"Static: `{m['r']}`"
-                    R_src = f"`{m['formula_R']}`" if m["formula_R"] else f"Static: `{m['R']}`"
-                    st.markdown(f"**r formula:** {r_src}")
-                    st.markdown(f"**R formula:** {R_src}")
-                    st.markdown(f"**Decimal places:** `{decimals}`")
-
-                # ── Download ──
-                result_text = format_result_text(
-                    selected_method, unit, avg, diff, r, R, r_pass, R_pass, decimals, value1, value2
-                )
-                st.download_button(
-                    label="⬇  Download Result",
-                    data=result_text,
-                    file_name=f"{selected_method.replace(' ','_')}_{datetime.now().strftime('%Y%m%d_%H%M')}.txt",
-                    mime="text/plain",
-                    use_container_width=True,
-                )
-
-                # ── Save to session history ──
-                st.session_state.history.append({
-                    "Time": datetime.now().strftime("%H:%M:%S"),
-                    "Method": selected_method,
-                    "V1": round(value1, decimals),
-                    "V2": round(value2, decimals),
-                    "Avg": round(avg, decimals),
-                    "|Diff|": round(diff, decimals),
-                    "r": round(r, decimals),
-                    "R": round(R, decimals),
-                    "0.75R": round(tolerance_075R, decimals),
-                    "r ✓": "✅" if r_pass else "❌",
-                    "0.75R ✓": "✅" if tol_pass else "❌",
-                    "R ✓": "✅" if R_pass else "❌",
-                })
+            from core import calc_tolerance
+            from core.history import HistoryRecord
+
+            try:
+                result = calc_tolerance(m, value1, value2)
+            except ValueError as e:
+                # Values outside the method's range
+                st.warning(str(e))
+                st.stop()
+            except Exception as e:
+                st.error(f"Formula error: {e}")
+                st.stop()
+            result.update(method=selected_method, v1=value1, v2=value2, signal=None)
+
+            # ── Save to history ──
+            load_history(HISTORY_DB).add(
+                HistoryRecord.from_result(result, value1, value2, decimals, session=session_id()))
+
+            # ── Control charts (O(1) update, saved at exit) ──
+            signals = load_control_charts(CONTROL_STATE).update_result(result, time.time())
+            if signals:
+                result["signal"] = ", ".join(name for name, hit in signals._asdict().items() if hit)
+
+            # A calculation changes the History and Control Charts tabs too,
+            # so it reruns the whole app; the result is shown from state.
+            st.session_state.calc_result = result
+            st.rerun()
+
+    result = st.session_state.get("calc_result")
+    if result and (result["method"], result["v1"], result["v2"]) == (selected_method, value1, value2):
+        render_result(m, result)
+
+
+def render_result(m, result):
+    """Results card, calculation details, download and control-chart signal."""
+    selected_method = result["method"]
+    value1, value2 = result["v1"], result["v2"]
+    avg, diff, r, R = result["avg"], result["diff"], result["r"], result["R"]
+    r_pass, R_pass, tol_pass = result["r_pass"], result["R_pass"], result["tolerance_pass"]
+    tolerance_075R = result["tolerance_075R"]
+    decimals = m.decimals
+    unit = m.unit
+
+    # ── Results Card ──
+    st.markdown('<div class="result-card">', unsafe_allow_html=True)
+    st.markdown('<div class="result-card-header">Results</div>', unsafe_allow_html=True)
+
+    rows_html = f"""
+    <div class="metric-row">
+        <span class="metric-label">Method</span>
+        <span class="metric-value accent">{selected_method}</span>
+    </div>
+    <div class="metric-row">
+        <span class="metric-label">Average (X̄)</span>
+        <span class="metric-value">{avg:.{decimals}f} {unit}</span>
+    </div>
+    <div class="metric-row">
+        <span class="metric-label">|Difference|</span>
+        <span class="metric-value">{diff:.{decimals}f} {unit}</span>
+    </div>
+    <div class="metric-row">
+        <span class="metric-label">Repeatability (r)</span>
+        <span class="metric-value">{r:.{decimals}f} {unit}&nbsp;&nbsp;
+            <span class="badge {'badge-pass' if r_pass else 'badge-fail'}">{'PASS' if r_pass else 'FAIL'}</span>
+        </span>
+    </div>
+    <div class="metric-row">
+        <span class="metric-label">Reproducibility (R)</span>
+        <span class="metric-value">{R:.{decimals}f} {unit}&nbsp;&nbsp;
+            <span class="badge {'badge-pass' if R_pass else 'badge-fail'}">{'PASS' if R_pass else 'FAIL'}</span>
+        </span>
+    </div>
+    <div class="metric-row">
+        <span class="metric-label">0.75R Tolerance</span>
+        <span class="metric-value">{tolerance_075R:.{decimals}f} {unit}&nbsp;&nbsp;
+            <span class="badge {'badge-pass' if tol_pass else 'badge-fail'}">{'PASS' if tol_pass else 'FAIL'}</span>
+        </span>
+    </div>
+    <div class="metric-row">
+        <span class="metric-label">0.75R Acceptable Range</span>
+        <span class="metric-value">{avg - tolerance_075R:.{decimals}f} – {avg + tolerance_075R:.{decimals}f} {unit}</span>
+    </div>
+    """
+    st.markdown(rows_html, unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # ── Formula details (collapsed) ──
+    with st.expander("Calculation details"):
+        r_src = f"`{m.formula_r}`" if m.formula_r else f"Static: `{m.r}`"
+        R_src = f"`{m.formula_R}`" if m.formula_R else f"Static: `{m.R}`"
+        st.markdown(f"**r formula:** {r_src}")
+        st.markdown(f"**R formula:** {R_src}")
+        st.markdown(f"**Decimal places:** `{decimals}`")
+
+    # ── Download ──
+    result_text = format_result_text(
+        selected_method, unit, avg, diff, r, R, r_pass, R_pass, decimals, value1, value2
+    )
+    st.download_button(
+        label="⬇  Download Result",
+        data=result_text,
+        file_name=f"{selected_method.replace(' ','_')}_{datetime.now().strftime('%Y%m%d_%H%M')}.txt",
+        mime="text/plain",
+        use_container_width=True,
+    )
+
+    if result["signal"]:
+        st.warning(f"Control chart signal for {selected_method}: {result['signal']}")
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # TAB 2 — THERMOMETER CHECK
 # ═══════════════════════════════════════════════════════════════════════════════
-with tab_thermo:
+@st.fragment
+def thermometer_tab():
     st.markdown("""
     <div class="method-note">
         Per ASTM 6.4.1 — Two calibrated liquid-in-glass thermometers, with corrections applied,
@@ -634,33 +434,293 @@ with tab_thermo:
             use_container_width=True,
         )
 
+    with st.expander("Calibration session — certificate correction tables"):
+        thermometer_session(custom_limit)
+
+
+def thermometer_session(limit):
+    """Check a whole session of thermometer pairs with interpolated corrections."""
+    from core.batch import STATUS_OK
+    from core.thermometer import check_session, format_report, read_correction_tables
+
+    st.caption("Correction tables: Thermometer, Temperature, Correction (Certificate optional). "
+               "Session: Set_Point (optional), Thermometer_1, Reading_1, Thermometer_2, Reading_2.")
+    tables_file = st.file_uploader("Correction tables (CSV)", type=["csv"], key="thermo_tables")
+    session_file = st.file_uploader("Session readings (CSV)", type=["csv"], key="thermo_session")
+    if tables_file is None or session_file is None:
+        return
+
+    try:
+        tables = read_upload(tables_file, read_correction_tables)
+        result = read_upload(session_file, lambda text: check_session(text, tables, limit))
+    except (ValueError, UnicodeError, csv.Error) as e:
+        st.error(f"Could not check the session: {e}")
+        return
+
+    evaluated = int((result.status == STATUS_OK).sum())
+    passed = int(result.passes.sum())
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Pairs", f"{len(result):,}")
+    col2.metric("Out of tolerance", f"{evaluated - passed:,}")
+    col3.metric("Not evaluated", f"{len(result) - evaluated:,}")
+
+    report = format_report(result)
+    st.code(report, language=None)
+    st.download_button(
+        label="⬇  Download Report",
+        data=report,
+        file_name=f"thermo_session_{datetime.now().strftime('%Y%m%d_%H%M')}.txt",
+        mime="text/plain",
+        use_container_width=True,
+        key="thermo_report",
+    )
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # TAB 3 — HISTORY
 # ═══════════════════════════════════════════════════════════════════════════════
-with tab_history:
-    if not st.session_state.history:
+@st.fragment
+def history_tab():
+    from core.history import display_row
+
+    history = load_history(HISTORY_DB)
+    show_all = st.toggle("Show all sessions", key="history_all")
+    scope = None if show_all else session_id()
+    total = history.count(session=scope)
+
+    if not total:
         st.markdown("""
         <div style="text-align:center; color:#6e7681; padding: 3rem 0; font-family: 'DM Mono', monospace; font-size: 0.82rem;">
             No calculations yet this session.<br>Run a calculation to see history here.
         </div>
         """, unsafe_allow_html=True)
     else:
-        import pandas as pd
-        df = pd.DataFrame(st.session_state.history)
-        st.dataframe(df, use_container_width=True, hide_index=True)
-
-        # Export full session
-        csv_buf = io.StringIO()
-        df.to_csv(csv_buf, index=False)
+        pages = math.ceil(total / HISTORY_PAGE_SIZE)
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1,
+                               key="history_page")
+        records = history.page(HISTORY_PAGE_SIZE, (page - 1) * HISTORY_PAGE_SIZE, session=scope)
+        st.dataframe([display_row(rec) for rec in records], use_container_width=True, hide_index=True)
+        st.caption(f"{total} calculations")
+
+        # Export – generated from the database only when clicked
         st.download_button(
-            label="⬇  Export Session as CSV",
-            data=csv_buf.getvalue(),
+            label="⬇  Export as CSV",
+            data=lambda: history_export(history, scope),
             file_name=f"precision_session_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
             mime="text/csv",
             use_container_width=True,
         )
 
-        if st.button("Clear History", use_container_width=True):
-            st.session_state.history = []
+        # Clears exactly what is listed: this session, or every session.
+        if st.button("Clear All Sessions" if show_all else "Clear History", use_container_width=True,
+                     key="history_clear"):
+            history.clear(session=scope)
+            st.rerun()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TAB 4 — CONTROL CHARTS
+# ═══════════════════════════════════════════════════════════════════════════════
+@st.fragment
+def control_tab():
+    control_charts = load_control_charts(CONTROL_STATE)
+    st.markdown("""
+    <div class="method-note">
+        Running precision per method. <strong>r ratio</strong> / <strong>R ratio</strong> compare the observed
+        spread of |Diff| with the published r and R (1.00 = as published). EWMA and CUSUM track drift of
+        |Diff| / σr; Shewhart flags single results beyond the duplicate-range limit.
+    </div>
+    """, unsafe_allow_html=True)
+
+    summary = control_charts.summary()
+    if not summary:
+        st.markdown("""
+        <div style="text-align:center; color:#6e7681; padding: 3rem 0; font-family: 'DM Mono', monospace; font-size: 0.82rem;">
+            No results charted yet.<br>Run a calculation to start tracking.
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        def _ratio(value):
+            return None if value is None else round(value, 2)
+
+        st.dataframe(
+            [
+                {
+                    "Method": row["method"],
+                    "n": row["n"],
+                    "Mean |Diff|": round(row["mean_diff"], 4),
+                    "SD |Diff|": round(row["std_diff"], 4),
+                    "r ratio": _ratio(row["r_ratio"]),
+                    "R ratio": _ratio(row["R_ratio"]),
+                    "r fails": row["r_failures"],
+                    "R fails": row["R_failures"],
+                    "EWMA": f"{row['ewma']:.2f} / {row['ewma_ucl']:.2f}",
+                    "Shewhart ⚠": row["shewhart_signals"],
+                    "EWMA ⚠": row["ewma_signals"],
+                    "CUSUM ⚠": row["cusum_signals"],
+                }
+                for row in summary
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+        reset_target = st.selectbox("Reset statistics for", ["—"] + [row["method"] for row in summary],
+                                    key="control_reset")
+        if reset_target != "—" and st.button("Reset", use_container_width=True):
+            control_charts.reset(reset_target)
+            control_charts.save(CONTROL_STATE)
             st.rerun()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TAB 5 — BULK UPLOAD
+# ═══════════════════════════════════════════════════════════════════════════════
+@st.fragment
+def bulk_tab():
+    from core.results import ResultStore
+
+    registry = load_registry("methods_enriched.csv")
+    st.markdown("""
+    <div class="method-note">
+        Upload a CSV of duplicate pairs with <strong>Method</strong>, <strong>V1</strong> and
+        <strong>V2</strong> columns (the History export format). It is evaluated in chunks on the
+        server; results are paged below and downloadable as a gzipped CSV.
+    </div>
+    """, unsafe_allow_html=True)
+
+    uploaded = st.file_uploader("Duplicate pairs (CSV)", type=["csv"], key="bulk_file")
+    bulk = st.session_state.get("bulk")
+    if uploaded is not None and (bulk is None or bulk["file_id"] != uploaded.file_id):
+        if st.button("Evaluate", use_container_width=True, key="bulk_run"):
+            if bulk is not None:
+                st.session_state.pop("bulk")["work"].remove()
+                bulk = None
+            work = BulkWorkDir()
+            bar = st.progress(0.0, text="Evaluating…")
+
+            def _progress(rows):
+                # Fraction of the upload read so far (the CSV reader buffers ahead).
+                bar.progress(min(uploaded.tell() / max(uploaded.size, 1), 1.0), text=f"{rows:,} pairs evaluated")
+
+            try:
+                stats = run_bulk_upload(uploaded, registry.methods, work.path, _progress)
+            except (ValueError, UnicodeError, csv.Error) as e:
+                work.remove()
+                bar.empty()
+                st.error(f"Could not read the upload: {e}")
+                return
+            bar.empty()
+            bulk = st.session_state.bulk = {
+                "file_id": uploaded.file_id, "name": uploaded.name, "work": work, "stats": stats.summary(),
+            }
+
+    if bulk is None:
+        return
+
+    with ResultStore(bulk["work"].path / "store") as store:
+        bulk_results(store, bulk)
+
+    # The result CSV was written to disk while evaluating; it is read only
+    # when the button is clicked.
+    work = bulk["work"]
+    st.download_button(
+        label="⬇  Download results (CSV, gzipped)",
+        data=lambda: read_bulk_results(work),
+        file_name=f"{Path(bulk['name']).stem}_checked.csv.gz",
+        mime="application/gzip",
+        use_container_width=True,
+    )
+
+
+def bulk_results(store, bulk):
+    """Summary metrics, filter and the current page of an evaluated upload."""
+    import numpy as np
+    from core.batch import STATUS_LABELS, STATUS_OK
+
+    status = store.column("status")
+    counts = np.bincount(status, minlength=len(STATUS_LABELS))
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Pairs", f"{len(store):,}")
+    col2.metric("r fails", f"{len(store.select(r_pass=False)):,}")
+    col3.metric("R fails", f"{len(store.select(R_pass=False)):,}")
+    col4.metric("Not evaluated", f"{len(store) - int(counts[STATUS_OK]):,}")
+    st.caption(f"{bulk['name']}: {bulk['stats']}")
+
+    show = st.selectbox("Show", ["All pairs", "R failures", "r failures", "Not evaluated"], key="bulk_filter")
+    if show == "R failures":
+        indices = store.select(R_pass=False)
+    elif show == "r failures":
+        indices = store.select(r_pass=False)
+    elif show == "Not evaluated":
+        indices = np.flatnonzero(status != STATUS_OK)
+    else:
+        indices = None
+    total = len(store) if indices is None else len(indices)
+
+    if not total:
+        st.caption("No pairs to show.")
+    else:
+        pages = math.ceil(total / BULK_PAGE_SIZE)
+        page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, step=1,
+                               key="bulk_page")
+        start = (page - 1) * BULK_PAGE_SIZE
+        stop = min(start + BULK_PAGE_SIZE, total)
+        # Only the rows of this page are read from the memory-mapped store.
+        page_rows = store.rows(np.arange(start, stop) if indices is None else indices[start:stop])
+        st.dataframe([bulk_display_row(row) for row in page_rows], use_container_width=True, hide_index=True)
+
+
+def bulk_display_row(row):
+    """One result-store row formatted like the History table."""
+    def _num(value):
+        return "" if value != value or row["decimals"] < 0 else f"{value:.{row['decimals']}f}"
+
+    ok = row["status"] == "ok"
+    return {
+        "Method": row["method_name"],
+        "V1": _num(row["v1"]),
+        "V2": _num(row["v2"]),
+        "Unit": row["unit"],
+        "Avg": _num(row["avg"]),
+        "|Diff|": _num(row["diff"]),
+        "r": _num(row["r"]),
+        "R": _num(row["R"]),
+        "r Pass": ("✓" if row["r_pass"] else "✗") if ok else "",
+        "R Pass": ("✓" if row["R_pass"] else "✗") if ok else "",
+        "Status": row["status"],
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PAGE
+# ═══════════════════════════════════════════════════════════════════════════════
+# Each tab is a fragment: a widget inside a tab reruns only that tab, not the
+# page setup, the stylesheet, the header or the other tabs.
+TABS = [
+    ("Calculator", calculator_tab),
+    ("Thermometer Check", thermometer_tab),
+    ("History", history_tab),
+    ("Control Charts", control_tab),
+    ("Bulk Upload", bulk_tab),
+]
+
+
+def main():
+    st.set_page_config(
+        page_title="Method Precision Calculator",
+        page_icon="🔬",
+        layout="centered",
+        initial_sidebar_state="collapsed",
+    )
+    st.html(app_style())
+    st.markdown(HEADER_HTML, unsafe_allow_html=True)
+    session_id()
+
+    for tab, (_, render) in zip(st.tabs([label for label, _ in TABS]), TABS):
+        with tab:
+            render()
+
+
+if __name__ == "__main__":
+    main()